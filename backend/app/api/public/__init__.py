@@ -10,6 +10,9 @@ LastEditTime: 2025-11-26 11:12:11
 from fastapi import APIRouter, Depends
 from fastapi.responses import FileResponse
 from app.api.v1.deps import allow_local_only
+from app.core.redis_pool import RedisPool
+from app.db import all_engines, replicas
+from app.db.query_metrics import get_stats as get_query_stats
 
 router = APIRouter(tags=["公开接口"])
 
@@ -21,4 +24,19 @@ async def serve_frontend():
 @router.get("/api/health",name="服务健康检查",dependencies=[Depends(allow_local_only)])
 async def health_check():
     """服务健康检查接口"""
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@router.get("/api/metrics",name="连接池监控指标",dependencies=[Depends(allow_local_only)])
+async def metrics():
+    """Redis 连接池、订阅管理器、缓冲发布器、数据库只读副本和 SQL 查询的运行统计"""
+    managers = {
+        "pubsub": RedisPool._pubsub_manager,
+        "streams": RedisPool._stream_manager,
+        "buffered_publisher": RedisPool._buffered_publisher,
+        "db_replicas": replicas,
+    }
+    return {
+        "redis": RedisPool.get_stats(),
+        "db_queries": get_query_stats(*all_engines()),
+        **{name: manager.get_stats() if manager is not None else None for name, manager in managers.items()},
+    }
@@ -3,61 +3,187 @@ Base Scaffold 依赖注入模块
 注释了强制用户认证，保留代码供参考
 """
 from fastapi import Depends, Header, Request, Query, HTTPException
-from typing import Optional
-import json
+from typing import AsyncGenerator, Generator, Optional
+import asyncio
+import os
 from app.core.jwt import verify_token
-from app.db import SessionLocal, User
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import SessionLocal, AsyncSessionLocal, User
 from app.boot import APIException
 from ipaddress import ip_address
 from app.core.redis_pool import RedisPool
+from app.core.local_cache import LocalTTLCache
 from app.boot import logger
+from app.library import json as json_codec
 
 # 用户缓存配置
 USER_CACHE_PREFIX = "user_cache:"
 USER_CACHE_TTL = 300  # 缓存5分钟
 
+# 进程内 L1 缓存（TTL 需短于 USER_CACHE_TTL，跨进程一致性依赖 pub/sub 失效广播）
+USER_L1_CACHE_TTL = int(os.getenv("USER_L1_CACHE_TTL", "30"))
+USER_L1_CACHE_SIZE = int(os.getenv("USER_L1_CACHE_SIZE", "10000"))
+USER_CACHE_INVALIDATE_CHANNEL = "user_cache_invalidate"
+USER_CACHE_INVALIDATE_ALL = "*"
+
+user_l1_cache = LocalTTLCache(maxsize=USER_L1_CACHE_SIZE, ttl=min(USER_L1_CACHE_TTL, USER_CACHE_TTL))
+
+def _user_from_dict(user_dict: dict) -> User:
+    """从缓存字典重建用户对象"""
+    user = User()
+    user.id = user_dict['id']
+    user.username = user_dict['username']
+    user.fixed = user_dict['fixed']
+    user.deleted_at = user_dict.get('deleted_at')
+    return user
+
 def get_cached_user(user_id: int) -> Optional[User]:
-    """从Redis获取缓存的用户对象"""
+    """从缓存获取用户对象（先查进程内 L1，再查Redis）"""
+    user_dict = user_l1_cache.get(user_id)
+    if user_dict is not None:
+        return _user_from_dict(user_dict)
+
     try:
         redis_client = RedisPool.get_redis()
         cache_key = f"{USER_CACHE_PREFIX}{user_id}"
         cached_data = redis_client.get(cache_key)
 
         if cached_data:
-            user_dict = json.loads(cached_data)
-            user = User()
-            user.id = user_dict['id']
-            user.username = user_dict['username']
-            user.fixed = user_dict['fixed']
-            user.deleted_at = user_dict.get('deleted_at')
-            return user
+            user_dict = json_codec.loads(cached_data)
+            user_l1_cache.set(user_id, user_dict)
+            return _user_from_dict(user_dict)
     except Exception as e:
         logger.debug(f"Redis cache get error: {e}")
     return None
 
+async def get_cached_user_async(user_id: int) -> Optional[User]:
+    """get_cached_user 的异步版本（异步Redis客户端，不阻塞事件循环）"""
+    user_dict = user_l1_cache.get(user_id)
+    if user_dict is not None:
+        return _user_from_dict(user_dict)
+
+    try:
+        redis_client = await RedisPool.get_async_redis()
+        cached_data = await redis_client.get(f"{USER_CACHE_PREFIX}{user_id}")
+
+        if cached_data:
+            user_dict = json_codec.loads(cached_data)
+            user_l1_cache.set(user_id, user_dict)
+            return _user_from_dict(user_dict)
+    except Exception as e:
+        logger.debug(f"Redis cache get error: {e}")
+    return None
+
+def _user_to_dict(user: User) -> dict:
+    """用户对象转换为缓存字典"""
+    return {
+        'id': user.id,
+        'username': user.username,
+        'fixed': user.fixed,
+        'deleted_at': str(user.deleted_at) if user.deleted_at else None
+    }
+
 def cache_user(user: User):
-    """缓存用户对象到Redis"""
+    """缓存用户对象到Redis和进程内 L1"""
+    user_dict = _user_to_dict(user)
+    user_l1_cache.set(user.id, user_dict)
+
     try:
         redis_client = RedisPool.get_redis()
         cache_key = f"{USER_CACHE_PREFIX}{user.id}"
 
-        user_dict = {
-            'id': user.id,
-            'username': user.username,
-            'fixed': user.fixed,
-            'deleted_at': str(user.deleted_at) if user.deleted_at else None
-        }
-
         redis_client.setex(
             cache_key,
             USER_CACHE_TTL,
-            json.dumps(user_dict)
+            json_codec.dumps_str(user_dict)
+        )
+    except Exception as e:
+        logger.debug(f"Redis cache set error: {e}")
+
+async def cache_user_async(user: User):
+    """cache_user 的异步版本"""
+    user_dict = _user_to_dict(user)
+    user_l1_cache.set(user.id, user_dict)
+
+    try:
+        redis_client = await RedisPool.get_async_redis()
+        await redis_client.setex(
+            f"{USER_CACHE_PREFIX}{user.id}",
+            USER_CACHE_TTL,
+            json_codec.dumps_str(user_dict)
         )
     except Exception as e:
         logger.debug(f"Redis cache set error: {e}")
 
+def get_db() -> Generator[Session, None, None]:
+    """
+    请求级同步会话（只用于 def 路由，在线程池中执行）
+    用法：db: Session = Depends(get_db)
+    """
+    with SessionLocal() as db:
+        yield db
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    请求级异步会话，响应完成后关闭并归还连接，未提交的事务自动回滚
+    用法：db: AsyncSession = Depends(get_async_db)
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def load_user(user_id: int) -> Optional[User]:
+    """从数据库查询未删除的用户（同步）"""
+    with SessionLocal() as db:
+        return db.query(User).filter(
+            User.id == user_id,
+            User.deleted_at.is_(None)
+        ).first()
+
+async def load_user_async(user_id: int) -> Optional[User]:
+    """从数据库查询未删除的用户（异步会话）"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(User).where(
+                User.id == user_id,
+                User.deleted_at.is_(None)
+            ).limit(1)
+        )
+        return result.scalars().first()
+
+def _user_id_from_token(token: str) -> int:
+    """校验令牌并解析用户ID（sub 格式：{user_id}_{fixed}）"""
+    payload = verify_token(token)
+    user_id, fixed = payload.sub.split('_')
+    return int(user_id)
+
+def get_user_by_token(token: str) -> Optional[User]:
+    """
+    根据令牌获取用户（同步版本）
+    会阻塞调用线程，只应在线程池/同步路由中使用
+    """
+    user_id = _user_id_from_token(token)
+    user = get_cached_user(user_id)
+    if not user:
+        user = load_user(user_id)
+        if user:
+            cache_user(user)
+    return user
+
+async def get_user_by_token_async(token: str) -> Optional[User]:
+    """根据令牌获取用户（异步版本，Redis和数据库均不阻塞事件循环）"""
+    user_id = _user_id_from_token(token)
+    user = await get_cached_user_async(user_id)
+    if not user:
+        user = await load_user_async(user_id)
+        if user:
+            await cache_user_async(user)
+    return user
+
 def clear_user_cache(user_id: int = None):
-    """清除用户缓存"""
+    """清除用户缓存，并广播给所有进程清除各自的 L1 缓存"""
+    _evict_local_user_cache(str(user_id) if user_id else USER_CACHE_INVALIDATE_ALL)
     try:
         redis_client = RedisPool.get_redis()
         if user_id:
@@ -67,9 +193,61 @@ def clear_user_cache(user_id: int = None):
             pattern = f"{USER_CACHE_PREFIX}*"
             for key in redis_client.scan_iter(match=pattern):
                 redis_client.delete(key)
+        redis_client.publish(
+            USER_CACHE_INVALIDATE_CHANNEL,
+            str(user_id) if user_id else USER_CACHE_INVALIDATE_ALL
+        )
     except Exception as e:
         logger.debug(f"Redis cache clear error: {e}")
 
+def _evict_local_user_cache(message: str):
+    """处理失效消息：用户ID 或 "*"(全部)"""
+    if message == USER_CACHE_INVALIDATE_ALL:
+        user_l1_cache.clear()
+    else:
+        try:
+            user_l1_cache.delete(int(message))
+        except ValueError:
+            logger.warning(f"无效的用户缓存失效消息: {message}")
+
+def get_user_cache_stats() -> dict:
+    """L1 用户缓存命中统计"""
+    return user_l1_cache.get_stats()
+
+async def _listen_user_cache_invalidation():
+    """订阅失效频道，断线后重试"""
+    while True:
+        try:
+            async for message in RedisPool.async_listen_pubsub(USER_CACHE_INVALIDATE_CHANNEL):
+                # 跳过心跳、初始化等事件
+                if isinstance(message, str):
+                    _evict_local_user_cache(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"用户缓存失效订阅异常: {e}，5秒后重试")
+            # 断线期间可能漏掉失效消息，保守地清空 L1
+            user_l1_cache.clear()
+        await asyncio.sleep(5)
+
+def setup_user_cache_invalidation(app):
+    """启动时订阅用户缓存失效频道（每个 worker 一个订阅任务）"""
+    listener_task = None
+
+    @app.on_event("startup")
+    async def start_user_cache_listener():
+        nonlocal listener_task
+        listener_task = asyncio.create_task(_listen_user_cache_invalidation())
+
+    @app.on_event("shutdown")
+    async def stop_user_cache_listener():
+        if listener_task:
+            listener_task.cancel()
+            try:
+                await listener_task
+            except asyncio.CancelledError:
+                pass
+
 """
 以下函数已注释掉强制认证，如需启用可取消注释
 保留代码供未来参考使用
@@ -103,24 +281,7 @@ async def get_current_user_no_err(
     """
     try:
         if token:
-            payload = verify_token(token)
-            user_id, fixed = payload.sub.split('_')
-            user_id = int(user_id)
-
-            user = get_cached_user(user_id)
-
-            if not user:
-                db = SessionLocal()
-                try:
-                    user = db.query(User).filter(
-                        User.id == user_id,
-                        User.deleted_at.is_(None)
-                    ).first()
-
-                    if user:
-                        cache_user(user)
-                finally:
-                    db.close()
+            user = await get_user_by_token_async(token)
 
             if user and not hasattr(request.state, 'user'):
                 request.state.user = user
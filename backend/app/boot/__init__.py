@@ -4,3 +4,4 @@ from .static import serve_static
 from .config import settings
 from .logger import logger
 from .exceptions import APIException
+from .response import StandResponse
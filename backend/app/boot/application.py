@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from .config import app_config
 from .middleware import setup_cors,setup_stand_response,setup_exception,setup_custom_server
+from .response import StandResponse
+from .pipeline import MiddlewarePipeline, PipelineMiddleware
 from app.middleware import setup_access_log
 from .static import serve_static
 from typing import Callable
@@ -12,6 +14,11 @@ import warnings
 warnings.filterwarnings("ignore", category=UserWarning, message=".*validate_default.*", module="pydantic")
 
 class ExtendedFastAPI(FastAPI):
+    def __init__(self, *args, **kwargs):
+        # 插件通过 app.pipeline 注册钩子，统一在一个 ASGI 层内执行
+        self.pipeline = MiddlewarePipeline()
+        super().__init__(*args, **kwargs)
+
     def use(self, plugin: Callable):
         """
         类Vue的use()方法，用于挂载插件
@@ -26,11 +33,15 @@ def create_app() -> FastAPI:
         title="engine",
         version="1.0.0", 
         json_as_ascii=False,
+        default_response_class=StandResponse,
         docs_url=None if os.getenv("APP_ENV") == "production" else "/docs",
         openapi_url=None if os.getenv("APP_ENV") == "production" else "/openapi.json",
     )
 
     app.use(setup_cors)
+    # 管道注册在 CORS 外层，钩子能看到 CORS 写入的响应头；
+    # 之后 add_middleware 的层（如 GZip）位于管道外层，包装逻辑始终处理未压缩的 body
+    app.add_middleware(PipelineMiddleware, pipeline=app.pipeline)
     app.use(setup_stand_response)
     app.use(setup_exception)
     app.use(setup_docs)
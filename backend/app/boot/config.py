@@ -8,10 +8,10 @@ LastEditors: Moqi
 LastEditTime: 2025-12-31 21:24:00
 '''
 import os
-from typing import List
+from typing import List, Literal, Tuple
 from pathlib import Path
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import Field, model_validator
 from .logger import logger
 
 
@@ -30,6 +30,37 @@ class DatabaseConfig(BaseSettings):
     host: str = Field(default="localhost", validation_alias="DB_HOST")
     port: int = Field(default=3306, validation_alias="DB_PORT")
     db_name: str = Field(default="queue_platform", validation_alias="DB_NAME")
+    # 连接池（MySQL 同步/异步引擎共用，各自独立建池）
+    pool_size: int = Field(default=8, validation_alias="DB_POOL_SIZE")
+    max_overflow: int = Field(default=15, validation_alias="DB_MAX_OVERFLOW")
+    pool_timeout: float = Field(default=30, validation_alias="DB_POOL_TIMEOUT")
+    pool_recycle: int = Field(default=1800, validation_alias="DB_POOL_RECYCLE")
+    # 异步 MySQL 驱动：aiomysql / asyncmy（需另行安装）
+    async_driver: Literal["aiomysql", "asyncmy"] = Field(default="aiomysql", validation_alias="DB_ASYNC_DRIVER")
+    # 只读副本，逗号分隔的 host[:port]（端口默认同主库），为空时全部走主库
+    replica_hosts: str = Field(default="", validation_alias="DB_REPLICA_HOSTS")
+    # 副本选择：round_robin(轮询) / least_latency(健康检查延迟最低)
+    replica_strategy: Literal["round_robin", "least_latency"] = Field(default="round_robin", validation_alias="DB_REPLICA_STRATEGY")
+    replica_health_interval: float = Field(default=5, validation_alias="DB_REPLICA_HEALTH_INTERVAL")  # 健康检查间隔（秒）
+
+    @property
+    def pool_options(self) -> dict:
+        return {
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_timeout": self.pool_timeout,
+            "pool_recycle": self.pool_recycle,
+        }
+
+    @property
+    def replica_nodes(self) -> List[Tuple[str, int]]:
+        nodes = []
+        for item in self.replica_hosts.split(","):
+            item = item.strip()
+            if item:
+                host, _, port = item.partition(":")
+                nodes.append((host, int(port) if port else self.port))
+        return nodes
 
 
 class RedisConfig(BaseSettings):
@@ -45,6 +76,64 @@ class RedisConfig(BaseSettings):
     host: str = Field(default="127.0.0.1", validation_alias="REDIS_HOST")
     port: int = Field(default=6379, validation_alias="REDIS_PORT")
     password: str = Field(default="", validation_alias="REDIS_PASSWORD")
+    db: int = Field(default=0, validation_alias="REDIS_DB")
+    # 部署形态：standalone(单机，可用 unix_socket) / sentinel(哨兵) / cluster(集群)
+    mode: Literal["standalone", "sentinel", "cluster"] = Field(default="standalone", validation_alias="REDIS_MODE")
+    # 与 Redis 同机部署时使用 Unix 域套接字，设置后忽略 host/port（仅 standalone）
+    unix_socket: str = Field(default="", validation_alias="REDIS_UNIX_SOCKET")
+    # 哨兵地址，逗号分隔的 host:port
+    sentinel_hosts: str = Field(default="", validation_alias="REDIS_SENTINEL_HOSTS")
+    sentinel_master: str = Field(default="mymaster", validation_alias="REDIS_SENTINEL_MASTER")
+    sentinel_password: str = Field(default="", validation_alias="REDIS_SENTINEL_PASSWORD")
+    # 集群启动节点，逗号分隔的 host:port，为空时使用 host:port
+    cluster_nodes: str = Field(default="", validation_alias="REDIS_CLUSTER_NODES")
+    # 连接池与超时
+    max_connections: int = Field(default=100, validation_alias="REDIS_MAX_CONNECTIONS")
+    socket_timeout: float = Field(default=0, validation_alias="REDIS_SOCKET_TIMEOUT")  # 0 表示不限制
+    socket_connect_timeout: float = Field(default=5, validation_alias="REDIS_SOCKET_CONNECT_TIMEOUT")
+    health_check_interval: int = Field(default=30, validation_alias="REDIS_HEALTH_CHECK_INTERVAL")
+    # RESP3 客户端缓存（CLIENT TRACKING）：同步客户端的读命令由进程内缓存返回，服务端推送失效
+    client_cache: bool = Field(default=False, validation_alias="REDIS_CLIENT_CACHE")
+    client_cache_size: int = Field(default=10000, validation_alias="REDIS_CLIENT_CACHE_SIZE")
+    # 普通频道改用 Redis 7 分片订阅（SSUBSCRIBE / SPUBLISH），不支持集群模式
+    pubsub_sharded: bool = Field(default=False, validation_alias="PUBSUB_SHARDED")
+
+    @model_validator(mode="after")
+    def _check_pubsub_sharded(self):
+        # 集群中分片订阅需连接频道槽位所在的节点，订阅分发器只有一个连接，其它节点上的频道会收到 MOVED
+        if self.pubsub_sharded and self.mode == "cluster":
+            raise ValueError("PUBSUB_SHARDED 不能与 REDIS_MODE=cluster 同时使用："
+                             "集群模式下请使用普通订阅（PUBLISH 会广播到所有节点）")
+        return self
+
+    @staticmethod
+    def _parse_nodes(value: str) -> List[Tuple[str, int]]:
+        nodes = []
+        for item in value.split(","):
+            item = item.strip()
+            if item:
+                host, _, port = item.rpartition(":")
+                nodes.append((host, int(port)))
+        return nodes
+
+    @property
+    def sentinel_nodes(self) -> List[Tuple[str, int]]:
+        return self._parse_nodes(self.sentinel_hosts)
+
+    @property
+    def cluster_startup_nodes(self) -> List[Tuple[str, int]]:
+        return self._parse_nodes(self.cluster_nodes) or [(self.host, self.port)]
+
+    @property
+    def address(self) -> str:
+        """用于日志展示的连接地址"""
+        if self.mode == "sentinel":
+            return f"sentinel://{self.sentinel_hosts}/{self.sentinel_master}"
+        if self.mode == "cluster":
+            return f"cluster://{self.cluster_nodes or f'{self.host}:{self.port}'}"
+        if self.unix_socket:
+            return f"unix://{self.unix_socket}?db={self.db}"
+        return f"{self.host}:{self.port}/{self.db}"
 
 
 class AppConfig(BaseSettings):
@@ -60,6 +149,8 @@ class AppConfig(BaseSettings):
     debug: bool = Field(default=True, validation_alias="APP_DEBUG")
     cors_origins: str = Field(default="*", validation_alias="APP_CORS_ORIGINS")
     enable_gzip: bool = Field(default=True, validation_alias="APP_ENABLE_GZIP")
+    # 流式 JSON 响应的包装方式：buffered(缓冲后整体包装) / incremental(边流边包装) / off(不包装)
+    stream_envelope: Literal["buffered", "incremental", "off"] = Field(default="buffered", validation_alias="APP_STREAM_ENVELOPE")
     
     @property
     def cors_origins_list(self) -> List[str]:
@@ -194,7 +285,7 @@ if app_env == "production":
 else:
     print(f"  🗄️  数据库: SQLite - app/data/sqlite.db")
 
-print(f"  🔴 Redis: {redis_config.host}:{redis_config.port} (密码: {'✓已设置' if redis_config.password else '⚠️未设置'})")
+print(f"  🔴 Redis: {redis_config.address} (密码: {'✓已设置' if redis_config.password else '⚠️未设置'})")
 print(f"  🔑 JWT: secret_key={'✓已配置' if jwt_config.secret_key != 'default_secret_key_please_change_in_production' else '⚠️使用默认值(不安全!)'}, 过期时间={jwt_config.expire_minutes}分钟")
 print(f"  🐛 调试模式: {'开启' if app_config.debug else '关闭'}")
 print(f"  🌐 CORS: {app_config.cors_origins_list}")
@@ -1,7 +1,13 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse,StreamingResponse
-import json
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import Message, Send
+from app.library import json as json_codec
 from .exceptions import APIException
+from .response import (
+    StandResponse, STAND_WRAPPED_KEY, wrap_response,
+    STREAM_ENVELOPE_KEY, STREAM_ENVELOPE_PREFIX, STREAM_INCREMENTAL, STREAM_OFF,
+)
+from .pipeline import RequestContext
 from .config import app_config
 from .logger import logger
 
@@ -17,15 +23,14 @@ def setup_cors(app: FastAPI):
     )
 
 def setup_custom_server(app:FastAPI):
-    @app.middleware("http")
-    async def server_header(request: Request, call_next):
-        response = await call_next(request)
-        response.headers["Server"]  = "struggler/1.0" 
-        access_control_allow_origin = response.headers.get("access-control-allow-origin", "")
-        if access_control_allow_origin == "*" and "origin" in request.headers:
-            origin = request.headers.get("origin")
-            response.headers["access-control-allow-origin"] = origin  # 覆盖为请求的 Origin
-        return response
+    @app.pipeline.on_response_headers
+    def server_header(ctx: RequestContext, headers: MutableHeaders):
+        headers["Server"]  = "struggler/1.0" 
+        access_control_allow_origin = headers.get("access-control-allow-origin", "")
+        if access_control_allow_origin == "*":
+            origin = Headers(scope=ctx.scope).get("origin")
+            if origin:
+                headers["access-control-allow-origin"] = origin  # 覆盖为请求的 Origin
     
 def setup_compression(app: FastAPI):
     """配置Gzip压缩"""
@@ -33,106 +38,112 @@ def setup_compression(app: FastAPI):
     app.add_middleware(GZipMiddleware)
     
 def setup_stand_response(app: FastAPI):
-    
-    def is_wrapped_response(data: dict) -> bool:
-        """检查是否已经是标准格式响应"""
-        # logger.info(data)
-        return all(key in data for key in ("code",))
-    async def response_wrapper_middleware(request: Request, call_next):
+    """
+    标准响应包装（管道钩子）
+    - StandResponse 已在序列化阶段完成包装，这里只做标记检查后直接放行
+    - 其余 200 JSON 响应（如直接返回的 JSONResponse）才缓冲并包装
+    - 流式 JSON 响应按 APP_STREAM_ENVELOPE / stream_envelope 依赖选择缓冲、增量或不包装
+    """
+    skip_prefixes = ("/docs", "/openapi.json", "/api/v1/mcp")
+    stream_envelope_default = app_config.stream_envelope
+
+    @app.pipeline.send_filter
+    def stand_response_filter(ctx: RequestContext, send: Send) -> Send:
+        scope = ctx.scope
+        if scope["path"].startswith(skip_prefixes):
+            return send
+
+        start_message = None
+        chunks = []
+        passthrough = False
+        incremental = False
+        has_data = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, passthrough, incremental, has_data
+            message_type = message["type"]
+
+            if message_type == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                # 已包装 / 非200 / 非JSON / 已压缩：直接放行，不缓冲
+                if (
+                    scope.get(STAND_WRAPPED_KEY)
+                    or message["status"] != 200
+                    or "application/json" not in headers.get("content-type", "")
+                    or "content-encoding" in headers
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+
+                # 没有 Content-Length 的即为流式响应（StreamingResponse）
+                if "content-length" not in headers:
+                    mode = scope.get(STREAM_ENVELOPE_KEY, stream_envelope_default)
+                    if mode == STREAM_OFF:
+                        passthrough = True
+                        await send(message)
+                        return
+                    if mode == STREAM_INCREMENTAL:
+                        # 立即发出响应头和外壳前缀，后续 chunk 直接透传
+                        incremental = True
+                        await send(message)
+                        await send({"type": "http.response.body", "body": STREAM_ENVELOPE_PREFIX, "more_body": True})
+                        return
+
+                start_message = message
+                return
+
+            if message_type != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if incremental:
+                if not has_data and body.strip():
+                    has_data = True
+                if more_body:
+                    await send(message)
+                    return
+                # 空流包装为 data: null，保证输出始终是合法 JSON
+                body += b"}" if has_data else b"null}"
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            chunks.append(body)
+            if more_body:
+                return
+
+            body = b"".join(chunks)
+            chunks.clear()
+            await _send_wrapped(start_message, body, send)
+
+        return send_wrapper
+
+    @app.pipeline.on_error
+    async def stand_response_error(ctx: RequestContext, exc: Exception):
+        if isinstance(exc, APIException):
+            return None
+        return StandResponse(
+            status_code=200,
+            content={"code": 1, "msg": str(exc)}
+        )
+
+
+async def _send_wrapped(start_message: Message, body: bytes, send: Send):
+    """包装缓冲下来的 JSON body，解析失败则原样返回"""
+    if body:
         try:
-            response = await call_next(request)
-
-            # 跳过文档等特殊路径
-            if request.url.path.startswith(("/docs", "/openapi.json", "/api/v1/mcp")):
-                return response
-                
-            # 只处理JSON响应且状态码为200
-            if "application/json" in response.headers.get("content-type", "") and response.status_code == 200:
-                # 处理流式响应
-                if isinstance(response, StreamingResponse):
-                    async def wrapped_stream():
-                        chunks = []
-                        try:
-                            async for chunk in response.body_iterator:
-                                chunks.append(chunk)
-                            
-                            # 拼接所有chunk并解码
-                            full_body = b''.join(chunks).decode()
-                            try:
-                                data = json.loads(full_body)
-                                if not is_wrapped_response(data):  # 检查是否已包装
-                                    data = {"code": 200, "data": data}
-                                yield json.dumps(data,ensure_ascii=False).encode()
-                            except json.JSONDecodeError:
-                                yield full_body.encode()
-                        except Exception as e:
-                            logger.error(f"Stream processing error: {e}")
-                            error_response = {"code": 1, "msg": "Stream processing failed"}
-                            yield json.dumps(error_response, ensure_ascii=False).encode()
-                        finally:
-                            # 确保资源清理
-                            if hasattr(response, 'body_iterator') and hasattr(response.body_iterator, 'close'):
-                                try:
-                                    await response.body_iterator.close()
-                                except:
-                                    pass
-                                    
-                    # 创建新的响应，不包含 content-length
-                    return StreamingResponse(
-                        status_code=response.status_code,
-                        content=wrapped_stream(),
-                        media_type="application/json"
-                    )
-                
-                # 对于普通 Response，读取 body
-                body = b""
-                body_was_consumed = False
-                
-                if hasattr(response, 'body'):
-                    body = response.body
-                elif hasattr(response, 'body_iterator'):
-                    chunks = []
-                    async for chunk in response.body_iterator:
-                        chunks.append(chunk)
-                    body = b''.join(chunks)
-                    body_was_consumed = True  # 标记 body_iterator 已被消费
-                
-                if body:
-                    try:
-                        data = json.loads(body)
-                        if not is_wrapped_response(data):  # 关键检查
-                            data = {
-                                "code": 200,
-                                "data": data
-                            }
-                        # 无论是否包装，都创建新的 JSONResponse 以确保 Content-Length 正确
-                        return JSONResponse(
-                            status_code=response.status_code,
-                            content=data
-                        )
-                    except Exception as e:
-                        logger.error(f"JSON parse error: {e}")
-                        # 如果解析失败但 body_iterator 已被消费，需要重建响应
-                        if body_was_consumed:
-                            from starlette.responses import Response
-                            return Response(
-                                content=body,
-                                status_code=response.status_code,
-                                headers=dict(response.headers),
-                                media_type=response.headers.get("content-type")
-                            )
-                
-            return response
-        except APIException as e:
-            raise
-            
+            body = json_codec.dumps(wrap_response(json_codec.loads(body)))
         except Exception as e:
-            return JSONResponse(
-                status_code=200,
-                content={"code": 1, "msg": str(e)}
-            )
-    app.middleware("http")(response_wrapper_middleware)
-    
+            logger.error(f"JSON parse error: {e}")
+
+    headers = MutableHeaders(raw=list(start_message["headers"]))
+    headers["content-length"] = str(len(body))
+    await send({**start_message, "headers": headers.raw})
+    await send({"type": "http.response.body", "body": body})
+
 def setup_exception(app: FastAPI):
     from fastapi.exceptions import RequestValidationError, HTTPException as FastAPIHTTPException
     from starlette.exceptions import HTTPException as StarletteHTTPException
@@ -172,7 +183,7 @@ def setup_exception(app: FastAPI):
         else:
             error_msg = "请求参数验证失败"
         
-        return JSONResponse(
+        return StandResponse(
             status_code=200,  # 统一返回 200，通过 code 字段区分
             content={"code": 1, "msg": error_msg}
         )
@@ -201,7 +212,7 @@ def setup_exception(app: FastAPI):
         if exc.detail and exc.detail != error_msg:
             error_msg += f": {exc.detail}"
         
-        return JSONResponse(
+        return StandResponse(
             status_code=200,  # 统一返回 200，通过 code 字段区分
             content={"code": exc.status_code, "msg": error_msg}
         )
@@ -209,15 +220,16 @@ def setup_exception(app: FastAPI):
     @app.exception_handler(APIException)
     async def api_exception_handler(request: Request, exc: APIException):
         """统一处理自定义 API 异常"""
-        return JSONResponse(
+        return StandResponse(
             status_code=exc.status_code,
-            content={"code": exc.detail.get("code") or 1, "msg": exc.detail.get("msg") or ""}
+            content={"code": exc.detail.get("code") or 1, "msg": exc.detail.get("msg") or ""},
+            headers=exc.headers
         )
     
     @app.exception_handler(ValueError)
     async def value_exception_handler(request: Request, exc: ValueError):
         """统一处理 ValueError"""
-        return JSONResponse(
+        return StandResponse(
             status_code=200,
             content={"code": 1, "msg": f"{str(exc)}"}
         )
@@ -228,7 +240,7 @@ def setup_exception(app: FastAPI):
         from app.boot import logger
         logger.error(f"未处理的异常: {type(exc).__name__}: {str(exc)}", exc_info=True)
         
-        return JSONResponse(
+        return StandResponse(
             status_code=200,  # 统一返回 200
             content={"code": 500, "msg": f"服务器内部错误: {str(exc)}"}
         )
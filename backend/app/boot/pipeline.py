@@ -0,0 +1,147 @@
+"""
+中间件管道
+把多个 @app.middleware("http") 层合并为一个纯 ASGI 层，插件以钩子形式注册：
+
+- on_request(ctx)                 请求进入时调用，返回 Response 则直接短路
+- on_response_headers(ctx, hdrs)  响应头发出前调用，可直接修改响应头
+- send_filter(ctx, send) -> send  包装 send，用于改写响应体（如标准响应包装）
+- on_error(ctx, exc)              未处理异常时调用，返回 Response 表示已处理
+- on_complete(ctx)                请求结束时调用（无论成功失败）
+
+钩子列表在首个请求时编译为元组，之后注册的钩子会触发重新编译
+"""
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestContext:
+    """单个请求在管道中的上下文"""
+    __slots__ = ("scope", "start_time", "status_code", "response_started", "error", "state")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.start_time = time.perf_counter()
+        self.status_code: Optional[int] = None
+        self.response_started = False
+        self.error: Optional[BaseException] = None
+        self.state: Dict[str, Any] = {}
+
+    @property
+    def method(self) -> str:
+        return self.scope["method"]
+
+    @property
+    def path(self) -> str:
+        return self.scope["path"]
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start_time) * 1000
+
+
+RequestHook = Callable[[RequestContext], Awaitable[Optional[Response]]]
+HeadersHook = Callable[[RequestContext, MutableHeaders], None]
+SendFilter = Callable[[RequestContext, Send], Send]
+ErrorHook = Callable[[RequestContext, Exception], Awaitable[Optional[Response]]]
+CompleteHook = Callable[[RequestContext], None]
+
+
+class MiddlewarePipeline:
+    """钩子注册表，注册方法均可作为装饰器使用"""
+
+    def __init__(self):
+        self._request_hooks: List[RequestHook] = []
+        self._headers_hooks: List[HeadersHook] = []
+        self._send_filters: List[SendFilter] = []
+        self._error_hooks: List[ErrorHook] = []
+        self._complete_hooks: List[CompleteHook] = []
+        self._compiled: Optional[Tuple[tuple, tuple, tuple, tuple, tuple]] = None
+
+    def _register(self, hooks: list, fn):
+        hooks.append(fn)
+        self._compiled = None
+        return fn
+
+    def on_request(self, fn: RequestHook) -> RequestHook:
+        return self._register(self._request_hooks, fn)
+
+    def on_response_headers(self, fn: HeadersHook) -> HeadersHook:
+        return self._register(self._headers_hooks, fn)
+
+    def send_filter(self, fn: SendFilter) -> SendFilter:
+        """先注册的过滤器离应用最远（最后改写消息）"""
+        return self._register(self._send_filters, fn)
+
+    def on_error(self, fn: ErrorHook) -> ErrorHook:
+        return self._register(self._error_hooks, fn)
+
+    def on_complete(self, fn: CompleteHook) -> CompleteHook:
+        return self._register(self._complete_hooks, fn)
+
+    def compile(self) -> Tuple[tuple, tuple, tuple, tuple, tuple]:
+        """将钩子列表冻结为元组，请求路径上只做元组遍历"""
+        if self._compiled is None:
+            self._compiled = (
+                tuple(self._request_hooks),
+                tuple(self._headers_hooks),
+                tuple(reversed(self._send_filters)),
+                tuple(self._error_hooks),
+                tuple(self._complete_hooks),
+            )
+        return self._compiled
+
+
+class PipelineMiddleware:
+    """执行 MiddlewarePipeline 的单层纯 ASGI 中间件"""
+
+    def __init__(self, app: ASGIApp, pipeline: MiddlewarePipeline):
+        self.app = app
+        self.pipeline = pipeline
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_hooks, headers_hooks, send_filters, error_hooks, complete_hooks = self.pipeline.compile()
+        ctx = RequestContext(scope)
+
+        async def send_response(message: Message):
+            if message["type"] == "http.response.start":
+                ctx.status_code = message["status"]
+                ctx.response_started = True
+                if headers_hooks:
+                    headers = MutableHeaders(scope=message)
+                    for hook in headers_hooks:
+                        hook(ctx, headers)
+            await send(message)
+
+        try:
+            try:
+                for hook in request_hooks:
+                    response = await hook(ctx)
+                    if response is not None:
+                        await response(scope, receive, send_response)
+                        return
+
+                app_send = send_response
+                for send_filter in send_filters:
+                    app_send = send_filter(ctx, app_send)
+
+                await self.app(scope, receive, app_send)
+            except Exception as exc:
+                if not ctx.response_started:
+                    for hook in error_hooks:
+                        response = await hook(ctx, exc)
+                        if response is not None:
+                            await response(scope, receive, send_response)
+                            return
+                ctx.error = exc
+                raise
+        finally:
+            for hook in complete_hooks:
+                hook(ctx)
@@ -0,0 +1,69 @@
+"""
+标准响应
+在序列化阶段直接套上 {"code": 200, "data": ...} 外壳，避免中间件二次解析
+"""
+import typing
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.types import Receive, Scope, Send
+
+from app.library import json as json_codec
+
+# 写入 scope 的标记：响应已是标准格式，中间件直接放行
+STAND_WRAPPED_KEY = "stand_response.wrapped"
+# 写入 scope 的流式包装模式，由 stream_envelope 依赖设置
+STREAM_ENVELOPE_KEY = "stand_response.stream_envelope"
+
+STREAM_BUFFERED = "buffered"        # 缓冲全部 chunk 后解析并包装（可识别已包装结果）
+STREAM_INCREMENTAL = "incremental"  # 立即输出外壳前缀，chunk 直接透传，结束时补上 "}"
+STREAM_OFF = "off"                  # 不包装
+STREAM_ENVELOPE_MODES = (STREAM_BUFFERED, STREAM_INCREMENTAL, STREAM_OFF)
+
+STREAM_ENVELOPE_PREFIX = b'{"code":200,"data":'
+
+
+def is_wrapped_response(data: typing.Any) -> bool:
+    """检查是否已经是标准格式响应"""
+    return isinstance(data, dict) and "code" in data
+
+
+def wrap_response(data: typing.Any) -> typing.Any:
+    """未包装的数据套上标准外壳，已包装的原样返回"""
+    if is_wrapped_response(data):
+        return data
+    return {"code": 200, "data": data}
+
+
+class StandResponse(JSONResponse):
+    """
+    标准 JSON 响应（作为 default_response_class 使用，orjson 序列化）
+    - 200 响应在 render 时包装，已包装的结果不会重复包装
+    - 发送时在 scope 中打标记，StandResponseMiddleware 不再读取/解析 body
+    """
+
+    def render(self, content: typing.Any) -> bytes:
+        if self.status_code == 200:
+            content = wrap_response(content)
+        return json_codec.dumps(content)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        scope[STAND_WRAPPED_KEY] = True
+        await super().__call__(scope, receive, send)
+
+
+def stream_envelope(mode: str = STREAM_INCREMENTAL):
+    """
+    接口级流式包装模式（覆盖 APP_STREAM_ENVELOPE 默认值）
+    用法：@router.get("/export", dependencies=[Depends(stream_envelope("incremental"))])
+
+    incremental 模式下内存占用与响应大小无关，但无法识别已包装的结果，
+    接口需保证流式输出的是 data 本身
+    """
+    if mode not in STREAM_ENVELOPE_MODES:
+        raise ValueError(f"不支持的流式包装模式: {mode}")
+
+    async def dependency(request: Request):
+        request.scope[STREAM_ENVELOPE_KEY] = mode
+
+    return dependency
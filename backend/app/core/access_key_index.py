@@ -0,0 +1,244 @@
+"""
+进程内 AccessKey 索引
+限流器热路径上按 secret_key 直接查字典，不再每次请求访问 Redis、解析 JSON
+
+- 启动时从数据库全量加载未删除的 AccessKey（连同创建用户）
+- 定时按 updated_at / created_at 增量刷新（含软删除和用户变更）
+- clear_access_key_cache 通过 Redis 频道广播，各进程即时剔除
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import or_, select
+
+from app.boot import logger
+from app.core.redis_pool import RedisPool
+from app.db import AccessKey, AsyncSessionLocal, User
+
+ACCESS_KEY_INDEX_REFRESH_INTERVAL = int(os.getenv("ACCESS_KEY_INDEX_REFRESH_INTERVAL", "30"))  # 增量刷新间隔（秒）
+ACCESS_KEY_INVALIDATE_CHANNEL = "access_key_invalidate"
+ACCESS_KEY_INVALIDATE_ALL = "*"
+
+
+class UserEntry:
+    """限流器需要的用户字段"""
+    __slots__ = ("id", "username", "fixed")
+
+    def __init__(self, id: int, username: str, fixed: bool):
+        self.id = id
+        self.username = username
+        self.fixed = fixed
+
+
+class AccessKeyEntry:
+    """限流器需要的 AccessKey 字段，rate 在构建时算好"""
+    __slots__ = ("id", "secret_key", "max_qps", "rate_strategy", "rate_limit", "rate_period",
+                 "created_by", "user", "rate")
+
+    def __init__(self, id: int, secret_key: str, max_qps: int, created_by: Optional[int],
+                 user: Optional[UserEntry] = None, rate_strategy: Optional[str] = None,
+                 rate_limit: Optional[int] = None, rate_period: Optional[int] = None):
+        self.id = id
+        self.secret_key = secret_key
+        self.max_qps = max_qps
+        self.rate_strategy = rate_strategy
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.created_by = created_by
+        self.user = user
+        # (算法, 周期内次数, 周期秒数)，未单独配置时沿用 max_qps 每秒
+        self.rate = (rate_strategy, rate_limit or max_qps, rate_period or 1)
+
+    @classmethod
+    def from_model(cls, access_key: AccessKey, user: Optional[User]) -> "AccessKeyEntry":
+        return cls(
+            id=access_key.id,
+            secret_key=access_key.secret_key,
+            max_qps=access_key.max_qps,
+            created_by=access_key.created_by,
+            user=UserEntry(user.id, user.username, user.fixed) if user and user.deleted_at is None else None,
+            rate_strategy=access_key.rate_strategy,
+            rate_limit=access_key.rate_limit,
+            rate_period=access_key.rate_period,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AccessKeyEntry":
+        """从 Redis 缓存数据重建（兼容未包含限流字段的旧缓存）"""
+        key = data['access_key']
+        user = data.get('user')
+        return cls(
+            id=key['id'],
+            secret_key=key['secret_key'],
+            max_qps=key['max_qps'],
+            created_by=key.get('created_by'),
+            user=UserEntry(user['id'], user['username'], user['fixed']) if user else None,
+            rate_strategy=key.get('rate_strategy'),
+            rate_limit=key.get('rate_limit'),
+            rate_period=key.get('rate_period'),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            'max_qps': self.max_qps,
+            'access_key': {
+                'id': self.id,
+                'secret_key': self.secret_key,
+                'max_qps': self.max_qps,
+                'rate_strategy': self.rate_strategy,
+                'rate_limit': self.rate_limit,
+                'rate_period': self.rate_period,
+                'created_by': self.created_by
+            },
+            'user': {
+                'id': self.user.id,
+                'username': self.user.username,
+                'fixed': self.user.fixed
+            } if self.user else None
+        }
+
+
+class AccessKeyIndex:
+    """secret_key -> AccessKeyEntry（单事件循环内修改，读取无需加锁）"""
+
+    def __init__(self):
+        self._entries: Dict[str, AccessKeyEntry] = {}
+        self._watermark: Optional[datetime] = None  # 已加载记录的最大 updated_at / created_at
+        self.ready = False
+        self.misses = 0  # 只统计未命中，命中路径不做任何分配
+
+    def get(self, secret_key: str) -> Optional[AccessKeyEntry]:
+        entry = self._entries.get(secret_key)
+        if entry is None:
+            self.misses += 1
+        return entry
+
+    def put(self, entry: AccessKeyEntry):
+        self._entries[entry.secret_key] = entry
+
+    def invalidate(self, secret_key: str):
+        """处理失效消息：secret_key 或 "*"(全部，下次刷新时全量重载)"""
+        if secret_key == ACCESS_KEY_INVALIDATE_ALL:
+            self._entries.clear()
+            self._watermark = None
+        else:
+            self._entries.pop(secret_key, None)
+
+    def _advance(self, *values: Optional[datetime]):
+        for value in values:
+            if value is not None and (self._watermark is None or value > self._watermark):
+                self._watermark = value
+
+    async def refresh(self):
+        """首次全量加载，之后只拉取 watermark 之后变更的记录"""
+        query = select(AccessKey, User).outerjoin(User, AccessKey.created_by == User.id)
+        full = self._watermark is None
+        if full:
+            query = query.where(AccessKey.deleted_at.is_(None))
+        else:
+            # >= 避免同一秒内的后续变更被漏掉，重复处理是幂等的
+            query = query.where(or_(
+                AccessKey.updated_at >= self._watermark,
+                AccessKey.created_at >= self._watermark,
+                User.updated_at >= self._watermark,
+            ))
+
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(query)).all()
+
+        if full:
+            self._entries.clear()
+        for access_key, user in rows:
+            self._advance(access_key.updated_at, access_key.created_at, user.updated_at if user else None)
+            if access_key.deleted_at is not None:
+                self._entries.pop(access_key.secret_key, None)
+            else:
+                self.put(AccessKeyEntry.from_model(access_key, user))
+        self.ready = True
+        if full:
+            logger.info(f"AccessKey 索引已加载: {len(self._entries)} 条")
+        elif rows:
+            logger.debug(f"AccessKey 索引增量刷新: {len(rows)} 条")
+
+    def get_stats(self) -> Dict:
+        """
+        获取当前统计信息
+
+        Returns:
+            dict: 条目数、未命中次数、当前 watermark
+        """
+        return {
+            "size": len(self._entries),
+            "ready": self.ready,
+            "misses": self.misses,
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+        }
+
+
+access_key_index = AccessKeyIndex()
+
+
+def publish_access_key_invalidation(secret_key: Optional[str] = None):
+    """本进程立即剔除，并广播给其它进程"""
+    message = secret_key or ACCESS_KEY_INVALIDATE_ALL
+    access_key_index.invalidate(message)
+    try:
+        RedisPool.get_redis().publish(ACCESS_KEY_INVALIDATE_CHANNEL, message)
+    except Exception as e:
+        logger.debug(f"AccessKey 失效广播失败: {e}")
+
+
+async def _listen_access_key_invalidation():
+    """订阅失效频道，断线后重试"""
+    while True:
+        try:
+            async for message in RedisPool.async_listen_pubsub(ACCESS_KEY_INVALIDATE_CHANNEL):
+                # 跳过心跳、初始化等事件
+                if isinstance(message, str):
+                    access_key_index.invalidate(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"AccessKey 失效订阅异常: {e}，5秒后重试")
+            # 断线期间可能漏掉失效消息，保守地全量重载
+            access_key_index.invalidate(ACCESS_KEY_INVALIDATE_ALL)
+        await asyncio.sleep(5)
+
+
+async def _refresh_access_key_index():
+    while True:
+        await asyncio.sleep(ACCESS_KEY_INDEX_REFRESH_INTERVAL)
+        try:
+            await access_key_index.refresh()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"AccessKey 索引刷新失败: {e}")
+
+
+def setup_access_key_index(app):
+    """启动时加载 AccessKey 索引，并启动增量刷新与失效订阅任务"""
+    tasks = []
+
+    @app.on_event("startup")
+    async def start_access_key_index():
+        try:
+            await access_key_index.refresh()
+        except Exception as e:
+            # 预热失败不阻止启动，未命中时限流器回退到 Redis/数据库查询
+            logger.error(f"AccessKey 索引预热失败: {e}")
+        tasks.append(asyncio.create_task(_refresh_access_key_index()))
+        tasks.append(asyncio.create_task(_listen_access_key_invalidation()))
+
+    @app.on_event("shutdown")
+    async def stop_access_key_index():
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        tasks.clear()
@@ -1,11 +1,11 @@
 import base64
 import hashlib
 import hmac
-import json
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
 from app.boot.config import settings
+from app.library import json as json_codec
 from app.schema.token import TokenPayload
 
 class JWTError(Exception):
@@ -61,8 +61,8 @@ def create_access_token(
         payload.update(additional_claims)
     
     # 编码header和payload
-    encoded_header = base64url_encode(json.dumps(header).encode('utf-8'))
-    encoded_payload = base64url_encode(json.dumps(payload).encode('utf-8'))
+    encoded_header = base64url_encode(json_codec.dumps(header))
+    encoded_payload = base64url_encode(json_codec.dumps(payload))
     
     # 创建签名
     message = f"{encoded_header}.{encoded_payload}".encode('utf-8')
@@ -105,14 +105,14 @@ def verify_token(token: str) -> TokenPayload:
             raise JWTError("无效的签名")
         
         # 解码payload
-        payload_data = json.loads(base64url_decode(encoded_payload).decode('utf-8'))
+        payload_data = json_codec.loads(base64url_decode(encoded_payload))
         
         # 检查过期时间
         if 'exp' in payload_data and payload_data['exp'] < datetime.utcnow().timestamp():
             raise JWTError("令牌已过期")
         
         return TokenPayload(**payload_data)
-    except (ValueError, json.JSONDecodeError, KeyError) as e:
+    except (ValueError, json_codec.JSONDecodeError, KeyError) as e:
         raise JWTError("无效的令牌格式") from e
 
 def decode_token(token: str) -> TokenPayload:
@@ -143,8 +143,8 @@ def decode_token(token: str) -> TokenPayload:
             raise JWTError("无效的签名")
         
         # 解码payload
-        payload_data = json.loads(base64url_decode(encoded_payload).decode('utf-8'))
+        payload_data = json_codec.loads(base64url_decode(encoded_payload))
         
         return TokenPayload(**payload_data)
-    except (ValueError, json.JSONDecodeError, KeyError) as e:
+    except (ValueError, json_codec.JSONDecodeError, KeyError) as e:
         raise JWTError("无效的令牌格式") from e
\ No newline at end of file
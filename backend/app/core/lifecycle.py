@@ -0,0 +1,285 @@
+"""
+应用生命周期（lifespan）
+- 启动：预热同步/异步 Redis 连接池和数据库连接池，再执行 @app.on_event("startup") 注册的处理器，
+  全部完成前请求返回 503（就绪门控）
+- 退出：收到 SIGTERM/SIGINT 即进入排空状态，新请求返回 503，结束所有 SSE 订阅；
+  在 LIFECYCLE_DRAIN_TIMEOUT 内等待处理中的请求完成，
+  再执行 @app.on_event("shutdown") 的处理器，最后关闭订阅管理器、缓冲发布器和所有连接池
+"""
+import asyncio
+import functools
+import os
+import signal
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+
+from app.boot import StandResponse, logger
+from app.boot.pipeline import RequestContext
+from app.core.redis_pool import RedisPool
+from app.db import async_engine, async_read_engine, engine, read_engine, replicas
+
+LIFECYCLE_DRAIN_TIMEOUT = float(os.getenv("LIFECYCLE_DRAIN_TIMEOUT", "20"))  # 排空等待上限（秒）
+LIFECYCLE_WARMUP_TIMEOUT = float(os.getenv("LIFECYCLE_WARMUP_TIMEOUT", "15"))  # 预热超时（秒），超时后照常启动
+REDIS_POOL_MIN_IDLE = int(os.getenv("REDIS_POOL_MIN_IDLE", "4"))  # Redis 连接池预热连接数
+DB_POOL_MIN_IDLE = int(os.getenv("DB_POOL_MIN_IDLE", "2"))  # 数据库连接池预热连接数（不超过 pool_size）
+
+UNMANAGED = "unmanaged"  # 未经 lifespan 启动（如 --lifespan off），不做门控
+STARTING = "starting"
+READY = "ready"
+DRAINING = "draining"
+STOPPED = "stopped"
+
+_IN_FLIGHT_KEY = "lifecycle_counted"
+
+
+class AppLifecycle:
+    """就绪状态与处理中请求计数（单事件循环内修改）"""
+
+    def __init__(self, drain_timeout: float = LIFECYCLE_DRAIN_TIMEOUT):
+        self.state = UNMANAGED
+        self.drain_timeout = drain_timeout
+        self.in_flight = 0
+        self._idle: asyncio.Event = None  # 在事件循环内创建
+        self._loop: asyncio.AbstractEventLoop = None  # 收到退出信号时在此事件循环中开始排空
+        self.warmup = {}  # 各连接池预热结果
+        self.closed_streams = 0
+
+    @property
+    def accepting(self) -> bool:
+        return self.state in (READY, UNMANAGED)
+
+    def request_started(self):
+        self.in_flight += 1
+        if self._idle is not None:
+            self._idle.clear()
+
+    def request_finished(self):
+        self.in_flight -= 1
+        if self.in_flight <= 0 and self._idle is not None:
+            self._idle.set()
+
+    def begin_drain(self):
+        """进入排空状态并结束所有 SSE 订阅（可重复调用）"""
+        if self.state in (DRAINING, STOPPED):
+            return
+        self.state = DRAINING
+        closed = 0
+        for manager in (RedisPool._pubsub_manager, RedisPool._stream_manager):
+            if manager is not None:
+                closed += manager.close_subscriptions()
+        self.closed_streams = closed
+        logger.info(f"开始排空：处理中请求 {self.in_flight} 个，已结束订阅 {closed} 个")
+
+    async def drain(self) -> bool:
+        """等待处理中的请求完成，返回是否在超时前排空"""
+        self.begin_drain()
+        if self.in_flight <= 0:
+            return True
+        if self._idle is None:
+            self._idle = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._idle.wait(), self.drain_timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"排空超时（{self.drain_timeout}秒），仍有 {self.in_flight} 个请求未完成")
+            return False
+
+    def get_stats(self) -> dict:
+        return {
+            "state": self.state,
+            "in_flight": self.in_flight,
+            "closed_streams": self.closed_streams,
+            "warmup": self.warmup,
+        }
+
+
+lifecycle = AppLifecycle()
+
+
+async def warm_db_pools(min_idle: int) -> dict:
+    """同时签出 min_idle 个连接再归还，使连接池中保持已建立的连接"""
+    sync_count = min(min_idle, engine.pool.size())
+
+    def warm_sync():
+        connections = [engine.connect() for _ in range(sync_count)]
+        for connection in connections:
+            connection.close()
+        return engine.pool.checkedin()
+
+    sync_idle = await asyncio.to_thread(warm_sync)
+
+    async with AsyncExitStack() as stack:
+        for _ in range(min(min_idle, async_engine.pool.size())):
+            await stack.enter_async_context(async_engine.connect())
+    return {"db": sync_idle, "async_db": async_engine.pool.checkedin()}
+
+
+async def warm_pools():
+    """预热全部连接池，失败只记录日志（首个请求时仍会按需创建）"""
+    results = {}
+
+    async def warm_redis():
+        results["redis"] = await asyncio.to_thread(RedisPool.warm_sync_pool, REDIS_POOL_MIN_IDLE)
+        results["async_redis"] = await RedisPool.warm_async_pool(REDIS_POOL_MIN_IDLE)
+
+    async def warm_db():
+        results.update(await warm_db_pools(DB_POOL_MIN_IDLE))
+
+    start = time.perf_counter()
+    outcomes = await asyncio.gather(
+        asyncio.wait_for(warm_redis(), LIFECYCLE_WARMUP_TIMEOUT),
+        asyncio.wait_for(warm_db(), LIFECYCLE_WARMUP_TIMEOUT),
+        return_exceptions=True,
+    )
+    for name, outcome in zip(("Redis", "数据库"), outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"{name}连接池预热失败: {outcome!r}")
+    logger.info(f"连接池预热完成（{(time.perf_counter() - start) * 1000:.0f}ms）: {results}")
+    return results
+
+
+async def close_pools():
+    """关闭订阅管理器、缓冲发布器和全部连接池，单项失败不影响其余"""
+    steps = (
+        ("缓冲发布器", RedisPool.close_buffered_publisher),
+        ("Streams 分发管理器", RedisPool.close_stream_manager),
+        ("订阅管理器", RedisPool.close_pubsub_manager),
+        ("Redis连接池", RedisPool.close_pools),
+        ("异步数据库连接池", async_engine.dispose),
+    )
+    if async_read_engine is not None:
+        steps += (("异步只读数据库连接池", async_read_engine.dispose),)
+    if replicas is not None:
+        steps += (("异步只读副本连接池", replicas.async_dispose),)
+    for name, step in steps:
+        try:
+            await step()
+        except Exception as e:
+            logger.error(f"关闭{name}失败: {e}")
+    for target in (engine, read_engine, replicas):
+        if target is None:
+            continue
+        try:
+            target.dispose()
+        except Exception as e:
+            logger.error(f"关闭数据库连接池失败: {e}")
+
+
+_DRAIN_HOOK = "_lifecycle_drain_hook"  # 包装后的退出处理器带此标记
+
+
+def _drain_soon():
+    """从信号处理器中调用：在事件循环线程里开始排空"""
+    loop = lifecycle._loop
+    if loop is not None and not loop.is_closed():
+        loop.call_soon_threadsafe(lifecycle.begin_drain)
+
+
+def _is_drain_hook(handler) -> bool:
+    return getattr(getattr(handler, "__func__", handler), _DRAIN_HOOK, False)
+
+
+def hook_server_exit() -> bool:
+    """
+    包装 uvicorn.Server.handle_exit：服务器收到 SIGTERM/SIGINT 时先开始排空再执行原有退出逻辑
+    uvicorn 在所有连接关闭后才发送 lifespan shutdown，SSE 长连接必须在收到信号时就结束
+    对加载应用之后才安装信号处理器的 uvicorn 版本生效（之前安装的由 _chain_exit_signals 处理）
+    """
+    try:
+        from uvicorn import Server
+    except ImportError:
+        return False
+    if _is_drain_hook(Server.handle_exit):
+        return True
+    handle_exit = Server.handle_exit
+
+    @functools.wraps(handle_exit)
+    def drain_then_exit(self, sig, frame):
+        _drain_soon()
+        handle_exit(self, sig, frame)
+
+    setattr(drain_then_exit, _DRAIN_HOOK, True)
+    Server.handle_exit = drain_then_exit
+    return True
+
+
+def _chain_exit_signals() -> bool:
+    """
+    确认 SIGTERM/SIGINT 会触发排空，返回是否挂接成功
+    - 事件循环的信号处理（loop.add_signal_handler）：回调为 Server.handle_exit，hook_server_exit 已包装
+    - signal.signal 安装的 Server.handle_exit：若在包装之前绑定（新版 uvicorn 先安装处理器再加载应用），
+      用同一 Server 实例包装后的 handle_exit 重新安装
+    其它处理器（非 uvicorn 服务器、测试客户端等）不做处理
+    """
+    try:
+        from uvicorn import Server
+    except ImportError:
+        return False
+    hook_server_exit()
+    hooked = False
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if _is_drain_hook(previous):
+            hooked = True
+        elif getattr(previous, "__name__", "") == "_sighandler_noop":
+            # asyncio/uvloop 的 add_signal_handler 占位处理器，实际回调由事件循环调用
+            hooked = True
+        elif isinstance(getattr(previous, "__self__", None), Server):
+            try:
+                signal.signal(sig, previous.__self__.handle_exit)
+                hooked = True
+            except ValueError as e:  # 非主线程不能设置信号处理器
+                logger.debug(f"未挂接退出信号 {sig}: {e}")
+    return hooked
+
+
+hook_server_exit()
+
+
+def setup_lifecycle(app):
+    """
+    以 lifespan 管理应用生命周期，兼容已注册的 @app.on_event 处理器
+    用法：app.use(setup_lifecycle)，应在其它带 on_request 钩子的插件之前注册
+    """
+    @asynccontextmanager
+    async def lifespan(_app):
+        lifecycle.state = STARTING
+        lifecycle._idle = asyncio.Event()
+        lifecycle._idle.set()
+        lifecycle.warmup = await warm_pools()
+        await app.router.startup()
+        lifecycle._loop = asyncio.get_running_loop()
+        if not _chain_exit_signals():
+            logger.warning("未能挂接 SIGTERM/SIGINT，SSE 长连接要到 lifespan shutdown 时才会结束")
+        lifecycle.state = READY
+        logger.info("应用已就绪")
+        try:
+            yield
+        finally:
+            await lifecycle.drain()
+            try:
+                await app.router.shutdown()
+            finally:
+                await close_pools()
+                lifecycle.state = STOPPED
+                logger.info("应用已退出，连接池已关闭")
+
+    app.router.lifespan_context = lifespan
+
+    @app.pipeline.on_request
+    async def readiness_gate(ctx: RequestContext):
+        if not lifecycle.accepting:
+            headers = {"Retry-After": "5"}
+            msg = "服务未就绪"
+            if lifecycle.state != STARTING:
+                headers["Connection"] = "close"
+                msg = "服务正在关闭"
+            return StandResponse(status_code=503, content={"code": 503, "msg": msg}, headers=headers)
+        ctx.state[_IN_FLIGHT_KEY] = True
+        lifecycle.request_started()
+        return None
+
+    @app.pipeline.on_complete
+    def count_finished(ctx: RequestContext):
+        if ctx.state.get(_IN_FLIGHT_KEY):
+            lifecycle.request_finished()
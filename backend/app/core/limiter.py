@@ -1,125 +1,158 @@
+import logging
+
 from app.core.redis_pool import RedisPool
 from fastapi import Request, HTTPException
+from sqlalchemy import select
 
-from app.db import SessionLocal, AccessKey, User
+from app.db import SessionLocal, AsyncSessionLocal, AccessKey, User
 from app.boot.exceptions import APIException
-from app.boot import logger
+from app.boot import logger, StandResponse
+from app.library import json as json_codec
+from app.core.rate_limit import DEFAULT_STRATEGY, HYBRID_WINDOW, RateLimitResult, get_strategy, hybrid_limiter
+from app.core.access_key_index import AccessKeyEntry, access_key_index, publish_access_key_invalidation
 
+ACCESS_KEY_CACHE_PREFIX = "access_key_full_info:"
+ACCESS_KEY_CACHE_TTL = 60
+ACCESS_KEY_NOT_FOUND_TTL = 10  # 缓存穿透保护
 
-class DynamicIPRateLimiter:
-    def __init__(self):
-        self.redis = RedisPool().get_redis()
+# request.state 上的判定结果，由响应头钩子输出 RateLimit-* 头
+RATE_LIMIT_STATE_KEY = "rate_limit"
 
-    def enforce(self, request: Request):
-        """执行限流：用Token查QPS配置，对IP限流"""
-        # 后台管理预案放行
-        if hasattr(request.state, "user"):
-            return
-        # 获取客户端真实IP
-        ip = self._get_client_ip(request)
-        if not ip:
-            raise APIException("获取IP失败", status_code=400)
 
+class _IPRateLimiterBase:
+    """同步/异步限流器共用的请求解析与缓存数据处理"""
+
+    def _get_token(self, request: Request) -> str:
         # 从请求头获取Token（仅用于查QPS配置）
         token = request.headers.get("X-Access-Key", "").strip()
         if not token:
             raise APIException("缺少访问密钥", status_code=401, code=1)
+        return token
 
-        # 获取该Token对应的IP限流配置和用户信息
-        access_key_info = self._get_access_key_info(token)
-        ip_limit = access_key_info['max_qps']
+    def _get_client_ip(self, request: Request) -> str:
+        """获取真实IP（处理代理）"""
+        if "x-forwarded-for" in request.headers:
+            return request.headers["x-forwarded-for"].split(",")[0].strip()
+        return request.client.host or "0.0.0.0"
 
+    def _require_client_ip(self, request: Request) -> str:
+        ip = self._get_client_ip(request)
+        if not ip:
+            raise APIException("获取IP失败", status_code=400)
+        return ip
+
+    def _attach_state(self, request: Request, token: str, ip: str, entry: AccessKeyEntry):
         # 将 AccessKey 和 User 信息附加到 request.state
-        request.state.access_key = access_key_info['access_key']
-        request.state.access_key_user = access_key_info['user']
+        request.state.access_key = entry
+        request.state.access_key_user = entry.user
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"IP: {ip}, Token: {token}, IP限流配置: {entry.rate}, User: {entry.user.username if entry.user else 'Unknown'}")
+
+    @staticmethod
+    def _apply_result(request: Request, entry: AccessKeyEntry, result: RateLimitResult):
+        """记录判定结果，超限时抛出带 Retry-After 的 429"""
+        setattr(request.state, RATE_LIMIT_STATE_KEY, result)
+        if not result.allowed:
+            _, limit, period = entry.rate
+            unit = "秒" if period == 1 else f"{period}秒"
+            raise APIException(f"IP请求超过限制（{limit}次/{unit}）", status_code=429, code=429, headers=result.headers())
+
+    @staticmethod
+    def _from_cache(token: str, cached_data) -> AccessKeyEntry:
+        data = json_codec.loads(cached_data)
+
+        # 检查是否是缓存的"不存在"结果（缓存穿透保护）
+        if data.get("error") == "not_found":
+            logger.debug(f"Cache hit for invalid AccessKey: {token}")
+            raise APIException("访问密钥无效", status_code=401, code=1)
+
+        logger.debug(f"Cache hit for AccessKey: {token}")
+
+        # 写入进程内索引，后续请求不再访问 Redis
+        entry = AccessKeyEntry.from_dict(data)
+        access_key_index.put(entry)
+        return entry
+
+    @staticmethod
+    def _from_db(access_key: AccessKey, user) -> AccessKeyEntry:
+        entry = AccessKeyEntry.from_model(access_key, user)
+        access_key_index.put(entry)
+        return entry
+
+    @staticmethod
+    def _access_key_query():
+        # 使用 JOIN 查询一次性获取 AccessKey 和 User
+        return select(AccessKey, User).outerjoin(
+            User, AccessKey.created_by == User.id
+        ).where(
+            AccessKey.deleted_at.is_(None)
+        ).limit(1)
+
+
+class DynamicIPRateLimiter(_IPRateLimiterBase):
+    """
+    同步限流器（兼容保留，会阻塞调用线程）
+    async 路由请使用 async_rate_limiter
+    不支持 hybrid_window（本地计数与批量同步依赖事件循环），按固定窗口限流
+    """
+    def __init__(self):
+        self._redis = None
+        self._scripts = {}  # 算法名 -> 已注册脚本
+        self._hybrid_warned = False
+
+    @property
+    def redis(self):
+        # 延迟连接，避免导入模块时阻塞
+        if self._redis is None:
+            self._redis = RedisPool.get_redis()
+        return self._redis
+
+    def enforce(self, request: Request):
+        """执行限流：用Token查QPS配置，对IP限流"""
+        # 后台管理预案放行
+        if hasattr(request.state, "user"):
+            return
+        # 获取客户端真实IP
+        ip = self._require_client_ip(request)
+        token = self._get_token(request)
+
+        # 获取该Token对应的IP限流配置和用户信息（优先查进程内索引）
+        entry = access_key_index.get(token) or self._get_access_key_info(token)
+        self._attach_state(request, token, ip, entry)
 
-        logger.info(f"IP: {ip}, Token: {token}, IP限流配置: {ip_limit}次/秒, User: {access_key_info['user'].username if access_key_info['user'] else 'Unknown'}")
-        
         # 对IP执行限流检查
-        if not self._check_ip_limit(ip, ip_limit):
-            raise APIException(f"IP请求超过限制（{ip_limit}次/秒）", status_code=429, code=429)
-            # raise HTTPException(
-            #     status_code=429,
-            #     detail=f"IP请求超过限制（{ip_limit}次/秒）",
-            #     headers={"Retry-After": "1"}
-            # )
-
-    def _get_access_key_info(self, token: str) -> dict:
+        self._apply_result(request, entry, self._check_ip_limit(ip, *entry.rate))
+
+    def _get_access_key_info(self, token: str) -> AccessKeyEntry:
         """根据Token获取AccessKey完整信息（包括用户信息），带Redis缓存优化"""
-        cache_key = f"access_key_full_info:{token}"
-        
+        cache_key = f"{ACCESS_KEY_CACHE_PREFIX}{token}"
+
         try:
             # 1. 先查 Redis 缓存（缓存完整信息）
             cached_data = self.redis.get(cache_key)
             if cached_data:
-                import json
-                data = json.loads(cached_data)
-                
-                # 检查是否是缓存的"不存在"结果（缓存穿透保护）
-                if data.get("error") == "not_found":
-                    logger.debug(f"Cache hit for invalid AccessKey: {token}")
-                    raise APIException("访问密钥无效", status_code=401, code=1)
-                
-                logger.debug(f"Cache hit for AccessKey: {token}")
-                
-                # 重建对象（简化版，只包含必要字段）
-                return {
-                    'max_qps': data['max_qps'],
-                    'access_key': type('AccessKey', (), data['access_key'])(),  # 简化对象
-                    'user': type('User', (), data['user'])() if data['user'] else None
-                }
-            
-            # 2. 缓存未命中，从数据库查询（使用 JOIN 一次性获取）
+                return self._from_cache(token, cached_data)
+
+            # 2. 缓存未命中，从数据库查询
             logger.debug(f"Cache miss for AccessKey: {token}, querying database")
             with SessionLocal() as db:
-                # 使用 JOIN 查询一次性获取 AccessKey 和 User
-                from sqlalchemy import join
-                
-                result = db.query(AccessKey, User).outerjoin(
-                    User, AccessKey.created_by == User.id
-                ).filter(
-                    AccessKey.secret_key == token,
-                    AccessKey.deleted_at.is_(None)
+                result = db.execute(
+                    self._access_key_query().where(AccessKey.secret_key == token)
                 ).first()
-                
+
                 if not result or not result[0]:
-                    # 缓存穿透保护：缓存"不存在"的结果，TTL 较短（10秒）
-                    import json
-                    self.redis.setex(cache_key, 10, json.dumps({"error": "not_found"}))
+                    self.redis.setex(cache_key, ACCESS_KEY_NOT_FOUND_TTL, json_codec.dumps_str({"error": "not_found"}))
                     logger.warning(f"Invalid AccessKey attempted: {token}")
                     raise APIException("访问密钥无效", status_code=401, code=1)
-                
-                access_key = result[0]
-                user = result[1] if result[1] and result[1].deleted_at is None else None
-                
-                # 3. 准备缓存数据（只缓存必要字段）
-                cache_data = {
-                    'max_qps': access_key.max_qps,
-                    'access_key': {
-                        'id': access_key.id,
-                        'secret_key': access_key.secret_key,
-                        'max_qps': access_key.max_qps,
-                        'created_by': access_key.created_by
-                    },
-                    'user': {
-                        'id': user.id,
-                        'username': user.username,
-                        'fixed': user.fixed
-                    } if user else None
-                }
-                
-                # 4. 写入 Redis 缓存（60秒过期）
-                import json
-                self.redis.setex(cache_key, 60, json.dumps(cache_data))
+
+                entry = self._from_db(result[0], result[1])
+
+                # 3. 写入 Redis 缓存（只缓存必要字段）
+                self.redis.setex(cache_key, ACCESS_KEY_CACHE_TTL, json_codec.dumps_str(entry.to_dict()))
                 logger.debug(f"Cached AccessKey info for: {token}")
-                
-                return {
-                    'max_qps': access_key.max_qps,
-                    'access_key': access_key,
-                    'user': user
-                }
-
-                
+
+                return entry
+
         except APIException:
             raise
         except Exception as e:
@@ -128,10 +161,11 @@ class DynamicIPRateLimiter:
 
     @classmethod
     def clear_access_key_cache(cls, secret_key: str):
-        """清除指定 AccessKey 的缓存（用于保持缓存一致性）"""
+        """清除指定 AccessKey 的缓存（用于保持缓存一致性），并通知各进程剔除索引"""
+        publish_access_key_invalidation(secret_key)
         try:
-            redis_client = cls().redis
-            cache_key = f"access_key_full_info:{secret_key}"
+            redis_client = RedisPool.get_redis()
+            cache_key = f"{ACCESS_KEY_CACHE_PREFIX}{secret_key}"
             result = redis_client.delete(cache_key)
             if result:
                 logger.info(f"Cleared cache for AccessKey: {secret_key}")
@@ -140,23 +174,123 @@ class DynamicIPRateLimiter:
             logger.error(f"Failed to clear cache for AccessKey {secret_key}: {e}")
             return False
 
+    def _check_ip_limit(self, ip: str, strategy_name: str, limit: int, period: int) -> RateLimitResult:
+        """检查IP是否超限（原子操作，EVALSHA）"""
+        if strategy_name == HYBRID_WINDOW:
+            if not self._hybrid_warned:
+                self._hybrid_warned = True
+                logger.warning(f"同步限流器不支持 {HYBRID_WINDOW}，按 {DEFAULT_STRATEGY} 限流（async_rate_limiter 支持）")
+            strategy_name = DEFAULT_STRATEGY
+        strategy = get_strategy(strategy_name)
+        script = self._scripts.get(strategy.name)
+        if script is None:
+            script = self._scripts[strategy.name] = self.redis.register_script(strategy.script)
+        raw = script(keys=[strategy.key(ip)], args=strategy.args(limit, period))
+        return strategy.parse(raw, limit)
 
-    def _check_ip_limit(self, ip: str, limit: int) -> bool:
-        """检查IP是否超限（原子操作）"""
-        key = f"ip_limit:{ip}"
-        lua_script = """
-        local current = redis.call('INCR', KEYS[1])
-        if current == 1 then
-            redis.call('EXPIRE', KEYS[1], 1)
-        end
-        return current <= tonumber(ARGV[1])
-        """
-        return bool(self.redis.eval(lua_script, 1, key, str(limit)))
 
-    def _get_client_ip(self, request: Request) -> str:
-        """获取真实IP（处理代理）"""
-        if "x-forwarded-for" in request.headers:
-            return request.headers["x-forwarded-for"].split(",")[0].strip()
-        return request.client.host or "0.0.0.0"
+class AsyncIPRateLimiter(_IPRateLimiterBase):
+    """
+    异步限流器：Redis 与数据库访问均不阻塞事件循环
+    - 作为依赖：dependencies=[Depends(async_rate_limiter)]
+    - 作为管道钩子：app.use(setup_rate_limit(("/api/open",)))
+    """
+    def __init__(self):
+        self._scripts = {}  # 算法名 -> 已注册脚本（只在本地计算 SHA，首次 NOSCRIPT 时才上传）
+
+    async def __call__(self, request: Request):
+        await self.enforce(request)
+
+    async def enforce(self, request: Request):
+        """执行限流：用Token查QPS配置，对IP限流"""
+        if hasattr(request.state, "user"):
+            return
+        ip = self._require_client_ip(request)
+        token = self._get_token(request)
+
+        redis_client = await RedisPool.get_async_redis()
+        entry = access_key_index.get(token) or await self._get_access_key_info(redis_client, token)
+        self._attach_state(request, token, ip, entry)
+
+        result = await self._check_ip_limit(redis_client, ip, *entry.rate)
+        self._apply_result(request, entry, result)
+
+    async def _get_access_key_info(self, redis_client, token: str) -> AccessKeyEntry:
+        """根据Token获取AccessKey完整信息（异步版本）"""
+        cache_key = f"{ACCESS_KEY_CACHE_PREFIX}{token}"
+
+        try:
+            cached_data = await redis_client.get(cache_key)
+            if cached_data:
+                return self._from_cache(token, cached_data)
+
+            logger.debug(f"Cache miss for AccessKey: {token}, querying database")
+            async with AsyncSessionLocal() as db:
+                result = (await db.execute(
+                    self._access_key_query().where(AccessKey.secret_key == token)
+                )).first()
+
+            if not result or not result[0]:
+                await redis_client.setex(cache_key, ACCESS_KEY_NOT_FOUND_TTL, json_codec.dumps_str({"error": "not_found"}))
+                logger.warning(f"Invalid AccessKey attempted: {token}")
+                raise APIException("访问密钥无效", status_code=401, code=1)
+
+            entry = self._from_db(result[0], result[1])
+
+            await redis_client.setex(cache_key, ACCESS_KEY_CACHE_TTL, json_codec.dumps_str(entry.to_dict()))
+            logger.debug(f"Cached AccessKey info for: {token}")
+
+            return entry
+
+        except APIException:
+            raise
+        except Exception as e:
+            logger.error(f"获取AccessKey信息失败：{e}")
+            raise APIException("访问密钥无效", status_code=401, code=1)
+
+    async def _check_ip_limit(self, redis_client, ip: str, strategy_name: str, limit: int, period: int) -> RateLimitResult:
+        """检查IP是否超限（原子操作，EVALSHA，NOSCRIPT 时自动重新加载）"""
+        if strategy_name == HYBRID_WINDOW:
+            return await hybrid_limiter.hit(redis_client, ip, limit, period)
+        strategy = get_strategy(strategy_name)
+        script = self._scripts.get(strategy.name)
+        if script is None:
+            script = self._scripts[strategy.name] = redis_client.register_script(strategy.script)
+        raw = await script(keys=[strategy.key(ip)], args=strategy.args(limit, period), client=redis_client)
+        return strategy.parse(raw, limit)
+
+
+def setup_rate_limit(path_prefixes: tuple = ()):
+    """
+    以管道钩子方式对指定路径前缀限流，并为限流过的请求输出 RateLimit-* 响应头
+    用法：app.use(setup_rate_limit(("/api/open",)))
+    只以依赖方式使用限流器时，app.use(setup_rate_limit()) 仅输出响应头
+    """
+    def plugin(app):
+        @app.on_event("shutdown")
+        async def flush_rate_limit_counters():
+            await hybrid_limiter.close()
+
+        if path_prefixes:
+            @app.pipeline.on_request
+            async def rate_limit_hook(ctx):
+                if not ctx.path.startswith(path_prefixes):
+                    return None
+                try:
+                    await async_rate_limiter.enforce(Request(ctx.scope))
+                except APIException as e:
+                    return StandResponse(status_code=e.status_code, content=e.detail, headers=e.headers)
+                return None
+
+        @app.pipeline.on_response_headers
+        def rate_limit_headers(ctx, headers):
+            result = ctx.scope.get("state", {}).get(RATE_LIMIT_STATE_KEY)
+            if result is not None and "ratelimit-limit" not in headers:
+                headers.update(result.headers())
+
+    return plugin
+
 
-rate_limiter = DynamicIPRateLimiter()
\ No newline at end of file
+# 兼容保留：同步单例
+rate_limiter = DynamicIPRateLimiter()
+async_rate_limiter = AsyncIPRateLimiter()
@@ -0,0 +1,26 @@
+"""
+请求级 SQL 查询统计
+每个请求开始时在 contextvar 中创建 QueryStats（放入 ctx.state["query_stats"]，访问日志输出查询数与耗时），
+请求结束时同一语句执行次数达到 DB_N_PLUS_ONE_THRESHOLD 则输出疑似 N+1 的警告
+"""
+from app.boot import logger
+from app.boot.pipeline import RequestContext
+from app.db.query_metrics import DB_QUERY_METRICS_ENABLED, start_request
+
+
+def setup_query_metrics(app):
+    """注册请求级查询统计（DB_QUERY_METRICS=0 时不注册）"""
+    if not DB_QUERY_METRICS_ENABLED:
+        return
+
+    @app.pipeline.on_request
+    async def start_query_stats(ctx: RequestContext):
+        ctx.state["query_stats"] = start_request()
+
+    @app.pipeline.on_complete
+    def warn_n_plus_one(ctx: RequestContext):
+        stats = ctx.state.get("query_stats")
+        if stats is None:
+            return
+        for statement, count in stats.n_plus_one():
+            logger.warning(f"⚠️  疑似 N+1 查询 {ctx.method} {ctx.path} - 执行 {count} 次: {statement}")
@@ -0,0 +1,389 @@
+"""
+限流算法
+每种算法是一段原子 Lua 脚本（一次 EVALSHA 往返），时间取自 Redis 的 TIME，
+多实例部署时不受各节点时钟偏差影响（需 Redis 5+ 的脚本效果复制）
+
+脚本统一返回 {allowed, remaining, reset_ms, retry_after_ms}
+
+hybrid_window 不走脚本：由 HybridWindowLimiter 在进程内预扣额度，批量同步到 Redis
+"""
+import asyncio
+import os
+import time
+from typing import Dict, Optional
+
+from app.boot import logger
+
+FIXED_WINDOW = "fixed_window"
+SLIDING_WINDOW = "sliding_window"
+GCRA = "gcra"
+TOKEN_BUCKET = "token_bucket"
+HYBRID_WINDOW = "hybrid_window"
+
+DEFAULT_STRATEGY = FIXED_WINDOW
+
+_NOW_MS = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+"""
+
+
+class RateLimitResult:
+    """单次限流判定结果"""
+    __slots__ = ("allowed", "limit", "remaining", "reset_ms", "retry_after_ms")
+
+    def __init__(self, allowed: bool, limit: int, remaining: int, reset_ms: int, retry_after_ms: int):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_ms = reset_ms
+        self.retry_after_ms = retry_after_ms
+
+    def headers(self) -> Dict[str, str]:
+        """IETF RateLimit 头，被拒绝时附带 Retry-After（秒，向上取整）"""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(-(-self.reset_ms // 1000)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, -(-self.retry_after_ms // 1000)))
+        return headers
+
+
+class RateLimitStrategy:
+    """限流算法基类：子类只需提供 name 和 Lua 脚本"""
+    name: str = ""
+    script: str = ""
+
+    def key(self, identity: str) -> str:
+        # 不同算法的数据结构不同，key 按算法隔离，切换算法时互不干扰
+        return f"ip_limit:{self.name}:{identity}"
+
+    def args(self, limit: int, period: int) -> list:
+        return [limit, period * 1000]
+
+    def parse(self, raw, limit: int) -> RateLimitResult:
+        allowed, remaining, reset_ms, retry_after_ms = (int(v) for v in raw)
+        return RateLimitResult(allowed == 1, limit, remaining, reset_ms, retry_after_ms)
+
+
+class FixedWindow(RateLimitStrategy):
+    """固定窗口计数：开销最小，窗口边界处最多放行 2 倍突发"""
+    name = FIXED_WINDOW
+    script = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local current = redis.call('INCR', KEYS[1])
+local ttl
+if current == 1 then
+    redis.call('PEXPIRE', KEYS[1], period)
+    ttl = period
+else
+    ttl = redis.call('PTTL', KEYS[1])
+    if ttl < 0 then
+        redis.call('PEXPIRE', KEYS[1], period)
+        ttl = period
+    end
+end
+if current <= limit then
+    return {1, limit - current, ttl, 0}
+end
+return {0, 0, ttl, ttl}
+"""
+
+
+class SlidingWindow(RateLimitStrategy):
+    """
+    滑动窗口计数：按上一窗口计数的剩余占比加权估算，
+    单个 hash 存 (窗口序号, 本窗口计数, 上窗口计数)，消除边界突发
+    """
+    name = SLIDING_WINDOW
+    script = _NOW_MS + """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local window = math.floor(now / period)
+local elapsed = now - window * period
+local state = redis.call('HMGET', KEYS[1], 'w', 'c', 'p')
+local w = tonumber(state[1])
+local cur = tonumber(state[2]) or 0
+local prev = tonumber(state[3]) or 0
+if w ~= window then
+    if w == window - 1 then prev = cur else prev = 0 end
+    cur = 0
+end
+local weight = (period - elapsed) / period
+local estimate = prev * weight + cur
+if estimate + 1 <= limit then
+    cur = cur + 1
+    redis.call('HSET', KEYS[1], 'w', window, 'c', cur, 'p', prev)
+    redis.call('PEXPIRE', KEYS[1], period * 2)
+    return {1, math.floor(limit - estimate - 1), period - elapsed, 0}
+end
+if w ~= window then
+    redis.call('HSET', KEYS[1], 'w', window, 'c', cur, 'p', prev)
+    redis.call('PEXPIRE', KEYS[1], period * 2)
+end
+local retry
+if cur + 1 > limit or prev == 0 then
+    retry = period - elapsed
+else
+    -- prev * (period - elapsed - t) / period + cur + 1 <= limit
+    retry = math.ceil(period - elapsed - (limit - cur - 1) * period / prev)
+end
+return {0, 0, period - elapsed, retry}
+"""
+
+
+class GCRAStrategy(RateLimitStrategy):
+    """
+    GCRA（通用信元速率算法）：只存一个理论到达时间 TAT，
+    平滑限速且允许一个周期内 limit 次的突发
+    """
+    name = GCRA
+    script = _NOW_MS + """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local interval = period / limit
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if now < allow_at then
+    return {0, 0, math.ceil(tat - now), math.ceil(allow_at - now)}
+end
+redis.call('SET', KEYS[1], new_tat, 'PX', math.ceil(new_tat - now))
+return {1, math.floor((now - allow_at) / interval), math.ceil(new_tat - now), 0}
+"""
+
+
+class TokenBucket(RateLimitStrategy):
+    """令牌桶：容量 limit，每周期补满，允许攒下的令牌一次性突发"""
+    name = TOKEN_BUCKET
+    script = _NOW_MS + """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local rate = limit / period
+local state = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = limit
+else
+    tokens = math.min(limit, tokens + math.max(0, now - ts) * rate)
+end
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], period)
+local reset = math.ceil((limit - tokens) / rate)
+if allowed == 1 then
+    return {1, math.floor(tokens), reset, 0}
+end
+return {0, 0, reset, math.ceil((1 - tokens) / rate)}
+"""
+
+
+STRATEGIES: Dict[str, RateLimitStrategy] = {
+    s.name: s for s in (FixedWindow(), SlidingWindow(), GCRAStrategy(), TokenBucket())
+}
+
+
+def get_strategy(name: Optional[str]) -> RateLimitStrategy:
+    """按名称获取算法，未配置或未知时回退为固定窗口"""
+    strategy = STRATEGIES.get(name or DEFAULT_STRATEGY)
+    if strategy is None:
+        logger.warning(f"未知的限流算法: {name}，使用 {DEFAULT_STRATEGY}")
+        strategy = STRATEGIES[DEFAULT_STRATEGY]
+    return strategy
+
+
+# 混合模式参数
+HYBRID_FLUSH_INTERVAL_MS = int(os.getenv("RATE_LIMIT_HYBRID_FLUSH_MS", "50"))       # 定时批量同步间隔
+HYBRID_FLUSH_BATCH = int(os.getenv("RATE_LIMIT_HYBRID_FLUSH_BATCH", "500"))        # 累计多少次本地放行立即同步
+HYBRID_MAX_STALENESS_MS = int(os.getenv("RATE_LIMIT_HYBRID_MAX_STALENESS_MS", "200"))  # 本地计数最长可信时间
+HYBRID_BUDGET_RATIO = float(os.getenv("RATE_LIMIT_HYBRID_BUDGET_RATIO", "0.1"))     # 每个进程可本地消耗的剩余额度比例
+
+
+class _HybridEntry:
+    """单个 (IP, 窗口) 的本地计数"""
+    __slots__ = ("key", "known", "pending", "synced_at", "expire_at_ms")
+
+    def __init__(self, key: str, now: float, expire_at_ms: int):
+        self.key = key
+        self.known = 0          # 最近一次同步得到的全局计数（含本进程已同步部分）
+        self.pending = 0        # 本地已放行、尚未写入 Redis 的次数
+        self.synced_at = now    # 新窗口从 0 开始，视为刚同步
+        self.expire_at_ms = expire_at_ms
+
+
+class HybridWindowLimiter:
+    """
+    本地预扣 + 批量同步的固定窗口限流
+    - 每个进程最多本地放行 (limit - 全局计数) * budget_ratio 次，之后或计数超过
+      max_staleness_ms 未同步时转为严格模式（INCRBY 一次往返）
+    - 本地计数每 flush_interval_ms 或累计 flush_batch 次时用一个 pipeline 批量 INCRBY
+    - 已知超限的窗口直接本地拒绝，不再访问 Redis
+    多进程下最多超发约 进程数 * limit * budget_ratio 次，budget_ratio=0 即完全严格
+    """
+
+    def __init__(self, flush_interval_ms: int = HYBRID_FLUSH_INTERVAL_MS, flush_batch: int = HYBRID_FLUSH_BATCH,
+                 max_staleness_ms: int = HYBRID_MAX_STALENESS_MS, budget_ratio: float = HYBRID_BUDGET_RATIO):
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_batch = flush_batch
+        self.max_staleness = max_staleness_ms / 1000
+        self.budget_ratio = budget_ratio
+        self._entries: Dict[str, _HybridEntry] = {}
+        self._pending_total = 0
+        self._redis = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_event: Optional[asyncio.Event] = None
+        self.decisions = 0
+        self.local_decisions = 0
+        self.strict_decisions = 0
+        self.flushes = 0
+        self.redis_commands = 0
+
+    def key(self, identity: str, period_ms: int, window: int) -> str:
+        return f"ip_limit:{HYBRID_WINDOW}:{identity}:{period_ms}:{window}"
+
+    def _ensure_flusher(self, redis_client):
+        # 在运行中的事件循环里延迟创建
+        self._redis = redis_client
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_event = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def hit(self, redis_client, identity: str, limit: int, period: int) -> RateLimitResult:
+        """判定一次请求"""
+        self._ensure_flusher(redis_client)
+        self.decisions += 1
+        period_ms = period * 1000
+        now_ms = int(time.time() * 1000)
+        now = time.monotonic()
+        window = now_ms // period_ms
+        reset_ms = (window + 1) * period_ms - now_ms
+        key = self.key(identity, period_ms, window)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _HybridEntry(key, now, (window + 2) * period_ms)
+
+        if now - entry.synced_at <= self.max_staleness:
+            # 计数已超限：窗口内只增不减，直接本地拒绝
+            if entry.known >= limit:
+                self.local_decisions += 1
+                return RateLimitResult(False, limit, 0, reset_ms, reset_ms)
+            if entry.pending < int((limit - entry.known) * self.budget_ratio):
+                entry.pending += 1
+                self._pending_total += 1
+                self.local_decisions += 1
+                if self._pending_total >= self.flush_batch:
+                    self._flush_event.set()
+                return RateLimitResult(True, limit, max(limit - entry.known - entry.pending, 0), reset_ms, 0)
+
+        # 严格模式：连同本地未同步的次数一起 INCRBY，以返回的全局计数为准
+        self.strict_decisions += 1
+        count = entry.pending + 1
+        self._pending_total -= entry.pending
+        entry.pending = 0
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.incrby(key, count)
+        pipe.pexpire(key, period_ms * 2)
+        self.redis_commands += 2
+        try:
+            total, _ = await pipe.execute()
+        except Exception:
+            # 与 flush() 一致：本地已放行的次数还给本地，本次请求不计入
+            entry.pending += count - 1
+            self._pending_total += count - 1
+            raise
+        entry.known = max(entry.known, int(total))
+        entry.synced_at = time.monotonic()
+        if total <= limit:
+            return RateLimitResult(True, limit, limit - int(total), reset_ms, 0)
+        return RateLimitResult(False, limit, 0, reset_ms, reset_ms)
+
+    async def flush(self):
+        """把本地计数批量写入 Redis，并清理已过期窗口"""
+        now_ms = int(time.time() * 1000)
+        dirty = []
+        for key, entry in list(self._entries.items()):
+            if entry.pending:
+                dirty.append((entry, entry.pending))
+                entry.pending = 0
+            elif entry.expire_at_ms <= now_ms:
+                del self._entries[key]
+        self._pending_total = 0
+        if not dirty or self._redis is None:
+            return
+
+        pipe = self._redis.pipeline(transaction=False)
+        for entry, count in dirty:
+            pipe.incrby(entry.key, count)
+            pipe.pexpire(entry.key, max(entry.expire_at_ms - now_ms, 1))
+        self.redis_commands += len(dirty) * 2
+        self.flushes += 1
+        try:
+            results = await pipe.execute()
+        except Exception as e:
+            # 写入失败时把次数还给本地，下次同步重试
+            logger.warning(f"限流计数批量同步失败: {e}")
+            for entry, count in dirty:
+                entry.pending += count
+                self._pending_total += count
+            return
+
+        synced_at = time.monotonic()
+        for (entry, _), total in zip(dirty, results[::2]):
+            entry.known = max(entry.known, int(total))
+            entry.synced_at = synced_at
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"限流计数同步任务异常: {e}")
+
+    async def close(self):
+        """停止定时同步并写入剩余计数"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    def get_stats(self) -> Dict:
+        """
+        获取当前统计信息
+
+        Returns:
+            dict: 判定次数、本地/严格判定占比、每次判定的 Redis 命令数等
+        """
+        return {
+            "entries": len(self._entries),
+            "pending": self._pending_total,
+            "decisions": self.decisions,
+            "local_decisions": self.local_decisions,
+            "strict_decisions": self.strict_decisions,
+            "flushes": self.flushes,
+            "redis_commands": self.redis_commands,
+            "redis_commands_per_decision": round(self.redis_commands / self.decisions, 4) if self.decisions else 0,
+        }
+
+
+hybrid_limiter = HybridWindowLimiter()
@@ -0,0 +1,244 @@
+"""
+Redis 连接池监控
+- 连接池：使用中/空闲/已创建连接数，签出连接耗时（含等待锁与新建连接），连接耗尽次数
+- 命令：按命令名统计耗时直方图与错误次数（pipeline 整体记为 PIPELINE）
+同步与异步连接池各一份，通过 RedisPool.get_stats() 和 /api/metrics 查看
+"""
+import os
+import time
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+REDIS_METRICS_ENABLED = os.getenv("REDIS_METRICS", "1").lower() in ("1", "true", "yes")
+
+# 直方图桶上界（毫秒），最后一个桶为 +Inf
+LATENCY_BUCKETS_MS = (0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class LatencyHistogram:
+    """固定桶耗时直方图，分位数取所在桶的上界"""
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def snapshot(self) -> Dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(LATENCY_BUCKETS_MS + ("+Inf",), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.quantile(0.5),
+            "p99_ms": self.quantile(0.99),
+            "buckets": buckets,  # 累计计数，键为桶上界（毫秒）
+        }
+
+
+class RedisPoolMetrics:
+    """单个连接池的监控数据（线程安全，同步连接池会在线程池中使用）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkout = LatencyHistogram()
+        self.commands: Dict[str, LatencyHistogram] = {}
+        self.errors: Dict[str, int] = {}
+        self.exhausted = 0  # 连接数达到上限导致签出失败的次数
+        self._lock = Lock()
+
+    def record_checkout(self, ms: float, error: Optional[BaseException] = None):
+        with self._lock:
+            self.checkout.observe(ms)
+            if error is not None:
+                if isinstance(error, redis.exceptions.MaxConnectionsError) or "Too many connections" in str(error):
+                    self.exhausted += 1
+                key = f"checkout:{type(error).__name__}"
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def record_command(self, command: str, ms: float, error: Optional[BaseException] = None):
+        with self._lock:
+            histogram = self.commands.get(command)
+            if histogram is None:
+                histogram = self.commands[command] = LatencyHistogram()
+            histogram.observe(ms)
+            if error is not None:
+                key = f"{command}:{type(error).__name__}"
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.checkout = LatencyHistogram()
+            self.commands.clear()
+            self.errors.clear()
+            self.exhausted = 0
+
+    def get_stats(self, pool=None) -> Dict:
+        """
+        获取当前统计信息
+
+        Returns:
+            dict: 连接使用情况（使用率与 healthy/warning/critical 状态）、
+                  签出耗时、各命令耗时直方图和错误次数
+        """
+        stats: Dict = {"pool": self.name}
+        if pool is not None and hasattr(pool, "_in_use_connections"):
+            in_use = len(pool._in_use_connections)
+            idle = len(pool._available_connections)
+            max_connections = pool.max_connections
+            usage_rate = in_use / max_connections if max_connections else 0
+            if usage_rate < 0.8:
+                status = "healthy"
+            elif usage_rate < 0.95:
+                status = "warning"
+            else:
+                status = "critical"
+            stats.update({
+                "in_use": in_use,
+                "idle": idle,
+                "created": in_use + idle,
+                "max_connections": max_connections,
+                "usage_rate": round(usage_rate * 100, 2),  # 转换为百分比
+                "status": status,
+            })
+        with self._lock:
+            stats.update({
+                "exhausted": self.exhausted,
+                "checkout": self.checkout.snapshot(),
+                "commands": {name: h.snapshot() for name, h in sorted(self.commands.items())},
+                "errors": dict(self.errors),
+            })
+        return stats
+
+
+def instrument_pool(pool, metrics: RedisPoolMetrics):
+    """包装连接池的 get_connection，记录签出耗时；客户端通过 pool._metrics 记录命令耗时"""
+    get_connection = pool.get_connection
+    pool._metrics = metrics
+
+    # redis-py 的 get_connection 带有弃用参数装饰器，不能用 iscoroutinefunction 判断
+    if isinstance(pool, aioredis.ConnectionPool):
+        async def timed_get_connection(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                connection = await get_connection(*args, **kwargs)
+            except Exception as e:
+                metrics.record_checkout((time.perf_counter() - start) * 1000, e)
+                raise
+            metrics.record_checkout((time.perf_counter() - start) * 1000)
+            return connection
+    else:
+        def timed_get_connection(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                connection = get_connection(*args, **kwargs)
+            except Exception as e:
+                metrics.record_checkout((time.perf_counter() - start) * 1000, e)
+                raise
+            metrics.record_checkout((time.perf_counter() - start) * 1000)
+            return connection
+
+    pool.get_connection = timed_get_connection
+    return pool
+
+
+def _command_name(args) -> str:
+    name = args[0] if args else "UNKNOWN"
+    return name.upper() if isinstance(name, str) else str(name)
+
+
+class InstrumentedRedis(redis.Redis):
+    """记录每条命令耗时的同步客户端（连接池需经 instrument_pool 处理）"""
+
+    def execute_command(self, *args, **options):
+        metrics = getattr(self.connection_pool, "_metrics", None)
+        if metrics is None:
+            return super().execute_command(*args, **options)
+        start = time.perf_counter()
+        try:
+            result = super().execute_command(*args, **options)
+        except Exception as e:
+            metrics.record_command(_command_name(args), (time.perf_counter() - start) * 1000, e)
+            raise
+        metrics.record_command(_command_name(args), (time.perf_counter() - start) * 1000)
+        return result
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        metrics = getattr(self.connection_pool, "_metrics", None)
+        if metrics is not None:
+            execute = pipe.execute
+
+            def timed_execute(raise_on_error: bool = True):
+                start = time.perf_counter()
+                try:
+                    result = execute(raise_on_error)
+                except Exception as e:
+                    metrics.record_command("PIPELINE", (time.perf_counter() - start) * 1000, e)
+                    raise
+                metrics.record_command("PIPELINE", (time.perf_counter() - start) * 1000)
+                return result
+            pipe.execute = timed_execute
+        return pipe
+
+
+class InstrumentedAsyncRedis(aioredis.Redis):
+    """记录每条命令耗时的异步客户端（连接池需经 instrument_pool 处理）"""
+
+    async def execute_command(self, *args, **options):
+        metrics = getattr(self.connection_pool, "_metrics", None)
+        if metrics is None:
+            return await super().execute_command(*args, **options)
+        start = time.perf_counter()
+        try:
+            result = await super().execute_command(*args, **options)
+        except Exception as e:
+            metrics.record_command(_command_name(args), (time.perf_counter() - start) * 1000, e)
+            raise
+        metrics.record_command(_command_name(args), (time.perf_counter() - start) * 1000)
+        return result
+
+    def pipeline(self, transaction: bool = True, shard_hint=None):
+        pipe = super().pipeline(transaction, shard_hint)
+        metrics = getattr(self.connection_pool, "_metrics", None)
+        if metrics is not None:
+            execute = pipe.execute
+
+            async def timed_execute(raise_on_error: bool = True):
+                start = time.perf_counter()
+                try:
+                    result = await execute(raise_on_error)
+                except Exception as e:
+                    metrics.record_command("PIPELINE", (time.perf_counter() - start) * 1000, e)
+                    raise
+                metrics.record_command("PIPELINE", (time.perf_counter() - start) * 1000)
+                return result
+            pipe.execute = timed_execute
+        return pipe
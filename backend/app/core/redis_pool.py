@@ -1,14 +1,106 @@
+import itertools
+import os
 import time
 import redis
+from collections import deque
 import asyncio  # 必须导入 asyncio
 import redis.asyncio as aioredis # 必须导入 aioredis
-from redis.connection import ConnectionPool # 同步连接池
+from redis.cache import CacheConfig
+from redis.connection import ConnectionPool, UnixDomainSocketConnection # 同步连接池
+from redis.sentinel import Sentinel, SentinelConnectionPool
+from redis.asyncio.sentinel import Sentinel as AsyncSentinel, SentinelConnectionPool as AsyncSentinelConnectionPool
 from app.boot import settings, logger  
-from typing import Dict, Set, AsyncGenerator,Optional
+from typing import Any, Callable, Deque, Dict, Iterable, List, Set, AsyncGenerator, Optional, Tuple
+from app.library import json as json_codec
+from app.core.redis_metrics import (
+    REDIS_METRICS_ENABLED, InstrumentedAsyncRedis, InstrumentedRedis, RedisPoolMetrics, instrument_pool,
+)
 from redis.asyncio import Redis
 
 # 频道名称，如果需要在其他地方使用，可以放到配置中
 subscribeChannel = "celery_task_updates"
+# Streams 传输使用的 stream key（与 subscribeChannel 可互换，见 RedisStreamManager）
+subscribeStream = "stream:celery_task_updates"
+
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", "10000"))  # XADD MAXLEN ~ 近似裁剪长度
+STREAM_READ_COUNT = int(os.getenv("STREAM_READ_COUNT", "100"))  # 每次 XREAD/XREADGROUP 最多读取条数
+STREAM_BLOCK_MS = int(os.getenv("STREAM_BLOCK_MS", "1000"))  # 阻塞读取超时（毫秒）
+STREAM_REPLAY_LIMIT = int(os.getenv("STREAM_REPLAY_LIMIT", "1000"))  # Last-Event-ID 最多补发条数
+
+PUBLISH_BUFFER_SIZE = int(os.getenv("PUBLISH_BUFFER_SIZE", "100"))  # 缓冲发布攒满多少条立即发出
+PUBLISH_BUFFER_DELAY_MS = int(os.getenv("PUBLISH_BUFFER_DELAY_MS", "5"))  # 缓冲发布最长等待（毫秒）
+
+def redis_connection_kwargs(config=None, asynchronous: bool = False) -> dict:
+    """
+    单机/哨兵模式的连接参数（不含地址），来自 RedisConfig
+    开启 client_cache 时同步连接使用 RESP3 + CLIENT TRACKING，读命令命中进程内缓存
+    （redis-py 的异步客户端暂不支持客户端缓存，异步路径依赖各自的进程内 L1 缓存）
+    """
+    config = config or settings.redis
+    kwargs = dict(
+        password=config.password or None,
+        db=config.db,
+        decode_responses=True,
+        socket_timeout=config.socket_timeout or None,
+        socket_connect_timeout=config.socket_connect_timeout,
+        health_check_interval=config.health_check_interval,
+        retry_on_timeout=True,
+    )
+    if not config.unix_socket:
+        kwargs["socket_keepalive"] = True
+    if config.client_cache and not asynchronous:
+        kwargs["protocol"] = 3
+        kwargs["cache_config"] = CacheConfig(max_size=config.client_cache_size)
+    return kwargs
+
+
+def _cluster_kwargs(config, asynchronous: bool) -> dict:
+    kwargs = redis_connection_kwargs(config, asynchronous)
+    kwargs.pop("db")  # 集群只有 db 0
+    kwargs.pop("retry_on_timeout")
+    kwargs["max_connections"] = config.max_connections  # 每个节点的连接上限
+    return kwargs
+
+
+def build_sync_pool(config=None):
+    """按部署形态创建同步连接池；集群模式返回 RedisCluster 客户端（按节点各自维护连接池）"""
+    config = config or settings.redis
+    if config.mode == "cluster":
+        nodes = [redis.cluster.ClusterNode(host, port) for host, port in config.cluster_startup_nodes]
+        return redis.RedisCluster(startup_nodes=nodes, **_cluster_kwargs(config, False))
+    kwargs = redis_connection_kwargs(config)
+    if config.mode == "sentinel":
+        sentinel = Sentinel(config.sentinel_nodes, sentinel_kwargs={
+            "password": config.sentinel_password or None,
+            "socket_timeout": config.socket_connect_timeout,
+        })
+        return SentinelConnectionPool(config.sentinel_master, sentinel, max_connections=config.max_connections, **kwargs)
+    if config.unix_socket:
+        return ConnectionPool(connection_class=UnixDomainSocketConnection, path=config.unix_socket,
+                              max_connections=config.max_connections, **kwargs)
+    return ConnectionPool(host=config.host, port=config.port, max_connections=config.max_connections, **kwargs)
+
+
+def build_async_pool(config=None):
+    """按部署形态创建异步连接池；集群模式返回 redis.asyncio.RedisCluster 客户端"""
+    config = config or settings.redis
+    if config.mode == "cluster":
+        from redis.asyncio.cluster import ClusterNode
+        nodes = [ClusterNode(host, port) for host, port in config.cluster_startup_nodes]
+        return aioredis.RedisCluster(startup_nodes=nodes, **_cluster_kwargs(config, True))
+    kwargs = redis_connection_kwargs(config, asynchronous=True)
+    if config.mode == "sentinel":
+        sentinel = AsyncSentinel(config.sentinel_nodes, sentinel_kwargs={
+            "password": config.sentinel_password or None,
+            "socket_timeout": config.socket_connect_timeout,
+        })
+        return AsyncSentinelConnectionPool(config.sentinel_master, sentinel,
+                                           max_connections=config.max_connections, **kwargs)
+    if config.unix_socket:
+        return aioredis.ConnectionPool(connection_class=aioredis.UnixDomainSocketConnection, path=config.unix_socket,
+                                       max_connections=config.max_connections, **kwargs)
+    return aioredis.ConnectionPool(host=config.host, port=config.port, max_connections=config.max_connections, **kwargs)
+
 
 class RedisPool:
     # 静态变量，用于存储同步Redis连接池
@@ -19,6 +111,15 @@ class RedisPool:
     _async_init_lock = None 
 
     _pubsub_manager = None
+    _stream_manager = None
+    _buffered_publisher = None
+
+    # 连接池监控（集群客户端按节点维护连接池，不做统计）
+    _sync_metrics = RedisPoolMetrics("sync")
+    _async_metrics = RedisPoolMetrics("async")
+
+    # 集群模式下专用订阅连接轮换使用的启动节点序号
+    _dedicated_node_counter = itertools.count()
 
     # 私有构造函数，防止外部直接实例化，因为我们使用类方法来管理单例连接池
     def __init__(self):
@@ -35,24 +136,12 @@ class RedisPool:
             for attempt in range(max_retries):
                 try:
                     logger.info(f"正在初始化同步Redis连接池... (尝试 {attempt + 1}/{max_retries})")
-                    logger.info(f"Redis配置: host={settings.redis.host}, port={settings.redis.port}")
+                    logger.info(f"Redis配置: {settings.redis.mode} {settings.redis.address}")
                     
-                    cls._sync_pool_instance = ConnectionPool(
-                        host=settings.redis.host,
-                        port=settings.redis.port,
-                        password=settings.redis.password if settings.redis.password else None,
-                        decode_responses=True,
-                        db=0,
-                        max_connections=100,
-                        socket_connect_timeout=5,
-                        socket_keepalive=True,
-                        health_check_interval=30,
-                        retry_on_timeout=True
-                    )
+                    cls._sync_pool_instance = cls._instrument(build_sync_pool(), cls._sync_metrics)
                     
                     # 测试连接
-                    test_client = redis.Redis(connection_pool=cls._sync_pool_instance)
-                    test_client.ping()
+                    cls._sync_client().ping()
                     logger.info("✓ 同步Redis连接池初始化成功并测试连接正常")
                     return
                     
@@ -65,8 +154,22 @@ class RedisPool:
                         time.sleep(retry_delay)
                         retry_delay *= 2  # 指数退避
                     else:
-                        logger.critical(f"Redis 连接池初始化失败，已达到最大重试次数！配置: host={settings.redis.host}, port={settings.redis.port}")
-                        raise ConnectionError(f"无法连接到 Redis: host={settings.redis.host}, port={settings.redis.port}")
+                        logger.critical(f"Redis 连接池初始化失败，已达到最大重试次数！配置: {settings.redis.address}")
+                        raise ConnectionError(f"无法连接到 Redis: {settings.redis.address}")
+
+    @staticmethod
+    def _instrument(pool, metrics: RedisPoolMetrics):
+        if REDIS_METRICS_ENABLED and not isinstance(pool, (redis.RedisCluster, aioredis.RedisCluster)):
+            instrument_pool(pool, metrics)
+        return pool
+
+    @classmethod
+    def _sync_client(cls):
+        pool = cls._sync_pool_instance
+        if isinstance(pool, redis.RedisCluster):
+            return pool
+        client_class = InstrumentedRedis if REDIS_METRICS_ENABLED else redis.Redis
+        return client_class(connection_pool=pool)
 
     @classmethod
     def get_redis(cls):
@@ -79,10 +182,10 @@ class RedisPool:
         if cls._sync_pool_instance is None:
             raise ConnectionError(
                 f"Redis 连接池未初始化！无法获取 Redis 客户端。"
-                f"配置: host={settings.redis.host}, port={settings.redis.port}"
+                f"配置: {settings.redis.address}"
             )
         
-        return redis.Redis(connection_pool=cls._sync_pool_instance)
+        return cls._sync_client()
 
     @classmethod
     async def _initialize_async_pool_instance(cls):
@@ -96,12 +199,8 @@ class RedisPool:
         
         async with cls._async_init_lock: # 使用异步锁确保只初始化一次
             if cls._async_pool_instance is None:
-                cls._async_pool_instance = aioredis.ConnectionPool.from_url(
-                    f"redis://:{settings.redis.password}@{settings.redis.host}:{settings.redis.port}/0",
-                    max_connections=100,
-                    decode_responses=True
-                )
-                logger.info("Asynchronous Redis pool initialized.")
+                cls._async_pool_instance = cls._instrument(build_async_pool(), cls._async_metrics)
+                logger.info(f"Asynchronous Redis pool initialized: {settings.redis.mode} {settings.redis.address}")
 
     @classmethod
     async def get_async_redis(cls):
@@ -111,7 +210,111 @@ class RedisPool:
         """
         if cls._async_pool_instance is None:
             await cls._initialize_async_pool_instance() # 异步初始化，这里必须 await
-        return aioredis.Redis(connection_pool=cls._async_pool_instance)
+        pool = cls._async_pool_instance
+        if isinstance(pool, aioredis.RedisCluster):
+            return pool
+        client_class = InstrumentedAsyncRedis if REDIS_METRICS_ENABLED else aioredis.Redis
+        return client_class(connection_pool=pool)
+
+    @classmethod
+    def create_dedicated_client(cls, cluster_aware: bool = False) -> Redis:
+        """
+        创建不占用共享连接池的异步客户端（订阅、阻塞读取专用，不设读超时）
+        集群模式下普通 pub/sub 会广播到所有节点，连接任一启动节点即可：每次调用轮换到下一个启动节点，
+        订阅连接断开重连时不会一直依赖同一个节点（分片订阅不支持集群，见 RedisConfig.pubsub_sharded）；
+        cluster_aware=True 时返回 RedisCluster（如 Streams 的 key 分布在不同节点）
+        """
+        config = settings.redis
+        if config.mode == "cluster":
+            if cluster_aware:
+                return build_async_pool(config)
+            nodes = config.cluster_startup_nodes
+            host, port = nodes[next(cls._dedicated_node_counter) % len(nodes)]
+            kwargs = _cluster_kwargs(config, True)
+            kwargs.pop("max_connections")
+            return aioredis.Redis(host=host, port=port, **{**kwargs, "socket_timeout": None})
+        kwargs = redis_connection_kwargs(config, asynchronous=True)
+        kwargs["socket_timeout"] = None
+        if config.mode == "sentinel":
+            sentinel = AsyncSentinel(config.sentinel_nodes, sentinel_kwargs={
+                "password": config.sentinel_password or None,
+                "socket_timeout": config.socket_connect_timeout,
+            })
+            return sentinel.master_for(config.sentinel_master, **kwargs)
+        if config.unix_socket:
+            return aioredis.Redis(unix_socket_path=config.unix_socket, **kwargs)
+        return aioredis.Redis(host=config.host, port=config.port, **kwargs)
+
+    @classmethod
+    def get_client_cache_stats(cls) -> Dict:
+        """RESP3 客户端缓存状态（仅同步单机/哨兵连接池）"""
+        cache = getattr(cls._sync_pool_instance, "cache", None)
+        if cache is None:
+            return {"enabled": False}
+        return {"enabled": True, "size": cache.size, "max_size": settings.redis.client_cache_size}
+
+    @classmethod
+    def get_stats(cls) -> Dict:
+        """
+        获取连接池统计信息
+
+        Returns:
+            dict: 同步/异步连接池的使用情况、签出耗时、命令耗时直方图、错误次数，以及客户端缓存状态
+        """
+        return {
+            "mode": settings.redis.mode,
+            "metrics_enabled": REDIS_METRICS_ENABLED,
+            "sync": cls._sync_metrics.get_stats(cls._sync_pool_instance),
+            "async": cls._async_metrics.get_stats(cls._async_pool_instance),
+            "client_cache": cls.get_client_cache_stats(),
+        }
+
+    @classmethod
+    def warm_sync_pool(cls, min_idle: int) -> int:
+        """
+        预先建立 min_idle 个同步连接并放回连接池（阻塞，启动时放到线程中执行）
+        返回连接池中的空闲连接数
+        """
+        cls._initialize_sync_pool()
+        pool = cls._sync_pool_instance
+        if isinstance(pool, redis.RedisCluster):
+            return 0  # 集群按节点维护连接池，首次访问各节点时建立
+        connections = [pool.get_connection() for _ in range(min_idle)]
+        for connection in connections:
+            pool.release(connection)
+        return len(pool._available_connections)
+
+    @classmethod
+    async def warm_async_pool(cls, min_idle: int) -> int:
+        """预先建立 min_idle 个异步连接并放回连接池，返回连接池中的空闲连接数"""
+        if cls._async_pool_instance is None:
+            await cls._initialize_async_pool_instance()
+        pool = cls._async_pool_instance
+        if isinstance(pool, aioredis.RedisCluster):
+            await pool.initialize()
+            return 0
+        connections = [await pool.get_connection() for _ in range(min_idle)]
+        for connection in connections:
+            await pool.release(connection)
+        return len(pool._available_connections)
+
+    @classmethod
+    async def close_pools(cls):
+        """断开并丢弃同步/异步连接池（用于应用退出时），之后再次使用会重新创建"""
+        if cls._async_pool_instance is not None:
+            try:
+                pool = cls._async_pool_instance
+                await (pool.aclose() if isinstance(pool, aioredis.RedisCluster) else pool.disconnect())
+            except Exception as e:
+                logger.error(f"关闭异步Redis连接池错误: {e}")
+            cls._async_pool_instance = None
+        if cls._sync_pool_instance is not None:
+            try:
+                pool = cls._sync_pool_instance
+                pool.close() if isinstance(pool, redis.RedisCluster) else pool.disconnect()
+            except Exception as e:
+                logger.error(f"关闭同步Redis连接池错误: {e}")
+            cls._sync_pool_instance = None
 
     @classmethod
     def publish(cls, channel: str, message: str):
@@ -120,7 +323,10 @@ class RedisPool:
         这个方法是同步的。
         """
         r = cls.get_redis() # 获取同步 Redis 客户端
-        result = r.publish(channel, message) # 直接调用同步 publish 方法
+        if use_spublish(channel):
+            result = r.spublish(channel, message)
+        else:
+            result = r.publish(channel, message) # 直接调用同步 publish 方法
         logger.debug(f"Published message to channel {channel}, {result} subscribers")
 
     @classmethod
@@ -131,73 +337,70 @@ class RedisPool:
         """
         try:
             r = await cls.get_async_redis() # 获取异步 Redis 客户端，这里必须 await
-            logger.info(f"异步发布消息到频道 {channel}: {message}")
-            await r.publish(channel, message) # 调用异步 publish 方法，这里必须 await
+            logger.debug(f"异步发布消息到频道 {channel}")
+            if use_spublish(channel):
+                await r.spublish(channel, message)
+            else:
+                await r.publish(channel, message) # 调用异步 publish 方法，这里必须 await
         except Exception as e:
             logger.error(f"异步发布消息到频道 {channel} 失败: {e}")
             raise # 重新抛出异常，以便Celery或上层捕获
 
+    @staticmethod
+    def _queue_publish(pipe, messages: Iterable[Tuple[str, str]]):
+        for channel, message in messages:
+            if use_spublish(channel):
+                pipe.spublish(channel, message)
+            else:
+                pipe.publish(channel, message)
+
+    @classmethod
+    def publish_many(cls, messages: Iterable[Tuple[str, str]]) -> List[int]:
+        """
+        同步批量发布 [(频道, 消息), ...]，所有消息通过一个 pipeline 一次往返发出
+        返回每条消息的接收者数量
+        """
+        pipe = cls.get_redis().pipeline(transaction=False)
+        cls._queue_publish(pipe, messages)
+        results = pipe.execute()
+        logger.debug(f"Published {len(results)} messages in one pipeline")
+        return results
+
+    @classmethod
+    async def async_publish_many(cls, messages: Iterable[Tuple[str, str]]) -> List[int]:
+        """异步批量发布 [(频道, 消息), ...]，一次往返"""
+        r = await cls.get_async_redis()
+        pipe = r.pipeline(transaction=False)
+        cls._queue_publish(pipe, messages)
+        results = await pipe.execute()
+        logger.debug(f"异步批量发布 {len(results)} 条消息")
+        return results
+
+    @classmethod
+    def get_buffered_publisher(cls) -> "BufferedPublisher":
+        """获取进程内共享的缓冲发布器（须在事件循环中使用）"""
+        if cls._buffered_publisher is None or cls._buffered_publisher.closed:
+            cls._buffered_publisher = BufferedPublisher()
+        return cls._buffered_publisher
+
+    @classmethod
+    async def close_buffered_publisher(cls):
+        """发出缓冲区中剩余的消息并关闭（用于应用退出时）"""
+        if cls._buffered_publisher:
+            await cls._buffered_publisher.close()
+
     @classmethod
     async def async_listen(cls, channel: str):
         """
         异步监听 Redis 频道消息。
-        此方法必须在异步上下文中被 await 调用。
+        委托给共享的订阅管理器：所有连接共用一个订阅连接，心跳由共享时间轮驱动
         """
-        r = None
-        pubsub = None
-        try:
-            r = await cls.get_async_redis()
-            pubsub = r.pubsub()
-            await pubsub.subscribe(channel)
-            last_active = time.time()
-            
-            # 发送初始心跳
-            yield {"event": "heartbeat", "data": "ping"}
-            
-            while True:
-                try:
-                    message = await asyncio.wait_for(
-                        pubsub.get_message(ignore_subscribe_messages=True),
-                        timeout=1.0  # 1秒超时
-                    )
-                    
-                    if message is not None:
-                        last_active = time.time()
-                        logger.info(f"从频道 {channel} 接收到消息: {message}")
-                        yield message['data']
-                    else:
-                        # 每15秒发送一次心跳（避免代理超时）
-                        if time.time() - last_active > 15:
-                            last_active = time.time()
-                            yield {"event": "heartbeat", "data": "ping"}
-                            
-                except asyncio.TimeoutError:
-                    # 定期检查连接状态
-                    if time.time() - last_active > 15:
-                        last_active = time.time()
-                        yield {"event": "heartbeat", "data": "ping"}
-                    continue
-                except asyncio.CancelledError:
-                    logger.info(f"Redis listen cancelled for channel {channel}")
-                    break
-                except Exception as e:
-                    logger.error(f"Redis listen error for channel {channel}: {e}")
-                    # 在错误时等待一下再继续
-                    await asyncio.sleep(1)
-                    continue
-                    
-                await asyncio.sleep(0.1)  # 避免CPU空转
-                
-        except Exception as e:
-            logger.error(f"Redis async_listen setup error: {e}")
-        finally:
-            # 清理资源
-            if pubsub:
-                try:
-                    await pubsub.unsubscribe(channel)
-                    await pubsub.close()
-                except Exception as e:
-                    logger.error(f"Error closing pubsub: {e}")
+        manager = await cls.get_pubsub_manager()
+        async for message in manager.listen(channel):
+            # 兼容旧格式：不输出 init 事件，首条为心跳
+            if isinstance(message, dict) and message.get("event") == "init":
+                continue
+            yield message
 
     @classmethod
     async def get_pubsub_manager(cls):
@@ -208,12 +411,13 @@ class RedisPool:
         return cls._pubsub_manager
     
     @classmethod
-    async def async_listen_pubsub(cls, channel: str):
+    async def async_listen_pubsub(cls, channel: str, **options):
         """
         使用单例模式监听频道
+        options 透传给 RedisPubSubManager.listen（maxsize / policy / coalesce_key）
         """
         manager = await cls.get_pubsub_manager()
-        async for message in manager.listen(channel):
+        async for message in manager.listen(channel, **options):
             yield message
 
     @classmethod
@@ -222,16 +426,399 @@ class RedisPool:
         if cls._pubsub_manager:
             await cls._pubsub_manager.stop()
 
+    @classmethod
+    def publish_stream(cls, stream: str, message: str, maxlen: int = STREAM_MAXLEN) -> str:
+        """
+        同步追加消息到 Redis Stream（XADD MAXLEN ~），返回消息 ID
+        消息会保留在 stream 中，断线重连的消费者可以补读
+        """
+        r = cls.get_redis()
+        entry_id = r.xadd(stream, {"data": message}, maxlen=maxlen, approximate=True)
+        logger.debug(f"Appended message to stream {stream}: {entry_id}")
+        return entry_id
+
+    @classmethod
+    async def async_publish_stream(cls, stream: str, message: str, maxlen: int = STREAM_MAXLEN) -> str:
+        """异步追加消息到 Redis Stream（XADD MAXLEN ~），返回消息 ID"""
+        r = await cls.get_async_redis()
+        return await r.xadd(stream, {"data": message}, maxlen=maxlen, approximate=True)
+
+    @classmethod
+    async def get_stream_manager(cls):
+        """获取单例 Streams 分发管理器"""
+        if cls._stream_manager is None:
+            cls._stream_manager = RedisStreamManager()
+        return cls._stream_manager
+
+    @classmethod
+    async def async_listen_stream(cls, stream: str, **options):
+        """
+        监听 stream，接口与 async_listen_pubsub 一致
+        options 透传给 RedisStreamManager.listen（last_event_id / group / consumer / maxsize / policy 等）
+        """
+        manager = await cls.get_stream_manager()
+        async for message in manager.listen(stream, **options):
+            yield message
+
+    @classmethod
+    async def close_stream_manager(cls):
+        """关闭 Streams 分发管理器（用于应用退出时）"""
+        if cls._stream_manager:
+            await cls._stream_manager.stop()
+
+class BufferedPublisher:
+    """
+    缓冲发布：publish() 只写入本地缓冲区，最多等待 max_delay_ms 或攒满 max_items 条后
+    通过一个 pipeline 发出（RedisPool.async_publish_many），批量状态更新只需一次往返
+    - flush()：立即发出缓冲区并等待完成
+    - close()：发出剩余消息，之后再 publish 抛出 RuntimeError
+    发送失败只记录日志和计数，不影响调用方
+    """
+
+    def __init__(self, max_items: int = PUBLISH_BUFFER_SIZE, max_delay_ms: int = PUBLISH_BUFFER_DELAY_MS):
+        self.max_items = max_items
+        self.max_delay = max_delay_ms / 1000
+        self.closed = False
+        self._buffer: List[Tuple[str, str]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.flushes = 0
+        self.errors = 0
+
+    def publish(self, channel: str, message: str):
+        """写入缓冲区（不等待网络）"""
+        if self.closed:
+            raise RuntimeError("BufferedPublisher 已关闭")
+        self._buffer.append((channel, message))
+        if len(self._buffer) >= self.max_items:
+            self._start_flush()
+        elif self._timer is None and self._task is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._start_flush)
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._drain())
+
+    async def _drain(self):
+        """持续发送直到缓冲区为空（发送期间新写入的消息在下一批发出）"""
+        try:
+            while self._buffer:
+                batch, self._buffer = self._buffer, []
+                try:
+                    await RedisPool.async_publish_many(batch)
+                    self.published += len(batch)
+                except Exception as e:
+                    self.errors += len(batch)
+                    logger.error(f"批量发布 {len(batch)} 条消息失败: {e}")
+                self.flushes += 1
+        finally:
+            self._task = None
+
+    async def flush(self):
+        """立即发出缓冲区中的消息并等待完成"""
+        if self._buffer:
+            self._start_flush()
+        task = self._task
+        if task is not None:
+            await asyncio.shield(task)
+
+    async def close(self):
+        self.closed = True
+        await self.flush()
+
+    def get_stats(self) -> Dict:
+        return {
+            "buffered": len(self._buffer),
+            "published": self.published,
+            "flushes": self.flushes,
+            "errors": self.errors,
+        }
+
+
+# 消费者队列满时的背压策略
+BACKPRESSURE_DROP_NEWEST = "drop_newest"  # 丢弃新消息（默认，与旧行为一致）
+BACKPRESSURE_DROP_OLDEST = "drop_oldest"  # 丢弃最旧的消息，保留最新的
+BACKPRESSURE_COALESCE = "coalesce"        # 同一 key（默认 task_uuid）只保留最新一条，满时丢弃最旧
+BACKPRESSURE_DISCONNECT = "disconnect"    # 断开慢消费者，由客户端重连
+BACKPRESSURE_POLICIES = (BACKPRESSURE_DROP_NEWEST, BACKPRESSURE_DROP_OLDEST, BACKPRESSURE_COALESCE, BACKPRESSURE_DISCONNECT)
+
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "100"))
+PUBSUB_BACKPRESSURE = os.getenv("PUBSUB_BACKPRESSURE", BACKPRESSURE_DROP_NEWEST)
+# 以这些前缀开头的频道不单独 SUBSCRIBE，而是共用一个 PSUBSCRIBE "<前缀>*"，如 "task:"
+PUBSUB_PATTERN_PREFIXES = tuple(p for p in os.getenv("PUBSUB_PATTERN_PREFIXES", "").split(",") if p)
+# 普通频道改用 Redis 7 分片订阅（SSUBSCRIBE / SPUBLISH），见 RedisConfig.pubsub_sharded
+PUBSUB_SHARDED = settings.redis.pubsub_sharded
+
+
+class PrefixIndex:
+    """前缀字典树：查找频道名匹配的最长已注册前缀"""
+    __slots__ = ("_root",)
+    _END = ""  # 节点上的结束标记，值为完整前缀
+
+    def __init__(self, prefixes=()):
+        self._root: dict = {}
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add(self, prefix: str):
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[self._END] = prefix
+
+    def longest(self, name: str) -> Optional[str]:
+        node = self._root
+        found = node.get(self._END)
+        for char in name:
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(self._END, found)
+        return found
+
+
+_pattern_prefix_index = PrefixIndex(PUBSUB_PATTERN_PREFIXES)
+
+
+def use_spublish(channel: str) -> bool:
+    """发布方与订阅方一致：分片模式下，未被前缀模式覆盖的频道用 SPUBLISH"""
+    return PUBSUB_SHARDED and _pattern_prefix_index.longest(channel) is None
+
+
+# Subscription.put 的投递结果
+DELIVERED = 0
+COALESCED = 1
+DROPPED = 2
+DISCONNECTED = 3
+
+
+def task_uuid_key(data) -> Optional[str]:
+    """合并策略的默认 key：消息 JSON 中的 task_uuid，非 JSON 或不含该字段时不合并"""
+    if not isinstance(data, str) or '"task_uuid"' not in data:
+        return None
+    try:
+        message = json_codec.loads(data)
+    except json_codec.JSONDecodeError:
+        return None
+    return message.get("task_uuid") if isinstance(message, dict) else None
+
+
+HEARTBEAT = {"event": "heartbeat", "data": "ping"}
+
+
+class SubscriptionClosed(Exception):
+    """订阅已被关闭（如应用退出时结束 SSE 连接）"""
+
+
+class SlowConsumerError(SubscriptionClosed):
+    """disconnect 策略下消费者跟不上，订阅已被关闭"""
+
+
+class Subscription:
+    """
+    单个消费者的订阅：订阅的所有频道共用一个有界缓冲区
+    元素为 (频道, 消息)，消费者只需 await 一个 get()，空闲时不占 CPU
+    缓冲区满时按 policy 处理，内存占用不超过 maxsize 条
+    """
+    __slots__ = ("channels", "patterns", "maxsize", "policy", "coalesce_key", "closed", "last_active",
+                 "_buffer", "_pending", "_waiter", "_heartbeat_due", "_slot", "_close_error")
+
+    def __init__(self, channels, maxsize: int = PUBSUB_QUEUE_SIZE, policy: str = PUBSUB_BACKPRESSURE,
+                 coalesce_key: Callable[[Any], Optional[str]] = task_uuid_key, patterns=()):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"不支持的背压策略: {policy}")
+        self.channels = tuple(channels)
+        self.patterns = tuple(patterns)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.coalesce_key = coalesce_key
+        self.closed = False
+        self._buffer: Deque[list] = deque()  # [频道, 消息, 合并key]
+        self._pending: Dict[tuple, list] = {}  # (频道, 合并key) -> 缓冲区中的条目
+        self._waiter: Optional[asyncio.Future] = None
+        self.last_active = time.monotonic()  # 最近一次向消费者返回消息（含心跳）的时间
+        self._heartbeat_due = False
+        self._slot: Optional[int] = None  # 所在的心跳时间轮槽位
+        self._close_error: Optional[SubscriptionClosed] = None
+
+    def qsize(self) -> int:
+        return len(self._buffer)
+
+    def put(self, channel: Optional[str], data, key: Optional[str] = None) -> int:
+        """
+        非阻塞投递，返回 DELIVERED / COALESCED / DROPPED / DISCONNECTED
+        key 为合并 key（仅 coalesce 策略使用，可由调用方预先计算）
+        """
+        if self.closed:
+            return DROPPED
+        if key is not None and self.policy == BACKPRESSURE_COALESCE:
+            entry = self._pending.get((channel, key))
+            if entry is not None:
+                entry[1] = data  # 原位置替换为最新状态，不改变顺序
+                return COALESCED
+
+        result = DELIVERED
+        if len(self._buffer) >= self.maxsize:
+            if self.policy == BACKPRESSURE_DROP_NEWEST:
+                return DROPPED
+            if self.policy == BACKPRESSURE_DISCONNECT:
+                self.close()
+                return DISCONNECTED
+            self._forget(self._buffer.popleft())
+            result = DROPPED
+
+        entry = [channel, data, key]
+        self._buffer.append(entry)
+        if key is not None and self.policy == BACKPRESSURE_COALESCE:
+            self._pending[(channel, key)] = entry
+        self._wake()
+        return result
+
+    def prepend(self, channel: str, items: list):
+        """在队首插入更早的消息（历史补发），不受 maxsize 限制，条数由调用方控制"""
+        for data in reversed(items):
+            self._buffer.appendleft([channel, data, None])
+        if items:
+            self._wake()
+
+    def _forget(self, entry: list):
+        if entry[2] is not None:
+            self._pending.pop((entry[0], entry[2]), None)
+
+    def _wake(self):
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def heartbeat(self):
+        """标记需要心跳（不写队列），消费者下次 get() 在没有消息时返回 HEARTBEAT"""
+        self._heartbeat_due = True
+        self._wake()
+
+    def close(self, error: Optional[SubscriptionClosed] = None):
+        """关闭订阅，唤醒等待中的消费者；error 为消费者 get() 时抛出的异常，默认 SlowConsumerError"""
+        self.closed = True
+        self._close_error = error
+        self._buffer.clear()
+        self._pending.clear()
+        self._wake()
+
+    async def get(self):
+        """
+        等待下一条消息，返回 (频道, 消息)；需要心跳时返回 (None, HEARTBEAT)
+        订阅被关闭时抛出 SubscriptionClosed（消费者跟不上时为 SlowConsumerError）
+        """
+        while not self._buffer:
+            if self.closed:
+                raise self._close_error or SlowConsumerError(f"消费者跟不上频道{self.channels}的消息，已断开")
+            if self._heartbeat_due:
+                self._heartbeat_due = False
+                self.last_active = time.monotonic()
+                return None, HEARTBEAT
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        entry = self._buffer.popleft()
+        self._forget(entry)
+        self._heartbeat_due = False  # 有消息就不再需要心跳
+        self.last_active = time.monotonic()
+        return entry[0], entry[1]
+
+
+def fan_out(subscribers, channel: str, data, stats: list, message=None) -> int:
+    """
+    把一条消息放入各消费者的缓冲区，按投递结果累加 stats，返回丢弃/断开次数
+    message 为计算合并 key 用的原始消息（默认即 data），每个 key 函数只解析一次
+    """
+    if message is None:
+        message = data
+    keys = None
+    dropped = 0
+    for subscription in tuple(subscribers):
+        key = None
+        if subscription.policy == BACKPRESSURE_COALESCE:
+            if keys is None:
+                keys = {}
+            fn = subscription.coalesce_key
+            if fn in keys:
+                key = keys[fn]
+            else:
+                key = keys[fn] = fn(message)
+        result = subscription.put(channel, data, key)
+        stats[result] += 1
+        if result >= DROPPED:
+            dropped += 1
+    return dropped
+
+
+class HeartbeatWheel:
+    """
+    所有订阅共用的心跳时间轮
+    每个订阅按 last_active + interval 落在一个槽位，单个定时任务每 resolution 秒推进一次，
+    到期时只给整整 interval 内没有收到任何消息的订阅打心跳标记，其余的按实际到期时间重新入槽。
+    每个订阅每个周期最多被检查一次，与消息量无关
+    """
+
+    def __init__(self, interval: float, resolution: float = 1.0):
+        self.interval = interval
+        self.resolution = resolution
+        self._slots: Dict[int, Set[Subscription]] = {}
+        self._cursor = int(time.monotonic() / resolution)
+        self.sent = 0
+
+    def _schedule(self, subscription: Subscription, deadline: float):
+        slot = max(-int(-deadline // self.resolution), self._cursor + 1)  # 向上取整，且不早于下一个槽
+        subscription._slot = slot
+        bucket = self._slots.get(slot)
+        if bucket is None:
+            bucket = self._slots[slot] = set()
+        bucket.add(subscription)
+
+    def add(self, subscription: Subscription):
+        self._schedule(subscription, subscription.last_active + self.interval)
+
+    def remove(self, subscription: Subscription):
+        bucket = self._slots.get(subscription._slot)
+        if bucket is not None:
+            bucket.discard(subscription)
+            if not bucket:
+                del self._slots[subscription._slot]
+        subscription._slot = None
+
+    def tick(self, now: float):
+        """处理所有已到期的槽位"""
+        current = int(now / self.resolution)
+        while self._cursor < current:
+            self._cursor += 1
+            bucket = self._slots.pop(self._cursor, None)
+            if not bucket:
+                continue
+            for subscription in bucket:
+                if subscription.closed:
+                    continue
+                due = subscription.last_active + self.interval
+                if due <= now:
+                    subscription.heartbeat()
+                    self.sent += 1
+                    due = now + self.interval
+                self._schedule(subscription, due)
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._slots.values())
+
+
 class RedisPubSubManager:
     _instance = None
-    _redis_client: Optional[Redis] = None
-    _pubsub = None
-    _channel_queues: Dict[str, Set[asyncio.Queue]] = {}
-    _is_running = False
-    _worker_task = None
-    _reconnect_attempts = 0
     MAX_RECONNECT_ATTEMPTS = 5
     RECONNECT_DELAY = 3  # seconds
+    IDLE_CHECK_INTERVAL = 5.0  # 连续空闲多久做一次连接检查（秒）
+    HEARTBEAT_INTERVAL = 15  # seconds
 
     def __new__(cls):
         if cls._instance is None:
@@ -239,6 +826,33 @@ class RedisPubSubManager:
             logger.info("创建新的RedisPubSubManager单例实例")
         return cls._instance
 
+    def __init__(self):
+        # 单例重复构造时不重置状态
+        if getattr(self, "_initialized", False):
+            return
+        self._initialized = True
+        self._redis_client: Optional[Redis] = None
+        self._pubsub = None
+        self._channel_subscribers: Dict[str, Set[Subscription]] = {}
+        self._pattern_subscribers: Dict[str, Set[Subscription]] = {}  # 消费者自己订阅的模式
+        self._channel_owner: Dict[str, str] = {}  # 由前缀模式承载的频道 -> 模式
+        self._redis_patterns: Dict[str, int] = {}  # 已 PSUBSCRIBE 的模式 -> 引用数
+        self.pattern_prefixes = PrefixIndex(PUBSUB_PATTERN_PREFIXES)
+        self.sharded = PUBSUB_SHARDED
+        self._is_running = False
+        self._worker_task = None
+        self._reconnect_attempts = 0
+        self._has_channels: Optional[asyncio.Event] = None  # 有订阅时置位，分发器空闲时等待它而不是轮询
+        self._message_count = 0
+        self._dropped: Dict[str, int] = {}  # 上次汇总日志之后的丢弃数
+        self._channel_stats: Dict[str, list] = {}  # 频道 -> [投递, 合并, 丢弃, 断开]
+        self._heartbeats = HeartbeatWheel(self.HEARTBEAT_INTERVAL)
+        self._heartbeat_task = None
+
+    def _create_client(self) -> Redis:
+        """创建分发器专用的 Redis 连接"""
+        return RedisPool.create_dedicated_client()
+
     async def initialize(self):
         """初始化Redis连接（带重试机制）"""
         if self._redis_client is None or not await self._check_connection():
@@ -271,21 +885,17 @@ class RedisPubSubManager:
                         pass
 
                 # 创建新连接
-                self._redis_client = aioredis.Redis(
-                    host=settings.redis.host,
-                    port=settings.redis.port,
-                    password=settings.redis.password,
-                    decode_responses=True,
-                    socket_connect_timeout=5,
-                    socket_keepalive=True
-                )
+                self._redis_client = self._create_client()
                 self._pubsub = self._redis_client.pubsub()
 
-                # 重新订阅所有频道
-                if self._channel_queues:
-                    channels = list(self._channel_queues.keys())
-                    await self._pubsub.subscribe(*channels)
+                # 重新订阅所有频道和模式
+                channels = [c for c in self._channel_subscribers if c not in self._channel_owner]
+                if channels:
+                    await self._redis_subscribe(*channels)
                     logger.info(f"成功重新订阅频道: {channels}")
+                if self._redis_patterns:
+                    await self._pubsub.psubscribe(*self._redis_patterns)
+                    logger.info(f"成功重新订阅模式: {list(self._redis_patterns)}")
 
                 self._reconnect_attempts = 0
                 return
@@ -304,7 +914,11 @@ class RedisPubSubManager:
             logger.info("启动Redis PubSub消息分发工作器...")
             await self.initialize()
             self._is_running = True
+            self._has_channels = asyncio.Event()
+            if self._has_subscribers():
+                self._has_channels.set()
             self._worker_task = asyncio.create_task(self._message_distributor())
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_ticker())
             logger.info("Redis PubSub消息分发工作器已启动")
 
     async def stop(self):
@@ -312,6 +926,12 @@ class RedisPubSubManager:
         if self._is_running:
             logger.info("正在停止Redis PubSub消息分发工作器...")
             self._is_running = False
+            if self._heartbeat_task:
+                self._heartbeat_task.cancel()
+                try:
+                    await self._heartbeat_task
+                except asyncio.CancelledError:
+                    pass
             if self._worker_task:
                 self._worker_task.cancel()
                 try:
@@ -335,117 +955,169 @@ class RedisPubSubManager:
                 except Exception as e:
                     logger.error(f"关闭Redis客户端错误: {e}")
 
-    async def subscribe(self, *channels: str) -> Dict[str, asyncio.Queue]:
+    def close_subscriptions(self, reason: str = "服务正在关闭") -> int:
+        """关闭所有消费者的订阅，正在 listen 的生成器随之结束（应用退出前结束 SSE 连接）"""
+        subscriptions = set().union(*self._channel_subscribers.values(), *self._pattern_subscribers.values())
+        for subscription in subscriptions:
+            subscription.close(SubscriptionClosed(reason))
+        return len(subscriptions)
+
+    def _has_subscribers(self) -> bool:
+        return bool(self._channel_subscribers or self._pattern_subscribers)
+
+    async def _redis_subscribe(self, *channels: str):
+        if self.sharded:
+            await self._pubsub.execute_command("SSUBSCRIBE", *channels)
+        else:
+            await self._pubsub.subscribe(*channels)
+
+    async def _redis_unsubscribe(self, *channels: str):
+        if self.sharded:
+            await self._pubsub.execute_command("SUNSUBSCRIBE", *channels)
+        else:
+            await self._pubsub.unsubscribe(*channels)
+
+    async def _with_reconnect(self, action, *args):
+        """执行订阅命令，连接异常时重连后重试一次"""
+        try:
+            await action(*args)
+        except Exception as e:
+            logger.error(f"订阅{args}失败: {e}")
+            await self._reconnect()
+            await action(*args)
+
+    async def _acquire_pattern(self, pattern: str):
+        count = self._redis_patterns.get(pattern, 0)
+        self._redis_patterns[pattern] = count + 1
+        if count == 0:
+            logger.info(f"正在向Redis服务器订阅模式[{pattern}]...")
+            await self._with_reconnect(self._pubsub.psubscribe, pattern)
+
+    async def _release_pattern(self, pattern: str):
+        count = self._redis_patterns.get(pattern, 0) - 1
+        if count > 0:
+            self._redis_patterns[pattern] = count
+            return
+        self._redis_patterns.pop(pattern, None)
+        logger.info(f"模式[{pattern}]没有消费者了，正在取消Redis订阅...")
+        try:
+            await self._pubsub.punsubscribe(pattern)
+        except Exception as e:
+            logger.error(f"取消订阅模式[{pattern}]失败: {e}")
+
+    async def subscribe(self, *channels: str, patterns=(), maxsize: int = PUBSUB_QUEUE_SIZE,
+                        policy: str = PUBSUB_BACKPRESSURE,
+                        coalesce_key: Callable[[Any], Optional[str]] = task_uuid_key) -> Subscription:
         """
-        订阅一个或多个频道，返回每个频道的消息队列
-        同一个频道的多个消费者共享同一个Redis订阅
+        订阅一个或多个频道/模式，返回该消费者的订阅（全部合并到一个队列）
+        - 同一个频道/模式的多个消费者共享同一个Redis订阅
+        - 匹配 PUBSUB_PATTERN_PREFIXES 的频道（如 task:{uuid}）共用一个 PSUBSCRIBE，本地按频道名分发
+        - patterns 为 Redis glob 模式（如 "task:*"），收到的消息带实际频道名
+        policy 为队列满时的背压策略，见 BACKPRESSURE_*
         """
+        subscription = Subscription(channels, maxsize=maxsize, policy=policy, coalesce_key=coalesce_key,
+                                    patterns=patterns)
         await self.start()
-        queues = {}
 
-        for channel in channels:
-            if channel not in self._channel_queues:
-                logger.info(f"首次订阅频道[{channel}]，正在向Redis服务器发起订阅...")
-                self._channel_queues[channel] = set()
-                try:
-                    await self._pubsub.subscribe(channel)
+        for channel in subscription.channels:
+            if channel not in self._channel_subscribers:
+                self._channel_subscribers[channel] = set()
+                prefix = self.pattern_prefixes.longest(channel)
+                if prefix is not None:
+                    owner = self._channel_owner[channel] = f"{prefix}*"
+                    await self._acquire_pattern(owner)
+                else:
+                    logger.info(f"首次订阅频道[{channel}]，正在向Redis服务器发起订阅...")
+                    await self._with_reconnect(self._redis_subscribe, channel)
                     logger.info(f"频道[{channel}] Redis订阅成功")
-                except Exception as e:
-                    logger.error(f"订阅频道[{channel}]失败: {e}")
-                    await self._reconnect()
-                    await self._pubsub.subscribe(channel)
 
-            # 为这个消费者创建消息队列
-            queue = asyncio.Queue(maxsize=100)  # 限制队列大小防止内存溢出
-            self._channel_queues[channel].add(queue)
-            queues[channel] = queue
-            logger.info(f"新增频道[{channel}]的消费者，当前消费者数量: {len(self._channel_queues[channel])}")
+            self._channel_subscribers[channel].add(subscription)
+            logger.debug(f"新增频道[{channel}]的消费者，当前消费者数量: {len(self._channel_subscribers[channel])}")
+
+        for pattern in subscription.patterns:
+            if pattern not in self._pattern_subscribers:
+                self._pattern_subscribers[pattern] = set()
+                await self._acquire_pattern(pattern)
+            self._pattern_subscribers[pattern].add(subscription)
 
-        return queues
+        if self._has_subscribers():
+            self._has_channels.set()
+        self._heartbeats.add(subscription)
+        return subscription
 
-    async def unsubscribe(self, channel: str, queue: asyncio.Queue):
-        """取消订阅指定频道的指定队列"""
-        if channel in self._channel_queues and queue in self._channel_queues[channel]:
+    async def unsubscribe(self, subscription: Subscription):
+        """取消指定消费者的全部频道/模式订阅"""
+        self._heartbeats.remove(subscription)
+        for channel in subscription.channels:
+            subscribers = self._channel_subscribers.get(channel)
+            if not subscribers or subscription not in subscribers:
+                continue
             logger.debug(f"移除频道[{channel}]的一个消费者")
-            self._channel_queues[channel].remove(queue)
+            subscribers.remove(subscription)
 
             # 如果没有消费者了，取消Redis订阅
-            if not self._channel_queues[channel]:
+            if not subscribers:
+                del self._channel_subscribers[channel]
+                self._channel_stats.pop(channel, None)
+                owner = self._channel_owner.pop(channel, None)
+                if owner is not None:
+                    await self._release_pattern(owner)
+                    continue
                 logger.info(f"频道[{channel}]没有消费者了，正在取消Redis订阅...")
                 try:
-                    await self._pubsub.unsubscribe(channel)
+                    await self._redis_unsubscribe(channel)
                 except Exception as e:
                     logger.error(f"取消订阅频道[{channel}]失败: {e}")
-                del self._channel_queues[channel]
                 logger.info(f"频道[{channel}] Redis订阅已取消")
 
+        for pattern in subscription.patterns:
+            subscribers = self._pattern_subscribers.get(pattern)
+            if not subscribers or subscription not in subscribers:
+                continue
+            subscribers.remove(subscription)
+            if not subscribers:
+                del self._pattern_subscribers[pattern]
+                self._channel_stats.pop(pattern, None)
+                await self._release_pattern(pattern)
+
+        if not self._has_subscribers() and self._has_channels:
+            self._has_channels.clear()
+
     async def _message_distributor(self):
-        """消息分发工作器（增强版）"""
+        """
+        消息分发工作器
+        连续读取订阅连接，收到消息立即分发；只在空闲超时或出错时检查连接
+        """
         logger.info("Redis消息分发工作器开始运行")
-        last_heartbeat = time.time()
-        message_count = 0
-        HEARTBEAT_INTERVAL = 15  # seconds
 
         while self._is_running:
             try:
-                # 确保连接有效
-                if not await self._check_connection():
-                    logger.warning("Redis连接异常，尝试重新连接...")
-                    await self._reconnect()
+                # 没有订阅时挂起，直到有频道被订阅
+                if not self._has_subscribers():
+                    await self._has_channels.wait()
                     continue
 
-                # 确保有活跃订阅
-                if not self._channel_queues:
-                    await asyncio.sleep(1)
-                    continue
-
-                # 获取消息（带超时）
                 try:
-                    message = await asyncio.wait_for(
-                        self._pubsub.get_message(
-                            ignore_subscribe_messages=True,
-                            timeout=1.0
-                        ),
-                        timeout=2.0
-                    )
+                    # 不忽略订阅确认消息，None 只表示真正的空闲超时
+                    message = await self._pubsub.get_message(timeout=self.IDLE_CHECK_INTERVAL)
                 except (redis.ConnectionError, redis.TimeoutError) as e:
                     logger.error(f"获取消息时连接错误: {e}")
                     await self._reconnect()
                     continue
-                except Exception as e:
-                    logger.error(f"获取消息时未知错误: {e}")
-                    await asyncio.sleep(1)
-                    continue
 
-                # 处理心跳
-                current_time = time.time()
-                if current_time - last_heartbeat > HEARTBEAT_INTERVAL:
-                    last_heartbeat = current_time
-                    for channel, queues in self._channel_queues.items():
-                        for queue in list(queues):
-                            try:
-                                await queue.put({"event": "heartbeat", "data": "ping"})
-                            except Exception as e:
-                                logger.warning(f"发送心跳到频道[{channel}]失败: {e}")
-
-                # 处理有效消息
-                if message and message['type'] == 'message':
-                    channel = message['channel']
-                    data = message['data']
-                    message_count += 1
-
-                    logger.debug(f"Received message #{message_count} on channel [{channel}]")
-
-                    if channel in self._channel_queues:
-                        for queue in list(self._channel_queues[channel]):
-                            try:
-                                queue.put_nowait(data)
-                            except asyncio.QueueFull:
-                                logger.warning(f"频道[{channel}]的消费者队列已满，丢弃消息")
-                    else:
-                        logger.warning(f"频道[{channel}]没有订阅者")
-
-                await asyncio.sleep(0.01)
+                if message is None:
+                    # 空闲超时：此时才检查连接
+                    if not await self._check_connection():
+                        logger.warning("Redis连接异常，尝试重新连接...")
+                        await self._reconnect()
+                        continue
+                    self._report_drops()
+                else:
+                    message_type = message['type']
+                    if message_type == 'message' or message_type == 'smessage':
+                        self._dispatch(message['channel'], message['data'])
+                    elif message_type == 'pmessage':
+                        self._dispatch_pattern(message['pattern'], message['channel'], message['data'])
 
             except asyncio.CancelledError:
                 logger.info("Redis消息分发工作器收到取消信号")
@@ -454,50 +1126,399 @@ class RedisPubSubManager:
                 logger.error(f"消息分发器错误: {e}")
                 await asyncio.sleep(1)
 
-        logger.info(f"Redis消息分发工作器停止运行，共处理了{message_count}条消息")
+        logger.info(f"Redis消息分发工作器停止运行，共处理了{self._message_count}条消息")
+
+    async def _heartbeat_ticker(self):
+        """推进共享心跳时间轮（整个进程一个定时任务）"""
+        while self._is_running:
+            await asyncio.sleep(self._heartbeats.resolution)
+            self._heartbeats.tick(time.monotonic())
+
+    def _dispatch(self, channel: str, data):
+        """把一条消息放入频道所有消费者队列（热路径，不记录日志）"""
+        self._message_count += 1
+        subscribers = self._channel_subscribers.get(channel)
+        if subscribers:
+            self._deliver(channel, channel, subscribers, data)
 
-    async def listen(self, *channels: str) -> AsyncGenerator:
+    def _dispatch_pattern(self, pattern: str, channel: str, data):
         """
-        监听一个或多个频道的消息
-        返回格式: {"channel": 频道名, "data": 消息内容}
+        模式消息：投递给订阅了该模式的消费者，以及由该模式承载的频道的消费者
+        每个模式各自收到一份，按模式区分来源避免重复投递
         """
-        logger.info(f"开始监听频道: {channels}")
-        queues = await self.subscribe(*channels)
-        
+        self._message_count += 1
+        subscribers = self._pattern_subscribers.get(pattern)
+        if subscribers:
+            self._deliver(pattern, channel, subscribers, data)
+        if self._channel_owner.get(channel) == pattern:
+            subscribers = self._channel_subscribers.get(channel)
+            if subscribers:
+                self._deliver(channel, channel, subscribers, data)
+
+    def _deliver(self, stats_key: str, channel: str, subscribers: Set[Subscription], data):
+        stats = self._channel_stats.get(stats_key)
+        if stats is None:
+            stats = self._channel_stats[stats_key] = [0, 0, 0, 0]
+        dropped = fan_out(subscribers, channel, data, stats)
+        if dropped:
+            self._dropped[stats_key] = self._dropped.get(stats_key, 0) + dropped
+
+    def _report_drops(self):
+        """空闲时汇总输出队列已满导致的丢弃"""
+        if self._dropped:
+            for channel, count in self._dropped.items():
+                logger.warning(f"频道[{channel}]的消费者队列已满，丢弃/断开 {count} 次")
+            self._dropped.clear()
+
+    def get_stats(self) -> Dict:
+        """
+        获取当前统计信息
+
+        Returns:
+            dict: 是否运行、频道数、消费者数、累计消息数，
+                  以及每个频道的投递/合并/丢弃/断开次数和当前队列深度
+        """
+        channel_stats = {}
+        for channel, (delivered, coalesced, dropped, disconnected) in self._channel_stats.items():
+            subscribers = self._channel_subscribers.get(channel) or self._pattern_subscribers.get(channel, ())
+            depths = [s.qsize() for s in subscribers]
+            channel_stats[channel] = {
+                "subscribers": len(depths),
+                "delivered": delivered,
+                "coalesced": coalesced,
+                "dropped": dropped,
+                "disconnected": disconnected,
+                "queue_depth": sum(depths),
+                "max_queue_depth": max(depths) if depths else 0,
+            }
+        return {
+            "running": self._is_running,
+            "channels": len(self._channel_subscribers),
+            "patterns": len(self._redis_patterns),
+            "consumers": len(set().union(*self._channel_subscribers.values(), *self._pattern_subscribers.values())),
+            "messages": self._message_count,
+            "heartbeats_sent": self._heartbeats.sent,
+            "channel_stats": channel_stats,
+        }
+
+    async def listen(self, *channels: str, patterns=(), maxsize: int = PUBSUB_QUEUE_SIZE,
+                     policy: str = PUBSUB_BACKPRESSURE,
+                     coalesce_key: Callable[[Any], Optional[str]] = task_uuid_key) -> AsyncGenerator:
+        """
+        监听一个或多个频道/模式的消息
+        单频道直接返回消息内容，多频道或模式返回格式: {"channel": 频道名, "data": 消息内容}
+        心跳消息 {"event": "heartbeat", ...} 不区分频道，原样返回
+        disconnect 策略下消费者跟不上时生成器正常结束，SSE 连接随之关闭
+        """
+        logger.debug(f"开始监听频道: {channels}")
+        subscription = await self.subscribe(*channels, patterns=patterns, maxsize=maxsize, policy=policy,
+                                            coalesce_key=coalesce_key)
+        single = len(channels) == 1 and not patterns
+
         try:
-            # 发送初始心跳
-            initial_heartbeat = {"event": "heartbeat", "data": "ping"}
-            for channel in channels:
-                if channel in queues:
-                    try:
-                        await queues[channel].put(initial_heartbeat)
-                    except Exception as e:
-                        logger.warning(f"发送初始心跳到频道[{channel}]失败: {e}")
-            yield {"event": "init", "data": {"channels": list(channels)}}
+            # 初始心跳（只打标记，不写队列）
+            subscription.heartbeat()
+            yield {"event": "init", "data": {"channels": list(channels), "patterns": list(patterns)}}
 
             while True:
-                for channel, queue in queues.items():
-                    try:
-                        # 使用较短的超时时间轮询多个队列
-                        message = await asyncio.wait_for(queue.get(), timeout=0.1)
-                        # yield {"channel": channel, "data": message}
-                        if len(channels) == 1:
-                            yield message
-                        else:
-                            yield {"channel": channel, "data": message}
-                    except asyncio.TimeoutError:
-                        continue
-                    except Exception as e:
-                        logger.error(f"处理频道[{channel}]消息时出错: {e}")
-                        await asyncio.sleep(1)
+                # 所有频道共用一个队列，消息到达即返回，空闲时挂起不占 CPU
+                try:
+                    channel, message = await subscription.get()
+                except SubscriptionClosed as e:
+                    logger.warning(str(e))
+                    return
+                if single or channel is None:
+                    yield message
+                else:
+                    yield {"channel": channel, "data": message}
 
         except asyncio.CancelledError:
-            logger.info("监听被取消")
+            logger.debug("监听被取消")
+            raise
         finally:
-            logger.info("正在取消监听...")
-            for channel, queue in queues.items():
+            try:
+                await self.unsubscribe(subscription)
+            except Exception as e:
+                logger.error(f"取消订阅频道{channels}时出错: {e}")
+            logger.debug(f"频道{channels}监听已取消")
+
+
+class RedisStreamManager:
+    """
+    基于 Redis Streams 的消息分发，listen() 与 RedisPubSubManager.listen 接口一致，可互换
+    - 默认广播模式：一个读取任务对所有关注的 stream 做 XREAD COUNT/BLOCK，
+      按 stream 分发给各消费者的 Subscription（背压、心跳与 pub/sub 相同）
+    - 消息保留在 stream 中（XADD MAXLEN ~ 裁剪），断线期间不丢消息，
+      SSE 客户端重连时按 Last-Event-ID 补发
+    - 指定 group 时使用消费组 XREADGROUP：同组内每条消息只交给一个消费者，处理后 XACK，
+      重启后先取回本消费者未确认的消息
+    """
+    RECONNECT_DELAY = 3  # seconds
+    HEARTBEAT_INTERVAL = RedisPubSubManager.HEARTBEAT_INTERVAL
+
+    def __init__(self):
+        self._client: Optional[Redis] = None  # 普通命令（XRANGE / XREVRANGE）
+        self._reader: Optional[Redis] = None  # 阻塞读取专用连接
+        self._cursors: Dict[str, str] = {}  # stream -> 已读取到的最后一个 ID
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._stream_stats: Dict[str, list] = {}  # stream -> [投递, 合并, 丢弃, 断开]
+        self._is_running = False
+        self._worker_task = None
+        self._has_streams: Optional[asyncio.Event] = None
+        self._heartbeats = HeartbeatWheel(self.HEARTBEAT_INTERVAL)
+        self._heartbeat_task = None
+        self._message_count = 0
+        self._replayed = 0
+        self._reads = 0
+
+    def _create_client(self) -> Redis:
+        """创建 Streams 专用的 Redis 连接（不设读超时，BLOCK 期间连接被独占）"""
+        return RedisPool.create_dedicated_client(cluster_aware=True)
+
+    async def start(self):
+        if not self._is_running:
+            self._client = self._create_client()
+            self._reader = self._create_client()
+            self._is_running = True
+            self._has_streams = asyncio.Event()
+            if self._cursors:
+                self._has_streams.set()
+            self._worker_task = asyncio.create_task(self._stream_reader())
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_ticker())
+            logger.info("Redis Streams 分发工作器已启动")
+
+    async def stop(self):
+        if not self._is_running:
+            return
+        self._is_running = False
+        for task in (self._heartbeat_task, self._worker_task):
+            if task:
+                task.cancel()
                 try:
-                    await self.unsubscribe(channel, queue)
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        for client in (self._reader, self._client):
+            if client:
+                try:
+                    await client.close()
                 except Exception as e:
-                    logger.error(f"取消订阅频道[{channel}]时出错: {e}")
-            logger.info("所有频道监听已取消")
\ No newline at end of file
+                    logger.error(f"关闭Redis客户端错误: {e}")
+        logger.info(f"Redis Streams 分发工作器已停止，共处理了{self._message_count}条消息")
+
+    def close_subscriptions(self, reason: str = "服务正在关闭") -> int:
+        """关闭所有广播模式消费者的订阅（消费组模式的 listen 在任务取消时结束）"""
+        subscriptions = set().union(*self._subscribers.values())
+        for subscription in subscriptions:
+            subscription.close(SubscriptionClosed(reason))
+        return len(subscriptions)
+
+    async def _latest_id(self, stream: str) -> str:
+        entries = await self._client.xrevrange(stream, count=1)
+        return entries[0][0] if entries else "0-0"
+
+    async def subscribe(self, *streams: str, last_event_id: Optional[str] = None,
+                        maxsize: int = PUBSUB_QUEUE_SIZE, policy: str = PUBSUB_BACKPRESSURE,
+                        coalesce_key: Callable[[Any], Optional[str]] = task_uuid_key) -> Subscription:
+        """
+        订阅一个或多个 stream，从当前最新位置开始接收
+        last_event_id 不为空时，先补发该 ID 之后、订阅时刻之前的消息（最多 STREAM_REPLAY_LIMIT 条）
+        缓冲区元素为 (stream, (消息ID, 消息))
+        """
+        subscription = Subscription(streams, maxsize=maxsize, policy=policy, coalesce_key=coalesce_key)
+        await self.start()
+
+        for stream in subscription.channels:
+            if stream not in self._cursors:
+                cursor = await self._latest_id(stream)
+                self._cursors.setdefault(stream, cursor)
+            self._subscribers.setdefault(stream, set()).add(subscription)
+        self._has_streams.set()
+        self._heartbeats.add(subscription)
+
+        if last_event_id:
+            # 订阅时刻的读取位置之后的消息由读取任务投递，之前的由这里补发，二者不重叠
+            for stream, cursor in [(s, self._cursors[s]) for s in subscription.channels]:
+                try:
+                    entries = await self._client.xrange(stream, min=f"({last_event_id}", max=cursor,
+                                                        count=STREAM_REPLAY_LIMIT)
+                except redis.ResponseError as e:
+                    logger.warning(f"stream[{stream}]补发失败，Last-Event-ID 无效: {last_event_id}, {e}")
+                    continue
+                subscription.prepend(stream, [(entry_id, fields.get("data")) for entry_id, fields in entries])
+                self._replayed += len(entries)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription):
+        self._heartbeats.remove(subscription)
+        for stream in subscription.channels:
+            subscribers = self._subscribers.get(stream)
+            if not subscribers:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[stream]
+                self._cursors.pop(stream, None)
+                self._stream_stats.pop(stream, None)
+        if not self._cursors and self._has_streams:
+            self._has_streams.clear()
+
+    async def _stream_reader(self):
+        """读取任务：所有 stream 共用一次阻塞 XREAD，断线重连后从已记录的位置继续读取"""
+        while self._is_running:
+            try:
+                if not self._cursors:
+                    await self._has_streams.wait()
+                    continue
+                # 新订阅的 stream 在下一轮读取时加入，期间的消息由其起始位置保证不丢
+                response = await self._reader.xread(dict(self._cursors), count=STREAM_READ_COUNT,
+                                                    block=STREAM_BLOCK_MS)
+                self._reads += 1
+                for stream, entries in response or ():
+                    if not entries or stream not in self._cursors:
+                        continue
+                    self._dispatch(stream, entries)
+                    self._cursors[stream] = entries[-1][0]
+            except asyncio.CancelledError:
+                break
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                logger.error(f"读取 stream 时连接错误: {e}，{self.RECONNECT_DELAY}秒后重连")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+                try:
+                    await self._reader.close()
+                except Exception:
+                    pass
+                self._reader = self._create_client()
+            except Exception as e:
+                logger.error(f"stream 读取任务错误: {e}")
+                await asyncio.sleep(1)
+
+    async def _heartbeat_ticker(self):
+        while self._is_running:
+            await asyncio.sleep(self._heartbeats.resolution)
+            self._heartbeats.tick(time.monotonic())
+
+    def _dispatch(self, stream: str, entries: list):
+        """把一批消息放入该 stream 所有消费者的缓冲区（热路径，不记录日志）"""
+        self._message_count += len(entries)
+        subscribers = self._subscribers.get(stream)
+        if not subscribers:
+            return
+        stats = self._stream_stats.get(stream)
+        if stats is None:
+            stats = self._stream_stats[stream] = [0, 0, 0, 0]
+        for entry_id, fields in entries:
+            data = fields.get("data")
+            fan_out(subscribers, stream, (entry_id, data), stats, data)
+
+    def get_stats(self) -> Dict:
+        """
+        获取当前统计信息
+
+        Returns:
+            dict: 是否运行、stream 数、消费者数、累计消息数、读取次数、补发条数，
+                  以及每个 stream 的投递/合并/丢弃/断开次数
+        """
+        stream_stats = {}
+        for stream, (delivered, coalesced, dropped, disconnected) in self._stream_stats.items():
+            stream_stats[stream] = {
+                "subscribers": len(self._subscribers.get(stream, ())),
+                "delivered": delivered,
+                "coalesced": coalesced,
+                "dropped": dropped,
+                "disconnected": disconnected,
+            }
+        return {
+            "running": self._is_running,
+            "streams": len(self._cursors),
+            "consumers": len(set().union(*self._subscribers.values())),
+            "messages": self._message_count,
+            "reads": self._reads,
+            "replayed": self._replayed,
+            "stream_stats": stream_stats,
+        }
+
+    async def listen(self, *streams: str, last_event_id: Optional[str] = None, group: Optional[str] = None,
+                     consumer: Optional[str] = None, with_ids: bool = False,
+                     maxsize: int = PUBSUB_QUEUE_SIZE, policy: str = PUBSUB_BACKPRESSURE,
+                     coalesce_key: Callable[[Any], Optional[str]] = task_uuid_key) -> AsyncGenerator:
+        """
+        监听一个或多个 stream，输出格式与 RedisPubSubManager.listen 相同
+        with_ids=True 时每条消息输出 {"id": 消息ID, "channel": stream, "data": 消息内容}，
+        SSE 接口可将 id 写入 id: 字段，客户端重连时通过 Last-Event-ID 请求头传回
+        """
+        single = len(streams) == 1 and not with_ids
+        if group:
+            async for message in self._listen_group(streams, group, consumer or "default", single, with_ids):
+                yield message
+            return
+
+        subscription = await self.subscribe(*streams, last_event_id=last_event_id, maxsize=maxsize,
+                                            policy=policy, coalesce_key=coalesce_key)
+        try:
+            subscription.heartbeat()
+            yield {"event": "init", "data": {"channels": list(streams)}}
+            while True:
+                try:
+                    stream, item = await subscription.get()
+                except SubscriptionClosed as e:
+                    logger.warning(str(e))
+                    return
+                if stream is None:
+                    yield item
+                    continue
+                entry_id, message = item
+                if single:
+                    yield message
+                elif with_ids:
+                    yield {"id": entry_id, "channel": stream, "data": message}
+                else:
+                    yield {"channel": stream, "data": message}
+        finally:
+            await self.unsubscribe(subscription)
+
+    async def _listen_group(self, streams, group: str, consumer: str, single: bool, with_ids: bool):
+        """
+        消费组模式：独占一个连接做 XREADGROUP，每批消息交给调用方处理后再 XACK（至少一次）
+        先以 ID 0 取回本消费者已读未确认的消息，取完后读取新消息
+        """
+        client = self._create_client()
+        try:
+            for stream in streams:
+                try:
+                    await client.xgroup_create(stream, group, id="0", mkstream=True)
+                except redis.ResponseError as e:
+                    if "BUSYGROUP" not in str(e):
+                        raise
+            yield {"event": "init", "data": {"channels": list(streams), "group": group, "consumer": consumer}}
+
+            cursor = "0"
+            last_active = time.monotonic()
+            while True:
+                response = await client.xreadgroup(group, consumer, {s: cursor for s in streams},
+                                                   count=STREAM_READ_COUNT, block=STREAM_BLOCK_MS)
+                batches = [(stream, entries) for stream, entries in response or () if entries]
+                if not batches:
+                    if cursor == "0":
+                        cursor = ">"  # 未确认的消息已取完
+                    elif time.monotonic() - last_active >= self.HEARTBEAT_INTERVAL:
+                        last_active = time.monotonic()
+                        yield HEARTBEAT
+                    continue
+
+                for stream, entries in batches:
+                    for entry_id, fields in entries:
+                        message = fields.get("data")
+                        if single:
+                            yield message
+                        elif with_ids:
+                            yield {"id": entry_id, "channel": stream, "data": message}
+                        else:
+                            yield {"channel": stream, "data": message}
+                    await client.xack(stream, group, *[entry_id for entry_id, _ in entries])
+                last_active = time.monotonic()
+        finally:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.error(f"关闭消费组连接错误: {e}")
@@ -0,0 +1,43 @@
+"""
+数据库只读副本健康检查
+按 DB_REPLICA_HEALTH_INTERVAL 定时对每个副本执行 SELECT 1（在线程中执行），
+失败的副本不再参与选择，恢复后自动重新加入；未配置副本时不启动
+"""
+import asyncio
+
+from app.boot import logger, settings
+from app.db import replicas
+
+
+async def _check_replicas():
+    while True:
+        try:
+            await asyncio.to_thread(replicas.check_health)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"只读副本健康检查失败: {e}")
+        await asyncio.sleep(settings.database.replica_health_interval)
+
+
+def setup_replica_health(app):
+    """启动时先检查一次副本，之后定时检查"""
+    tasks = []
+
+    @app.on_event("startup")
+    async def start_replica_health():
+        if replicas is None:
+            return
+        logger.info(f"只读副本: {[node.name for node in replicas.nodes]}，策略: {replicas.strategy}")
+        tasks.append(asyncio.create_task(_check_replicas()))
+
+    @app.on_event("shutdown")
+    async def stop_replica_health():
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        tasks.clear()
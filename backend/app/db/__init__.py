@@ -10,10 +10,15 @@ LastEditTime: 2025-12-01 21:35:56
 import os
 from sqlalchemy import create_engine,event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.pool import QueuePool  # 连接池实现
 from .models import *  # 导入所有模型
-from .sqlite import init_sqlite
-from .mysql import init_mysql
+from .sqlite import SQLITE_PROFILE, init_sqlite, init_sqlite_reader
+from .mysql import create_mysql_engine, init_mysql
+from .async_engine import init_async_mysql, init_async_sqlite
+from .routing import RoutingSession
+from .replicas import ReplicaNode, ReplicaSet
+from .query_metrics import instrument_engine
 from app.boot import settings
 
 def init_engine():  
@@ -24,15 +29,88 @@ def init_engine():
             db_password=settings.database.password,
             db_port=settings.database.port,
             db_name=settings.database.db_name,
+            pool_options=settings.database.pool_options,
         )
     else:
         _engine = init_sqlite()
     return _engine 
         
 engine = init_engine()
+instrument_engine(engine, "primary")
+
+def use_sqlite_read_pool() -> bool:
+    """SQLite performance 模式：读写分离到只读连接池和单连接写池"""
+    return os.getenv("APP_ENV") != "production" and SQLITE_PROFILE == "performance"
+
+# 只读引擎，未启用读写分离时为 None（全部走 engine）
+read_engine = init_sqlite_reader() if use_sqlite_read_pool() else None
+if read_engine is not None:
+    instrument_engine(read_engine, "reader")
+
+def init_replicas():
+    """MySQL 只读副本（同步+异步引擎，创建时不建立连接），未配置时为 None"""
+    config = settings.database
+    if os.getenv("APP_ENV") != "production" or not config.replica_nodes:
+        return None
+    nodes = []
+    for host, port in config.replica_nodes:
+        connection = dict(db_user=config.user, db_password=config.password, db_host=host, db_port=port,
+                          db_name=config.db_name, pool_options=config.pool_options)
+        node = ReplicaNode(
+            f"{host}:{port}",
+            create_mysql_engine(**connection),
+            init_async_mysql(**connection, driver=config.async_driver),
+        )
+        instrument_engine(node.engine, f"replica:{node.name}")
+        instrument_engine(node.async_engine.sync_engine, f"replica_async:{node.name}")
+        nodes.append(node)
+    return ReplicaSet(nodes, strategy=config.replica_strategy)
+
+replicas = init_replicas()
         
 SessionLocal = sessionmaker(
+    class_=RoutingSession,
     autocommit=False,
     autoflush=False,
-    bind=engine
-)
\ No newline at end of file
+    bind=engine,
+    read_engine=read_engine,
+    replicas=replicas
+)
+
+def init_async_engine():
+    if os.getenv("APP_ENV") == "production":
+        return init_async_mysql(
+            db_host=settings.database.host,
+            db_user=settings.database.user,
+            db_password=settings.database.password,
+            db_port=settings.database.port,
+            db_name=settings.database.db_name,
+            pool_options=settings.database.pool_options,
+            driver=settings.database.async_driver,
+        )
+    return init_async_sqlite()
+
+async_engine = init_async_engine()
+async_read_engine = init_async_sqlite(read_only=True) if use_sqlite_read_pool() else None
+instrument_engine(async_engine.sync_engine, "primary_async")
+if async_read_engine is not None:
+    instrument_engine(async_read_engine.sync_engine, "reader_async")
+
+def all_engines() -> list:
+    """所有同步引擎（异步引擎取 sync_engine），用于汇总查询统计"""
+    engines = [engine, read_engine, async_engine.sync_engine,
+               async_read_engine.sync_engine if async_read_engine is not None else None]
+    for node in replicas.nodes if replicas is not None else ():
+        engines += [node.engine, node.async_engine.sync_engine]
+    return [e for e in engines if e is not None]
+
+# expire_on_commit=False：提交后对象仍可在请求内读取，不触发隐式IO
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    sync_session_class=RoutingSession,
+    read_engine=async_read_engine.sync_engine if async_read_engine is not None else None,
+    replicas=replicas,
+    asynchronous=True,
+    autoflush=False,
+    expire_on_commit=False
+)
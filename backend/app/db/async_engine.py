@@ -0,0 +1,68 @@
+"""
+异步数据库引擎
+与同步 engine 共用同一个库、模型和连接池参数，供 async 路由使用，避免阻塞事件循环
+表结构由同步 engine 初始化时创建/迁移，这里只负责连接
+"""
+import os
+from urllib.parse import quote_plus
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+
+from .mysql import DEFAULT_POOL_OPTIONS, SQL_MODE
+from .sqlite import (
+    POOL_OPTIONS as SQLITE_POOL_OPTIONS, READER_POOL_OPTIONS, SQLITE_PROFILE, WRITER_POOL_OPTIONS, tune_engine,
+)
+
+ASYNC_MYSQL_DRIVERS = ("aiomysql", "asyncmy")
+
+
+def init_async_mysql(
+    db_user: str = "root",
+    db_password: str = "123456",
+    db_host: str = "localhost",
+    db_port: int = 3306,
+    db_name: str = "queue_platform",
+    pool_options: dict = None,
+    driver: str = "aiomysql",
+) -> AsyncEngine:
+    """
+    初始化异步MySQL连接
+    :param pool_options: 连接池参数，默认与同步引擎相同
+    :param driver: aiomysql / asyncmy（两者连接参数一致）
+    """
+    if driver not in ASYNC_MYSQL_DRIVERS:
+        raise ValueError(f"不支持的异步MySQL驱动: {driver}，可选 {ASYNC_MYSQL_DRIVERS}")
+    db_password = quote_plus(db_password)
+
+    return create_async_engine(
+        f"mysql+{driver}://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}",
+        **(pool_options or DEFAULT_POOL_OPTIONS),
+        pool_pre_ping=True,
+        echo=False,
+        connect_args={
+            'charset': 'utf8mb4',
+            'connect_timeout': 10,
+            'autocommit': True,
+            'sql_mode': SQL_MODE,
+        }
+    )
+
+
+def init_async_sqlite(db_path: str = "app/data/sqlite.db", profile: str = None,
+                      read_only: bool = False) -> AsyncEngine:
+    """
+    初始化异步SQLite连接（aiosqlite）
+    performance 模式下与同步引擎一样分为写引擎和只读引擎（read_only=True）
+    """
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+    if (profile or SQLITE_PROFILE) != "performance":
+        return create_async_engine(
+            f"sqlite+aiosqlite:///{db_path}",
+            **SQLITE_POOL_OPTIONS,
+        )
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{db_path}",
+        **(READER_POOL_OPTIONS if read_only else WRITER_POOL_OPTIONS),
+    )
+    tune_engine(engine.sync_engine, read_only=read_only)
+    return engine
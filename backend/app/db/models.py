@@ -2,14 +2,13 @@
 Base Scaffold Database Models
 只保留核心表：AccessKey 和 User
 """
-import pytz
 from datetime import datetime
 import sqlalchemy as sa
 from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 
-# 定义东八区时区对象
-EAST_8_TIMEZONE = pytz.timezone("Asia/Shanghai")
+# 东八区时区对象（与 JSON 编解码共用同一定义）
+from app.library.json import EAST_8_TIMEZONE
 
 Base = declarative_base()
 
@@ -21,6 +20,9 @@ class AccessKey(Base):
     secret_key = Column(String(100), unique=True, nullable=False, comment="密钥内容")
     description = Column(String(255), comment="密钥描述")
     max_qps = Column(Integer, default=10, comment="最大每秒请求数")
+    rate_strategy = Column(String(20), default="fixed_window", comment="限流算法：fixed_window/sliding_window/gcra/token_bucket/hybrid_window")
+    rate_limit = Column(Integer, nullable=True, comment="周期内最大请求数（为空时使用 max_qps）")
+    rate_period = Column(Integer, default=1, comment="限流周期（秒）")
     created_by = Column(Integer, nullable=True, index=True, comment="创建用户ID")
     created_at = Column(sa.DateTime(timezone=True), default=lambda: datetime.now(EAST_8_TIMEZONE).replace(microsecond=0), comment="创建时间")
     updated_at = Column(sa.DateTime(timezone=True), onupdate=lambda: datetime.now(EAST_8_TIMEZONE).replace(microsecond=0), comment="更新时间")
@@ -4,6 +4,43 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool
 from urllib.parse import quote_plus
 from .models import *  # 导入所有模型
+from .schema_version import migrate_if_changed
+
+# 未传入 pool_options 时的连接池参数（同步/异步引擎共用）
+DEFAULT_POOL_OPTIONS = {
+    "pool_size": 8,            # 增加连接池大小
+    "max_overflow": 15,        # 增加溢出连接数
+    "pool_timeout": 30,        # 连接池获取连接超时时间
+    "pool_recycle": 1800,      # 减少连接回收时间到30分钟
+}
+
+# 连接会话的 sql_mode（同步/异步引擎一致）
+SQL_MODE = 'STRICT_TRANS_TABLES,NO_ZERO_DATE,NO_ZERO_IN_DATE,ERROR_FOR_DIVISION_BY_ZERO'
+
+def create_mysql_engine(
+    db_user: str,
+    db_password: str,
+    db_host: str,
+    db_port: int,
+    db_name: str,
+    pool_options: dict = None
+):
+    """创建MySQL连接引擎（不建立连接），主库和只读副本共用"""
+    return create_engine(
+        f"mysql+pymysql://{db_user}:{quote_plus(db_password)}@{db_host}:{db_port}/{db_name}",
+        poolclass=QueuePool,
+        **(pool_options or DEFAULT_POOL_OPTIONS),
+        pool_pre_ping=True,    # 启用连接预检查
+        echo=False,            # 设为True可查看SQL日志
+        connect_args={
+            'charset': 'utf8mb4',
+            'connect_timeout': 10,      # 连接超时时间(秒)
+            'read_timeout': 30,         # 读取超时时间
+            'write_timeout': 30,        # 写入超时时间
+            'autocommit': True,         # 启用自动提交
+            'sql_mode': SQL_MODE,
+        }
+    )
 
 def init_mysql(
     db_user: str = "root",
@@ -11,36 +48,21 @@ def init_mysql(
     db_host: str = "localhost",
     db_port: int = 3306,
     db_name: str = "queue_platform",
-    create_tables: bool = True
+    create_tables: bool = True,
+    pool_options: dict = None
 ):
     """
     初始化MySQL数据库连接
     :param create_tables: 是否自动创建不存在的表
+    :param pool_options: 连接池参数，默认 DEFAULT_POOL_OPTIONS
     """
     # 强制Python运行时区
     os.environ['TZ'] = 'Asia/Shanghai'
 
-    db_password = quote_plus(db_password) 
-    
     # 创建连接引擎
-    engine = create_engine(
-        f"mysql+pymysql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}",
-        poolclass=QueuePool,
-        pool_size=8,           # 增加连接池大小
-        max_overflow=15,       # 增加溢出连接数
-        pool_timeout=30,       # 连接池获取连接超时时间
-        pool_recycle=1800,     # 减少连接回收时间到30分钟
-        pool_pre_ping=True,    # 启用连接预检查
-        echo=False,            # 设为True可查看SQL日志
-        connect_args={
-            'charset': 'utf8mb4',
-            'connect_timeout': 10,      # 连接超时时间(秒)
-            'read_timeout': 30,         # 读取超时时间
-            'write_timeout': 30,        # 写入超时时间
-            'autocommit': True,         # 启用自动提交
-            'sql_mode': 'STRICT_TRANS_TABLES,NO_ZERO_DATE,NO_ZERO_IN_DATE,ERROR_FOR_DIVISION_BY_ZERO',
-        }
-    )
+    engine = create_mysql_engine(db_user, db_password, db_host, db_port, db_name, pool_options)
+
+    db_password = quote_plus(db_password) 
     
     # 检查数据库是否存在，不存在则创建(需要用户有CREATE DATABASE权限)
     is_new_db = False
@@ -63,14 +85,17 @@ def init_mysql(
         else:
             raise
     
-    # 始终检查并创建缺失的表（支持增量更新）
+    def migrate():
+        Base.metadata.create_all(bind=engine)
+        print("表结构已检查/创建")
+        
+        # 自动迁移新增字段
+        return auto_migrate_columns(engine)
+
+    # 模型结构有变化时才检查并创建缺失的表（支持增量更新），多个 worker 同时启动时只有一个执行
     if create_tables:
         try:
-            Base.metadata.create_all(bind=engine)
-            print("表结构已检查/创建")
-            
-            # 自动迁移新增字段
-            auto_migrate_columns(engine)
+            migrate_if_changed(engine, Base.metadata, migrate)
         except Exception as e:
             print("建表时出错:", e)
         
@@ -80,8 +105,12 @@ def init_mysql(
     
     return engine
 
-def auto_migrate_columns(engine):
-    """自动检测并添加/修改模型中的字段"""
+def auto_migrate_columns(engine, metadata=None):
+    """
+    自动检测并添加/修改模型中的字段
+    :param metadata: 默认 Base.metadata
+    :return: 是否全部成功
+    """
     from sqlalchemy import inspect, Integer, String, Text, Boolean, DateTime
     from sqlalchemy.dialects import mysql
     from .models import FlexibleJSONType
@@ -128,8 +157,11 @@ def auto_migrate_columns(engine):
         # 默认类型
         return "VARCHAR(255)"
     
+    metadata = metadata or Base.metadata
+    failed = 0
+    
     try:
-        for table_name, table in Base.metadata.tables.items():
+        for table_name, table in metadata.tables.items():
             # 检查表是否存在
             if table_name not in inspector.get_table_names():
                 continue  # 表不存在，会由 create_all() 创建
@@ -184,6 +216,7 @@ def auto_migrate_columns(engine):
                     except Exception as e:
                         # 如果字段已存在（并发情况），忽略错误
                         if "Duplicate column name" not in str(e):
+                            failed += 1
                             print(f"✗ 添加字段失败 {table_name}.{column.name}: {e}")
                 
                 else:
@@ -214,11 +247,14 @@ def auto_migrate_columns(engine):
                                     conn.commit()
                                 print(f"✓ 已修改字段类型: {table_name}.{column.name} -> {col_type}")
                             except Exception as e:
+                                failed += 1
                                 print(f"✗ 修改字段类型失败 {table_name}.{column.name}: {e}")
         
         print("字段迁移检查完成")
     except Exception as e:
         print(f"自动迁移过程出错: {e}")
+        return False
+    return failed == 0
 
 def init_sample_data(engine):
     """初始化样例数据（可选）"""
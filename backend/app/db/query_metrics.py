@@ -0,0 +1,224 @@
+"""
+SQL 查询监控
+通过 before_cursor_execute / after_cursor_execute 事件记录每条语句的耗时，按引擎汇总：
+- 语句：按归一化 SQL 统计耗时直方图（IN (?, ?, ...) 合并为 IN (?...)），超过 DB_QUERY_METRICS_MAX_STATEMENTS 种后记入 <other>
+- 慢查询：耗时超过 DB_SLOW_QUERY_MS 时输出 warning 日志（只记录语句，不记录参数）
+- 连接池：签出连接耗时（含等待空闲连接与新建连接），签出超时次数
+- 请求：start_request() 在 contextvar 中放入 QueryStats，请求内的查询数、耗时、签出等待都记在上面，
+  同一语句执行次数达到 DB_N_PLUS_ONE_THRESHOLD 视为疑似 N+1
+异步引擎传入 async_engine.sync_engine
+"""
+import os
+import re
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, exc
+
+from app.boot import logger
+from app.core.redis_metrics import LatencyHistogram
+
+DB_QUERY_METRICS_ENABLED = os.getenv("DB_QUERY_METRICS", "1").lower() in ("1", "true", "yes")
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))  # 慢查询阈值（毫秒），<=0 关闭
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "10"))  # 单个请求内同一语句执行次数阈值
+DB_QUERY_METRICS_MAX_STATEMENTS = int(os.getenv("DB_QUERY_METRICS_MAX_STATEMENTS", "500"))
+
+STATEMENT_MAX_LENGTH = 200  # 统计键与日志中语句的最大长度
+OTHER_STATEMENTS = "<other>"
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER_LIST = re.compile(r"(\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+")
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("db_query_stats", default=None)
+
+
+@lru_cache(maxsize=1024)  # 语句文本有限，避免每次执行都做正则替换
+def normalize_statement(statement: str) -> str:
+    statement = _PLACEHOLDER_LIST.sub(r"\1...", _WHITESPACE.sub(" ", statement).strip())
+    return statement if len(statement) <= STATEMENT_MAX_LENGTH else statement[:STATEMENT_MAX_LENGTH] + "…"
+
+
+class QueryStats:
+    """单个请求的查询统计（请求内的同步路由在线程中执行，contextvar 复制后指向同一对象）"""
+    __slots__ = ("count", "total_ms", "checkout_ms", "slow", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.checkout_ms = 0.0
+        self.slow = 0
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str, ms: float, slow: bool):
+        self.count += 1
+        self.total_ms += ms
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        if slow:
+            self.slow += 1
+
+    def n_plus_one(self, threshold: int = None) -> List[Tuple[str, int]]:
+        """执行次数达到阈值的语句，按次数降序"""
+        threshold = DB_N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        if threshold <= 0:
+            return []
+        repeated = [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+        return sorted(repeated, key=lambda item: -item[1])
+
+    def summary(self) -> str:
+        """访问日志后缀，如 db=12q/8.31ms wait=0.42ms slow=1 n+1=1"""
+        parts = [f"db={self.count}q/{self.total_ms:.2f}ms"]
+        if self.checkout_ms >= 0.01:
+            parts.append(f"wait={self.checkout_ms:.2f}ms")
+        if self.slow:
+            parts.append(f"slow={self.slow}")
+        repeated = self.n_plus_one()
+        if repeated:
+            parts.append(f"n+1={len(repeated)}")
+        return " ".join(parts)
+
+
+def start_request() -> QueryStats:
+    """为当前上下文（请求）开始统计，需在路由执行前、同一任务内调用"""
+    stats = QueryStats()
+    _current.set(stats)
+    return stats
+
+
+def current_request() -> Optional[QueryStats]:
+    return _current.get()
+
+
+class EngineQueryMetrics:
+    """单个引擎的查询统计（线程安全）"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.statements: Dict[str, LatencyHistogram] = {}
+        self.checkout = LatencyHistogram()
+        self.slow_queries = 0
+        self.errors: Dict[str, int] = {}
+        self.checkout_timeouts = 0
+        self._lock = Lock()
+
+    def record_query(self, statement: str, ms: float):
+        with self._lock:
+            histogram = self.statements.get(statement)
+            if histogram is None:
+                if len(self.statements) >= DB_QUERY_METRICS_MAX_STATEMENTS:
+                    statement = OTHER_STATEMENTS
+                    histogram = self.statements.get(statement)
+                if histogram is None:
+                    histogram = self.statements[statement] = LatencyHistogram()
+            histogram.observe(ms)
+            if 0 < DB_SLOW_QUERY_MS <= ms:
+                self.slow_queries += 1
+
+    def record_error(self, error: BaseException):
+        with self._lock:
+            key = type(error).__name__
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def record_checkout(self, ms: float, error: Optional[BaseException] = None):
+        with self._lock:
+            self.checkout.observe(ms)
+            if isinstance(error, exc.TimeoutError):
+                self.checkout_timeouts += 1
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self.checkout = LatencyHistogram()
+            self.slow_queries = 0
+            self.errors.clear()
+            self.checkout_timeouts = 0
+
+    def get_stats(self, top: int = 20) -> Dict:
+        """
+        获取当前统计信息
+
+        Returns:
+            dict: 查询总数、慢查询数、错误次数、连接签出耗时，以及累计耗时最高的 top 条语句的耗时直方图
+        """
+        with self._lock:
+            ranked = sorted(self.statements.items(), key=lambda item: -item[1].total_ms)
+            return {
+                "engine": self.name,
+                "queries": sum(h.count for h in self.statements.values()),
+                "slow_queries": self.slow_queries,
+                "slow_query_ms": DB_SLOW_QUERY_MS,
+                "errors": dict(self.errors),
+                "checkout": self.checkout.snapshot(),
+                "checkout_timeouts": self.checkout_timeouts,
+                "statements": {statement: h.snapshot() for statement, h in ranked[:top]},
+            }
+
+
+def _instrument_pool(pool, metrics: EngineQueryMetrics):
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            connection = connect()
+        except Exception as e:
+            metrics.record_checkout((time.perf_counter() - start) * 1000, e)
+            raise
+        ms = (time.perf_counter() - start) * 1000
+        metrics.record_checkout(ms)
+        stats = _current.get()
+        if stats is not None:
+            stats.checkout_ms += ms
+        return connection
+
+    pool.connect = timed_connect
+
+
+def instrument_engine(engine, name: str) -> Optional[EngineQueryMetrics]:
+    """
+    为同步引擎（或 async_engine.sync_engine）注册查询事件并包装连接池签出
+    engine.dispose() 会重建连接池，之后的签出耗时不再统计（查询统计不受影响）
+    """
+    if not DB_QUERY_METRICS_ENABLED:
+        return None
+    metrics = EngineQueryMetrics(name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_query_start", None)
+        if start is None:
+            return
+        ms = (time.perf_counter() - start) * 1000
+        key = normalize_statement(statement)
+        metrics.record_query(key, ms)
+        slow = 0 < DB_SLOW_QUERY_MS <= ms
+        if slow:
+            logger.warning(f"🐢 慢查询 [{name}] {ms:.2f}ms: {key}")
+        stats = _current.get()
+        if stats is not None:
+            stats.record(key, ms, slow)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        metrics.record_error(context.original_exception)
+
+    _instrument_pool(engine.pool, metrics)
+    engine._query_metrics = metrics
+    return metrics
+
+
+def get_stats(*engines) -> Dict[str, Dict]:
+    """各引擎的查询统计，未注册监控的引擎跳过"""
+    stats = {}
+    for engine in engines:
+        metrics = getattr(engine, "_query_metrics", None)
+        if metrics is not None:
+            stats[metrics.name] = metrics.get_stats()
+    return stats
@@ -0,0 +1,125 @@
+"""
+只读副本选择
+RoutingSession 的只读查询从 ReplicaSet 中选一个健康的副本（round_robin 轮询 / least_latency 最低延迟），
+没有健康副本时回退到主库
+- 主动检查：check_health() 对每个副本执行 SELECT 1，记录延迟（指数平滑）和健康状态
+- 被动检查：副本连接断开（handle_error 且 is_disconnect）时立即标记为不健康，等下次检查恢复
+"""
+import itertools
+import time
+from typing import List, Optional
+
+from sqlalchemy import event, text
+
+from app.boot import logger
+
+REPLICA_LATENCY_ALPHA = 0.3  # 延迟指数平滑系数
+
+
+class ReplicaNode:
+    """一个副本：同步引擎用于同步会话与健康检查，async_engine 供异步会话使用"""
+    __slots__ = ("name", "engine", "async_engine", "healthy", "latency_ms", "failures", "checked_at")
+
+    def __init__(self, name: str, engine, async_engine=None):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        self.healthy = True
+        self.latency_ms = 0.0
+        self.failures = 0
+        self.checked_at = 0.0
+
+    def bind(self, asynchronous: bool = False):
+        if asynchronous:
+            return self.async_engine.sync_engine if self.async_engine is not None else None
+        return self.engine
+
+
+class ReplicaSet:
+    """只读副本集合（选择和健康状态在各线程/事件循环间共享，只做简单赋值）"""
+
+    def __init__(self, nodes: List[ReplicaNode], strategy: str = "round_robin"):
+        if strategy not in ("round_robin", "least_latency"):
+            raise ValueError(f"不支持的副本选择策略: {strategy}")
+        self.nodes = nodes
+        self.strategy = strategy
+        self._counter = itertools.count()
+        self.fallbacks = 0  # 没有健康副本、回退到主库的次数
+        for node in nodes:
+            self._watch_disconnects(node)
+
+    def _watch_disconnects(self, node: ReplicaNode):
+        def on_error(context):
+            if context.is_disconnect and node.healthy:
+                self.mark_down(node, context.original_exception)
+
+        for engine in (node.engine, node.async_engine and node.async_engine.sync_engine):
+            if engine is not None:
+                event.listen(engine, "handle_error", on_error)
+
+    def choose(self, asynchronous: bool = False) -> Optional[ReplicaNode]:
+        """选择一个健康副本，None 表示使用主库"""
+        healthy = [node for node in self.nodes if node.healthy and node.bind(asynchronous) is not None]
+        if not healthy:
+            self.fallbacks += 1
+            return None
+        if self.strategy == "least_latency":
+            return min(healthy, key=lambda node: node.latency_ms)
+        return healthy[next(self._counter) % len(healthy)]
+
+    def mark_down(self, node: ReplicaNode, error: BaseException = None):
+        node.healthy = False
+        node.failures += 1
+        logger.warning(f"只读副本 {node.name} 不可用，回退到其它副本或主库: {error!r}")
+
+    def check_health(self):
+        """阻塞执行，定时任务中放到线程里调用"""
+        for node in self.nodes:
+            start = time.perf_counter()
+            try:
+                with node.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            except Exception as e:
+                if node.healthy:
+                    self.mark_down(node, e)
+                continue
+            finally:
+                node.checked_at = time.time()
+            latency_ms = (time.perf_counter() - start) * 1000
+            node.latency_ms = latency_ms if not node.latency_ms else (
+                REPLICA_LATENCY_ALPHA * latency_ms + (1 - REPLICA_LATENCY_ALPHA) * node.latency_ms
+            )
+            if not node.healthy:
+                node.healthy = True
+                logger.info(f"只读副本 {node.name} 已恢复")
+
+    def dispose(self):
+        for node in self.nodes:
+            node.engine.dispose()
+
+    async def async_dispose(self):
+        for node in self.nodes:
+            if node.async_engine is not None:
+                await node.async_engine.dispose()
+
+    def get_stats(self) -> dict:
+        """
+        获取当前统计信息
+
+        Returns:
+            dict: 选择策略、回退主库次数、各副本健康状态与延迟
+        """
+        return {
+            "strategy": self.strategy,
+            "fallbacks": self.fallbacks,
+            "replicas": [
+                {
+                    "name": node.name,
+                    "healthy": node.healthy,
+                    "latency_ms": round(node.latency_ms, 3),
+                    "failures": node.failures,
+                    "checked_at": node.checked_at,
+                }
+                for node in self.nodes
+            ],
+        }
@@ -0,0 +1,46 @@
+"""
+读写分离会话
+只读查询走只读引擎，写操作（flush、INSERT/UPDATE/DELETE、SELECT ... FOR UPDATE、文本 SQL）走主引擎；
+会话发生过写操作后，后续读取也留在主引擎，保证读到自己的写入
+- read_engine：固定的只读引擎（SQLite performance 模式的只读连接池）
+- replicas：ReplicaSet，会话首次读取时选定一个健康副本并在会话内保持，没有健康副本时走主引擎
+都未配置时与普通 Session 相同
+"""
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+
+class RoutingSession(Session):
+    """
+    用法：sessionmaker(class_=RoutingSession, bind=engine, read_engine=read_engine)
+    异步：async_sessionmaker(bind=async_engine, sync_session_class=RoutingSession,
+                             read_engine=async_read_engine.sync_engine)
+         或 replicas=replica_set, asynchronous=True（使用副本的 async_engine）
+    """
+
+    def __init__(self, *args, read_engine=None, replicas=None, asynchronous: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read_engine = read_engine
+        self.replicas = replicas
+        self.asynchronous = asynchronous
+        self.replica = None  # 本会话选定的副本
+        self.wrote = False
+
+    def _read_bind(self):
+        if self.replicas is None:
+            return self.read_engine
+        if self.replica is None or not self.replica.healthy:
+            self.replica = self.replicas.choose(self.asynchronous)
+        return self.replica.bind(self.asynchronous) if self.replica is not None else None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (self.read_engine is None and self.replicas is None) or self.wrote:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if isinstance(clause, Select) and clause._for_update_arg is None and not self._flushing:
+            bind = self._read_bind()
+            if bind is not None:
+                return bind
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._flushing or clause is not None:
+            self.wrote = True
+        return super().get_bind(mapper, clause=clause, **kwargs)
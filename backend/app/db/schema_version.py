@@ -0,0 +1,143 @@
+"""
+启动时的表结构迁移缓存
+对模型元数据（表、列、类型、默认值、索引）计算指纹并存入 schema_meta 表：
+- 指纹一致：跳过 create_all 和逐表逐列的结构检查，启动只需一次查询
+- 指纹变化：在跨进程锁内执行迁移（SQLite 用文件锁，MySQL 用 GET_LOCK），
+  只有一个 worker 迁移，其余 worker 等锁后发现指纹已更新直接跳过
+"""
+import hashlib
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, delete, insert, select, text
+from sqlalchemy.exc import DBAPIError
+
+SCHEMA_MIGRATE_LOCK_TIMEOUT = int(os.getenv("SCHEMA_MIGRATE_LOCK_TIMEOUT", "120"))  # 等待迁移锁上限（秒）
+SCHEMA_MIGRATE_FORCE = os.getenv("SCHEMA_MIGRATE_FORCE", "0").lower() in ("1", "true", "yes")  # 忽略指纹，每次都检查
+
+# 迁移逻辑本身变化时递增，使已有指纹失效
+MIGRATION_REVISION = "1"
+FINGERPRINT_KEY = "schema_fingerprint"
+
+# 独立的元数据，不参与 Base.metadata 的建表和指纹
+_meta = MetaData()
+schema_meta = Table(
+    "schema_meta", _meta,
+    Column("name", String(64), primary_key=True),
+    Column("value", String(128), nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+
+def _type_key(column_type) -> str:
+    # repr(type) 通过反射构造函数参数生成，几百张表时明显变慢，这里只取影响 DDL 的属性
+    impl = getattr(column_type, "impl", None)
+    attrs = (getattr(column_type, name, None) for name in ("length", "precision", "scale", "timezone", "enums"))
+    key = f"{type(column_type).__name__}{tuple(attrs)}"
+    return f"{key}<{_type_key(impl)}>" if impl is not None and not isinstance(impl, type) else key
+
+
+def schema_fingerprint(metadata: MetaData) -> str:
+    """模型结构的 sha256，与表和列的声明顺序无关"""
+    parts = [MIGRATION_REVISION]
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        parts.append(f"T:{table.name}")
+        for column in sorted(table.columns, key=lambda c: c.name):
+            default = getattr(column.default, "arg", None)
+            server_default = getattr(column.server_default, "arg", None)
+            parts.append("C:" + "|".join((
+                column.name,
+                _type_key(column.type),
+                str(column.nullable),
+                str(column.primary_key),
+                "callable" if callable(default) else repr(default),
+                str(server_default),
+                column.comment or "",
+            )))
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            parts.append(f"I:{index.name}|{index.unique}|{','.join(c.name for c in index.columns)}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def read_fingerprint(engine) -> Optional[str]:
+    """读取已保存的指纹，表不存在（新库/旧版本）时返回 None"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                select(schema_meta.c.value).where(schema_meta.c.name == FINGERPRINT_KEY)
+            ).scalar()
+    except DBAPIError:
+        return None
+
+
+def write_fingerprint(engine, fingerprint: str):
+    _meta.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(delete(schema_meta).where(schema_meta.c.name == FINGERPRINT_KEY))
+        conn.execute(insert(schema_meta).values(name=FINGERPRINT_KEY, value=fingerprint, updated_at=datetime.now()))
+
+
+@contextmanager
+def file_lock(path: str, timeout: float = SCHEMA_MIGRATE_LOCK_TIMEOUT):
+    """基于 flock 的跨进程排它锁（无 fcntl 的平台不加锁）"""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path, "a+") as lock_file:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"等待迁移锁超时: {path}")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def mysql_named_lock(engine, name: str, timeout: float = SCHEMA_MIGRATE_LOCK_TIMEOUT):
+    """MySQL GET_LOCK 命名锁，锁随持有连接的会话存在"""
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"), {"name": name, "timeout": timeout}).scalar()
+        if acquired != 1:
+            raise TimeoutError(f"等待迁移锁超时: {name}")
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": name})
+
+
+def migration_lock(engine):
+    database = engine.url.database or ""
+    if engine.dialect.name == "sqlite" and database and database != ":memory:":
+        return file_lock(f"{database}.migrate.lock")
+    if engine.dialect.name == "mysql":
+        return mysql_named_lock(engine, f"schema_migrate:{database}")
+    return nullcontext()
+
+
+def migrate_if_changed(engine, metadata: MetaData, migrate: Callable[[], bool]) -> bool:
+    """
+    指纹变化时执行 migrate（建表与字段迁移），返回是否执行了迁移
+    migrate 返回 False（部分字段迁移失败）时不保存指纹，下次启动重试
+    """
+    fingerprint = schema_fingerprint(metadata)
+    if not SCHEMA_MIGRATE_FORCE and read_fingerprint(engine) == fingerprint:
+        return False
+    with migration_lock(engine):
+        # 等锁期间其它进程可能已完成迁移
+        if not SCHEMA_MIGRATE_FORCE and read_fingerprint(engine) == fingerprint:
+            return False
+        if migrate() is not False:
+            write_fingerprint(engine, fingerprint)
+    return True
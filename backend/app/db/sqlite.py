@@ -12,11 +12,88 @@ from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import QueuePool  # 连接池实现
 from .models import *  # 导入所有模型
+from .schema_version import migrate_if_changed
 
-def init_sqlite(db_path: str = "app/data/sqlite.db"):
+# 连接池参数（同步/异步引擎共用）
+POOL_OPTIONS = {
+    "pool_size": 5,          # 保持的连接数
+    "max_overflow": 10,      # 超出pool_size时允许新增的连接数
+    "pool_timeout": 30,      # 获取连接超时时间(秒)
+    "pool_recycle": 3600,    # 连接自动回收时间(秒)
+}
+
+# default：单个连接池，不设置 PRAGMA
+# performance：WAL + 每个连接设置 PRAGMA，读连接池（只读）与单连接写池分离，写事务以 BEGIN IMMEDIATE 串行
+#   同步写引擎与异步写引擎（init_async_sqlite）各有一个写连接，互相之间没有进程内排队，
+#   只靠 SQLite 的文件写锁串行：一方持有写事务时另一方的 BEGIN IMMEDIATE 最多等待 SQLITE_BUSY_TIMEOUT_MS，
+#   超时返回 "database is locked"（与其它进程的写入相同）。写事务应尽量短，同一类写入固定使用同步或异步会话
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # 内存映射大小（字节）
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))  # 每个连接的页缓存（KiB）
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # 等待其它进程释放锁（毫秒）
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))  # 读连接数
+
+# 写连接池只有一个连接，同一引擎上的写事务在连接池上排队（同步与异步引擎之间见上）
+WRITER_POOL_OPTIONS = {**POOL_OPTIONS, "pool_size": 1, "max_overflow": 0}
+READER_POOL_OPTIONS = {**POOL_OPTIONS, "pool_size": SQLITE_READ_POOL_SIZE}
+
+
+def _set_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode = WAL")
+    cursor.execute("PRAGMA synchronous = NORMAL")  # WAL 下只在检查点时 fsync
+    cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}")  # 负数表示 KiB
+    cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _set_query_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only = ON")
+    cursor.close()
+
+
+def _disable_implicit_begin(dbapi_connection, connection_record):
+    # 由 begin 事件显式开启事务（驱动默认只在 DML 前发出 BEGIN DEFERRED）
+    dbapi_connection.isolation_level = None
+
+
+def _begin_immediate(conn):
+    # 开启事务时即获取写锁，避免 DEFERRED 事务升级写锁时直接返回 SQLITE_BUSY
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def tune_engine(engine, read_only: bool = False):
+    """
+    为 performance 模式的引擎注册连接事件（异步引擎传入 async_engine.sync_engine）
+    read_only=True：只读连接（PRAGMA query_only），否则为写连接（BEGIN IMMEDIATE）
+    """
+    event.listen(engine, "connect", _set_pragmas)
+    if read_only:
+        event.listen(engine, "connect", _set_query_only)
+    else:
+        event.listen(engine, "connect", _disable_implicit_begin)
+        event.listen(engine, "begin", _begin_immediate)
+    return engine
+
+
+def init_sqlite_reader(db_path: str = "app/data/sqlite.db"):
+    """performance 模式的只读引擎（需在 init_sqlite 建表之后创建）"""
+    engine = create_engine(
+        f"sqlite:///{db_path}",
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        **READER_POOL_OPTIONS,
+    )
+    return tune_engine(engine, read_only=True)
+
+
+def init_sqlite(db_path: str = "app/data/sqlite.db", profile: str = None):
     # 强制Python运行时区（即使不修改模型）
     os.environ['TZ'] = 'Asia/Shanghai'
-    """自动初始化SQLite数据库"""
+    """自动初始化SQLite数据库（profile 默认取 SQLITE_PROFILE，performance 模式下返回写引擎）"""
+    performance = (profile or SQLITE_PROFILE) == "performance"
     # 确保目录存在
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     
@@ -25,17 +102,15 @@ def init_sqlite(db_path: str = "app/data/sqlite.db"):
         f"sqlite:///{db_path}",
         connect_args={"check_same_thread": False},
         poolclass=QueuePool,  # 关键配置
-        pool_size=5,          # 保持的连接数
-        max_overflow=10,      # 超出pool_size时允许新增的连接数
-        pool_timeout=30,      # 获取连接超时时间(秒)
-        pool_recycle=3600,     # 连接自动回收时间(秒)
+        **(WRITER_POOL_OPTIONS if performance else POOL_OPTIONS),
     )
+    if performance:
+        tune_engine(engine)
     
     # 检查是否为新数据库
     is_new_db = not os.path.exists(db_path)
     
-    # 始终检查并创建缺失的表（支持增量更新）
-    try:
+    def migrate():
         Base.metadata.create_all(bind=engine)
         if is_new_db:
             print(f"创建新数据库: {db_path}")
@@ -43,7 +118,11 @@ def init_sqlite(db_path: str = "app/data/sqlite.db"):
             print(f"数据库已存在，检查并创建缺失的表: {db_path}")
         
         # 自动迁移新增字段
-        auto_migrate_columns(engine)
+        return auto_migrate_columns(engine)
+
+    # 模型结构有变化时才检查并创建缺失的表（支持增量更新）
+    try:
+        migrate_if_changed(engine, Base.metadata, migrate)
     except Exception as e:
         print(f"创建表时出错: {e}")
     
@@ -53,8 +132,12 @@ def init_sqlite(db_path: str = "app/data/sqlite.db"):
     
     return engine
 
-def auto_migrate_columns(engine):
-    """自动检测并添加模型中新增的字段（SQLite版本）"""
+def auto_migrate_columns(engine, metadata=None):
+    """
+    自动检测并添加模型中新增的字段（SQLite版本）
+    :param metadata: 默认 Base.metadata
+    :return: 是否全部成功
+    """
     from sqlalchemy import inspect, Integer, String, Text, Boolean, DateTime
     
     inspector = inspect(engine)
@@ -76,8 +159,11 @@ def auto_migrate_columns(engine):
         else:
             return "TEXT"  # 默认类型
     
+    metadata = metadata or Base.metadata
+    failed = 0
+    
     try:
-        for table_name, table in Base.metadata.tables.items():
+        for table_name, table in metadata.tables.items():
             # 检查表是否存在
             if table_name not in inspector.get_table_names():
                 continue  # 表不存在，会由 create_all() 创建
@@ -131,11 +217,14 @@ def auto_migrate_columns(engine):
                     except Exception as e:
                         # 如果字段已存在（并发情况），忽略错误
                         if "duplicate column name" not in str(e).lower():
+                            failed += 1
                             print(f"✗ 添加字段失败 {table_name}.{column.name}: {e}")
         
         print("字段迁移检查完成")
     except Exception as e:
         print(f"自动迁移过程出错: {e}")
+        return False
+    return failed == 0
 
 def init_sample_data(engine):
     """初始化样例数据（可选）"""
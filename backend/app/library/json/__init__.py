@@ -1,6 +1,52 @@
+"""
+项目统一 JSON 编解码（基于 orjson）
+响应序列化、JWT、Redis 缓存等热路径统一走这里
+"""
+from datetime import datetime
+from decimal import Decimal
 from typing import Any
 
 import orjson
+import pytz
+from pydantic import BaseModel
+
+# 东八区时区对象（模型时间字段统一使用）
+EAST_8_TIMEZONE = pytz.timezone("Asia/Shanghai")
+
+JSONDecodeError = orjson.JSONDecodeError
+
+# 日期时间交给 _default 处理，以便给无时区的时间补上东八区
+_DUMPS_OPTION = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        # SQLite 等返回的无时区时间按东八区处理
+        if obj.tzinfo is None:
+            obj = EAST_8_TIMEZONE.localize(obj)
+        return obj.isoformat()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(data: Any) -> bytes:
+    """序列化为 UTF-8 bytes（紧凑格式，不转义非 ASCII 字符）"""
+    return orjson.dumps(data, default=_default, option=_DUMPS_OPTION)
+
+
+def dumps_str(data: Any) -> str:
+    """序列化为 str，用于 Redis 等需要文本的场景"""
+    return orjson.dumps(data, default=_default, option=_DUMPS_OPTION).decode()
+
+
+def loads(data: Any) -> Any:
+    """反序列化，接受 bytes / bytearray / memoryview / str"""
+    return orjson.loads(data)
 
 
 def omit_empty(value):
@@ -16,8 +62,8 @@ def dumps_clean(data: Any) -> str:
         if isinstance(obj, dict):
             return {k: v for k, v in obj.items() if v is not None}
         return obj
-    
+
     return orjson.dumps(
         clean(data),
         option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
-    ).decode()
\ No newline at end of file
+    ).decode()
@@ -1,10 +1,34 @@
 from .boot.application import create_app
 from .api.public import router as public_router
 from .api.v1 import router as v1_router
+from .api.v1.deps import setup_user_cache_invalidation
+from .core.limiter import setup_rate_limit
+from .core.access_key_index import setup_access_key_index
+from .core.lifecycle import setup_lifecycle
+from .core.replica_health import setup_replica_health
+from .core.query_metrics import setup_query_metrics
 from .library.debug import generate_route_md
 
 app = create_app()
 
+# 生命周期：连接池预热、就绪门控、排空与关闭（需在其它请求钩子之前注册）
+app.use(setup_lifecycle)
+
+# 用户缓存 L1 失效广播订阅
+app.use(setup_user_cache_invalidation)
+
+# 限流器 AccessKey 进程内索引（预热 + 增量刷新 + 失效订阅）
+app.use(setup_access_key_index)
+
+# 数据库只读副本健康检查（配置 DB_REPLICA_HOSTS 时生效）
+app.use(setup_replica_health)
+
+# 请求级 SQL 查询统计（访问日志中的查询数/耗时、N+1 警告）
+app.use(setup_query_metrics)
+
+# 限流响应头（RateLimit-* / Retry-After）
+app.use(setup_rate_limit())
+
 
 app.include_router(v1_router)
 
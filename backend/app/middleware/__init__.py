@@ -1,33 +1,31 @@
 """
 访问日志中间件
 """
-from fastapi import Request
+from starlette.datastructures import MutableHeaders
 from app.boot import logger
-import time
+from app.boot.pipeline import RequestContext
 
 def setup_access_log(app):
-    """设置访问日志中间件"""
-    @app.middleware("http")
-    async def access_log_middleware(request: Request, call_next):
-        start_time = time.time()
-
+    """设置访问日志（管道钩子：请求日志 + 处理耗时 + 响应日志）"""
+    @app.pipeline.on_request
+    async def access_log_request(ctx: RequestContext):
         # 记录请求信息
-        logger.info(f"➡️  {request.method} {request.url.path}")
+        logger.info(f"➡️  {ctx.method} {ctx.path}")
 
-        try:
-            response = await call_next(request)
+    @app.pipeline.on_response_headers
+    def process_time_header(ctx: RequestContext, headers: MutableHeaders):
+        headers["X-Process-Time"] = str(ctx.elapsed_ms)
 
-            # 计算处理时间
-            process_time = (time.time() - start_time) * 1000
-            status_code = response.status_code
+    @app.pipeline.on_complete
+    def access_log_response(ctx: RequestContext):
+        # 计算处理时间
+        process_time = ctx.elapsed_ms
+        # 查询统计（setup_query_metrics 注册时存在）
+        query_stats = ctx.state.get("query_stats")
+        db = f" [{query_stats.summary()}]" if query_stats is not None else ""
 
+        if ctx.error is not None:
+            logger.error(f"❌ {ctx.method} {ctx.path} - Error: {str(ctx.error)} ({process_time:.2f}ms){db}")
+        else:
             # 记录响应信息
-            logger.info(f"⬅️  {request.method} {request.url.path} - {status_code} ({process_time:.2f}ms)")
-
-            response.headers["X-Process-Time"] = str(process_time)
-            return response
-
-        except Exception as e:
-            process_time = (time.time() - start_time) * 1000
-            logger.error(f"❌ {request.method} {request.url.path} - Error: {str(e)} ({process_time:.2f}ms)")
-            raise
+            logger.info(f"⬅️  {ctx.method} {ctx.path} - {ctx.status_code} ({process_time:.2f}ms){db}")
@@ -0,0 +1 @@
+# 基准测试（python -m benchmarks.xxx 运行，不参与 pytest）
@@ -0,0 +1,150 @@
+"""
+旧版中间件实现（基于 BaseHTTPMiddleware），仅供基准测试对比使用
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import json
+from app.boot.exceptions import APIException
+from app.boot.logger import logger
+import time
+
+def setup_stand_response(app: FastAPI):
+    
+    def is_wrapped_response(data: dict) -> bool:
+        """检查是否已经是标准格式响应"""
+        # logger.info(data)
+        return all(key in data for key in ("code",))
+    async def response_wrapper_middleware(request: Request, call_next):
+        try:
+            response = await call_next(request)
+
+            # 跳过文档等特殊路径
+            if request.url.path.startswith(("/docs", "/openapi.json", "/api/v1/mcp")):
+                return response
+                
+            # 只处理JSON响应且状态码为200
+            if "application/json" in response.headers.get("content-type", "") and response.status_code == 200:
+                # 处理流式响应
+                if isinstance(response, StreamingResponse):
+                    async def wrapped_stream():
+                        chunks = []
+                        try:
+                            async for chunk in response.body_iterator:
+                                chunks.append(chunk)
+                            
+                            # 拼接所有chunk并解码
+                            full_body = b''.join(chunks).decode()
+                            try:
+                                data = json.loads(full_body)
+                                if not is_wrapped_response(data):  # 检查是否已包装
+                                    data = {"code": 200, "data": data}
+                                yield json.dumps(data,ensure_ascii=False).encode()
+                            except json.JSONDecodeError:
+                                yield full_body.encode()
+                        except Exception as e:
+                            logger.error(f"Stream processing error: {e}")
+                            error_response = {"code": 1, "msg": "Stream processing failed"}
+                            yield json.dumps(error_response, ensure_ascii=False).encode()
+                        finally:
+                            # 确保资源清理
+                            if hasattr(response, 'body_iterator') and hasattr(response.body_iterator, 'close'):
+                                try:
+                                    await response.body_iterator.close()
+                                except:
+                                    pass
+                                    
+                    # 创建新的响应，不包含 content-length
+                    return StreamingResponse(
+                        status_code=response.status_code,
+                        content=wrapped_stream(),
+                        media_type="application/json"
+                    )
+                
+                # 对于普通 Response，读取 body
+                body = b""
+                body_was_consumed = False
+                
+                if hasattr(response, 'body'):
+                    body = response.body
+                elif hasattr(response, 'body_iterator'):
+                    chunks = []
+                    async for chunk in response.body_iterator:
+                        chunks.append(chunk)
+                    body = b''.join(chunks)
+                    body_was_consumed = True  # 标记 body_iterator 已被消费
+                
+                if body:
+                    try:
+                        data = json.loads(body)
+                        if not is_wrapped_response(data):  # 关键检查
+                            data = {
+                                "code": 200,
+                                "data": data
+                            }
+                        # 无论是否包装，都创建新的 JSONResponse 以确保 Content-Length 正确
+                        return JSONResponse(
+                            status_code=response.status_code,
+                            content=data
+                        )
+                    except Exception as e:
+                        logger.error(f"JSON parse error: {e}")
+                        # 如果解析失败但 body_iterator 已被消费，需要重建响应
+                        if body_was_consumed:
+                            from starlette.responses import Response
+                            return Response(
+                                content=body,
+                                status_code=response.status_code,
+                                headers=dict(response.headers),
+                                media_type=response.headers.get("content-type")
+                            )
+                
+            return response
+        except APIException as e:
+            raise
+            
+        except Exception as e:
+            return JSONResponse(
+                status_code=200,
+                content={"code": 1, "msg": str(e)}
+            )
+    app.middleware("http")(response_wrapper_middleware)
+
+
+def setup_custom_server(app:FastAPI):
+    @app.middleware("http")
+    async def server_header(request: Request, call_next):
+        response = await call_next(request)
+        response.headers["Server"]  = "struggler/1.0" 
+        access_control_allow_origin = response.headers.get("access-control-allow-origin", "")
+        if access_control_allow_origin == "*" and "origin" in request.headers:
+            origin = request.headers.get("origin")
+            response.headers["access-control-allow-origin"] = origin  # 覆盖为请求的 Origin
+        return response
+
+
+def setup_access_log(app):
+    """设置访问日志中间件"""
+    @app.middleware("http")
+    async def access_log_middleware(request: Request, call_next):
+        start_time = time.time()
+
+        # 记录请求信息
+        logger.info(f"➡️  {request.method} {request.url.path}")
+
+        try:
+            response = await call_next(request)
+
+            # 计算处理时间
+            process_time = (time.time() - start_time) * 1000
+            status_code = response.status_code
+
+            # 记录响应信息
+            logger.info(f"⬅️  {request.method} {request.url.path} - {status_code} ({process_time:.2f}ms)")
+
+            response.headers["X-Process-Time"] = str(process_time)
+            return response
+
+        except Exception as e:
+            process_time = (time.time() - start_time) * 1000
+            logger.error(f"❌ {request.method} {request.url.path} - Error: {str(e)} ({process_time:.2f}ms)")
+            raise
@@ -0,0 +1,107 @@
+"""
+认证依赖并发基准：同步查库 vs 异步查库时的事件循环延迟
+
+用临时 SQLite 库模拟慢查询（users 视图里调用 sleep_ms），
+并发执行用户查询的同时用一个 1ms 定时任务测量事件循环卡顿。
+同步路径下循环延迟随数据库延迟线性增长，异步路径保持平稳。
+
+运行：cd backend && python -m benchmarks.bench_auth_concurrency
+"""
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.boot import logger
+from app.api.v1 import deps
+
+CONCURRENCY = 50
+DB_LATENCIES_MS = (0, 5, 20)
+
+
+def _register_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+
+def prepare_db(path: str, latency_ms: int):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("DROP VIEW IF EXISTS users"))
+        conn.execute(text("DROP TABLE IF EXISTS users_t"))
+        conn.execute(text(
+            "CREATE TABLE users_t (id INTEGER PRIMARY KEY, username TEXT, hashed_password TEXT, "
+            "last_login DATETIME, fixed INTEGER, created_at DATETIME, updated_at DATETIME, deleted_at DATETIME)"
+        ))
+        conn.execute(text("INSERT INTO users_t (id, username, hashed_password, fixed) VALUES (1, 'main', 'x', 1)"))
+        # 每次查询 users 都会触发 sleep_ms，模拟网络/数据库延迟
+        conn.execute(text(f"CREATE VIEW users AS SELECT * FROM users_t WHERE sleep_ms({latency_ms}) = 0"))
+    engine.dispose()
+
+
+async def measure_loop_lag(workload) -> tuple:
+    """运行 workload 期间，每 1ms 唤醒一次并记录实际延迟"""
+    lags = []
+    running = True
+
+    async def ticker():
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append((time.perf_counter() - start) * 1000 - 1)
+
+    tick_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await workload()
+    elapsed = time.perf_counter() - start
+    running = False
+    await tick_task
+    return max(lags), statistics.mean(lags), elapsed
+
+
+async def run(path: str, latency_ms: int) -> dict:
+    sync_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", pool_size=CONCURRENCY)
+    event.listen(sync_engine, "connect", _register_sleep)
+    event.listen(async_engine.sync_engine, "connect", _register_sleep)
+    deps.SessionLocal = sessionmaker(bind=sync_engine)
+    deps.AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def sync_path():
+        # 旧实现：async def 里直接调用同步查询
+        async def one():
+            deps.load_user(1)
+        await asyncio.gather(*(one() for _ in range(CONCURRENCY)))
+
+    async def async_path():
+        await asyncio.gather(*(deps.load_user_async(1) for _ in range(CONCURRENCY)))
+
+    result = {
+        "sync": await measure_loop_lag(sync_path),
+        "async": await measure_loop_lag(async_path),
+    }
+    sync_engine.dispose()
+    await async_engine.dispose()
+    return result
+
+
+async def main():
+    logger.setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"并发数: {CONCURRENCY}")
+        print(f"{'DB延迟':<8}{'路径':<8}{'循环最大延迟(ms)':>18}{'循环平均延迟(ms)':>18}{'总耗时(ms)':>14}")
+        for latency_ms in DB_LATENCIES_MS:
+            path = os.path.join(tmp, f"bench_{latency_ms}.db")
+            prepare_db(path, latency_ms)
+            result = await run(path, latency_ms)
+            for name, (lag_max, lag_mean, elapsed) in result.items():
+                print(f"{str(latency_ms) + 'ms':<8}{name:<8}{lag_max:>18.2f}{lag_mean:>18.2f}{elapsed * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+请求级数据库会话压测：慢查询下同步会话 vs 异步会话的吞吐
+
+三种写法的接口各执行一条耗时 SLOW_QUERY_MS 的查询（临时 SQLite 库注册 sleep_ms 函数模拟）：
+- async+sync：async def 路由使用 get_db 同步会话（旧写法，查询阻塞事件循环）
+- def+sync：def 路由使用 get_db（在线程池中执行）
+- async+async：async def 路由使用 get_async_db
+CONCURRENCY 个客户端并发请求，统计 QPS 与延迟 p50/p99。
+查询后立即提交归还连接：async+sync 若持有连接到依赖清理，并发超过连接池上限时，
+等待连接的查询阻塞事件循环，持有连接的请求又无法完成清理，会卡满 pool_timeout。
+同步与异步引擎使用与应用相同的连接池参数（app.db.sqlite.POOL_OPTIONS）。
+
+运行：cd backend && python -m benchmarks.bench_db_session
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.api.v1 import deps
+from app.boot import logger
+from app.db.async_engine import init_async_sqlite
+from app.db.sqlite import POOL_OPTIONS
+
+CONCURRENCY = 50
+REQUESTS = 500
+SLOW_QUERY_MS = (5, 20)
+
+SLOW_QUERY = text("SELECT sleep_ms(:ms)")
+
+
+def _register_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep_ms", 1, lambda ms: time.sleep(ms / 1000) or 0)
+
+
+def make_app(latency_ms: int) -> FastAPI:
+    app = FastAPI()
+    params = {"ms": latency_ms}
+
+    @app.get("/async-sync")
+    async def async_route_sync_session(db: Session = Depends(deps.get_db)):
+        value = db.execute(SLOW_QUERY, params).scalar()
+        db.commit()
+        return {"v": value}
+
+    @app.get("/def-sync")
+    def def_route_sync_session(db: Session = Depends(deps.get_db)):
+        value = db.execute(SLOW_QUERY, params).scalar()
+        db.commit()
+        return {"v": value}
+
+    @app.get("/async-async")
+    async def async_route_async_session(db: AsyncSession = Depends(deps.get_async_db)):
+        value = (await db.execute(SLOW_QUERY, params)).scalar()
+        await db.commit()
+        return {"v": value}
+
+    return app
+
+
+async def load(client: httpx.AsyncClient, path: str) -> tuple:
+    latencies = []
+    remaining = [REQUESTS]
+
+    async def worker():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            start = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return REQUESTS / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+
+async def main():
+    logger.setLevel(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        sync_engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False},
+                                    poolclass=QueuePool, **POOL_OPTIONS)
+        async_engine = init_async_sqlite(path)
+        event.listen(sync_engine, "connect", _register_sleep)
+        event.listen(async_engine.sync_engine, "connect", _register_sleep)
+        deps.SessionLocal = sessionmaker(bind=sync_engine)
+        deps.AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+        print(f"并发: {CONCURRENCY}  请求数: {REQUESTS}  连接池: {POOL_OPTIONS}")
+        print(f"{'查询耗时':<10}{'写法':<14}{'QPS':>10}{'p50(ms)':>10}{'p99(ms)':>10}")
+        for latency_ms in SLOW_QUERY_MS:
+            transport = httpx.ASGITransport(app=make_app(latency_ms))
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for path_name in ("/async-sync", "/def-sync", "/async-async"):
+                    qps, p50, p99 = await load(client, path_name)
+                    print(f"{str(latency_ms) + 'ms':<10}{path_name[1:]:<14}{qps:>10.0f}{p50:>10.1f}{p99:>10.1f}")
+
+        sync_engine.dispose()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+JSON 编解码基准：标准库 json vs 项目 orjson 编解码
+
+运行：cd backend && python -m benchmarks.bench_json_codec
+"""
+import json
+import time
+from datetime import datetime
+
+from app.library import json as json_codec
+from app.library.json import EAST_8_TIMEZONE
+
+ROUNDS = 20000
+
+NOW = datetime.now(EAST_8_TIMEZONE).replace(microsecond=0)
+
+PAYLOADS = {
+    # deps.py 用户缓存
+    "user_cache": {"id": 1, "username": "main", "fixed": True, "deleted_at": None},
+    # limiter.py AccessKey 缓存
+    "access_key_cache": {
+        "max_qps": 10,
+        "access_key": {"id": 1, "secret_key": "sk-0123456789abcdef", "max_qps": 10, "created_by": 1},
+        "user": {"id": 1, "username": "main", "fixed": True},
+    },
+    # jwt.py 载荷
+    "jwt_payload": {"sub": "1_1", "exp": 1767225600, "iat": 1767196800},
+    # 标准响应：50 条任务记录（含中文和时间）
+    "envelope_50": {
+        "code": 200,
+        "data": [
+            {"task_uuid": f"uuid-{i}", "status": "成功", "progress": i, "created_at": NOW}
+            for i in range(50)
+        ],
+    },
+}
+
+
+def stdlib_dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def bench(fn, arg) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(arg)
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+def main():
+    print(f"{'载荷':<20}{'json dumps':>12}{'orjson dumps':>14}{'json loads':>12}{'orjson loads':>14}  (us/op)")
+    for name, payload in PAYLOADS.items():
+        encoded = json_codec.dumps(payload)
+        print(
+            f"{name:<20}"
+            f"{bench(stdlib_dumps, payload):>12.2f}"
+            f"{bench(json_codec.dumps, payload):>14.2f}"
+            f"{bench(json.loads, encoded):>12.2f}"
+            f"{bench(json_codec.loads, encoded):>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+中间件链基准测试：/api/v1/ping 的 p50/p99 延迟
+旧版三层 BaseHTTPMiddleware vs 单层管道
+
+运行：cd backend && python -m benchmarks.bench_pipeline
+"""
+import asyncio
+import logging
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.boot import logger
+from app.boot.application import create_app
+from app.boot.middleware import setup_cors, setup_exception
+from app.api.v1 import router as v1_router
+from benchmarks import _legacy
+
+REQUESTS = 5000
+
+
+def build_legacy_app() -> FastAPI:
+    app = FastAPI()
+    setup_cors(app)
+    _legacy.setup_stand_response(app)
+    setup_exception(app)
+    _legacy.setup_custom_server(app)
+    _legacy.setup_access_log(app)
+    app.include_router(v1_router)
+    return app
+
+
+def build_app() -> FastAPI:
+    app = create_app()
+    app.include_router(v1_router)
+    return app
+
+
+async def run(app: FastAPI) -> list:
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Origin": "http://bench.local"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(300):  # 预热
+            await client.get("/api/v1/ping", headers=headers)
+        samples = []
+        for _ in range(REQUESTS):
+            start = time.perf_counter()
+            response = await client.get("/api/v1/ping", headers=headers)
+            samples.append((time.perf_counter() - start) * 1e6)
+    assert response.json() == {"code": 200, "data": {"status": "ok"}}
+    return samples
+
+
+def percentile(samples: list, p: float) -> float:
+    return statistics.quantiles(samples, n=100)[int(p) - 1]
+
+
+async def main():
+    # 两种实现都会写访问日志，压测时关闭日志输出以免终端 IO 干扰结果
+    logger.setLevel(logging.WARNING)
+
+    results = {
+        "旧版 BaseHTTPMiddleware x3": await run(build_legacy_app()),
+        "单层管道 PipelineMiddleware": await run(build_app()),
+    }
+
+    print(f"{'实现':<32}{'p50(us)':>10}{'p99(us)':>10}")
+    for name, samples in results.items():
+        print(f"{name:<32}{percentile(samples, 50):>10.1f}{percentile(samples, 99):>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
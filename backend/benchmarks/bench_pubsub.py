@@ -0,0 +1,83 @@
+"""
+Pub/Sub 分发基准：吞吐与投递延迟
+
+向一个频道发布 MESSAGES 条消息（pipeline 批量 PUBLISH），
+SUBSCRIBERS 个消费者通过 RedisPubSubManager 接收，统计：
+- 分发吞吐（分发器处理的消息数 / 耗时）
+- 投递延迟 p50 / p99（消息体内携带发布时刻）
+- 因队列已满丢弃的条数
+
+需要可连接的 Redis（读取 REDIS_* 配置）
+运行：cd backend && python -m benchmarks.bench_pubsub
+"""
+import asyncio
+import logging
+import statistics
+import time
+
+from app.boot import logger
+from app.core.redis_pool import RedisPool
+
+MESSAGES = 100_000
+SUBSCRIBERS = 50
+BATCH = 500
+CHANNEL = "bench_pubsub"
+
+
+async def consume(subscription, latencies: list, counter: list):
+    while True:
+        _, data = await subscription.get()
+        if isinstance(data, dict):  # 心跳
+            continue
+        latencies.append(time.perf_counter() - float(data))
+        counter[0] += 1
+
+
+async def main():
+    logger.setLevel(logging.WARNING)
+    manager = await RedisPool.get_pubsub_manager()
+    r = await RedisPool.get_async_redis()
+
+    latencies: list = []
+    counter = [0]
+    consumers = []
+    for _ in range(SUBSCRIBERS):
+        subscription = await manager.subscribe(CHANNEL)
+        consumers.append(asyncio.create_task(consume(subscription, latencies, counter)))
+    await asyncio.sleep(0.2)
+
+    start_count = manager.get_stats()["messages"]
+    start = time.perf_counter()
+    for offset in range(0, MESSAGES, BATCH):
+        pipe = r.pipeline(transaction=False)
+        for _ in range(BATCH):
+            pipe.publish(CHANNEL, repr(time.perf_counter()))
+        await pipe.execute()
+        await asyncio.sleep(0)
+
+    # 等待分发器读完（最多 30 秒）
+    deadline = time.perf_counter() + 30
+    while manager.get_stats()["messages"] - start_count < MESSAGES and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.2)
+
+    distributed = manager.get_stats()["messages"] - start_count
+    expected = distributed * SUBSCRIBERS
+    latencies.sort()
+    print(f"消息数: {MESSAGES}  消费者: {SUBSCRIBERS}")
+    print(f"分发吞吐: {distributed / elapsed:,.0f} msg/s  投递: {counter[0] / elapsed:,.0f} 次/s")
+    if latencies:
+        print(
+            f"投递延迟 p50={statistics.median(latencies) * 1000:.2f}ms  "
+            f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms"
+        )
+    print(f"丢弃: {expected - counter[0]}")
+
+    for task in consumers:
+        task.cancel()
+    await manager.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
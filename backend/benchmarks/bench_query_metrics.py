@@ -0,0 +1,67 @@
+"""
+SQL 查询监控开销基准：同一 SQLite 库上执行 QUERIES 条主键查询，对比
+- 未注册监控
+- 注册监控（语句直方图 + 连接签出统计）
+- 注册监控 + 请求级 QueryStats（contextvar）
+输出每条查询的平均耗时与相对开销
+
+运行：cd backend && python -m benchmarks.bench_query_metrics
+"""
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.db.query_metrics import get_stats, instrument_engine, start_request
+
+QUERIES = 20000
+ROUNDS = 3
+QUERY = text("SELECT name FROM item WHERE id = :id")
+
+
+def make_engine(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS item (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("DELETE FROM item"))
+        conn.execute(text("INSERT INTO item (name) VALUES ('a'), ('b'), ('c')"))
+    return engine
+
+
+def run(engine) -> float:
+    """返回每条查询的平均耗时（微秒），取多轮最小值"""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            for i in range(QUERIES):
+                conn.execute(QUERY, {"id": i % 3 + 1})
+        best = min(best, (time.perf_counter() - start) / QUERIES * 1_000_000)
+    return best
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        plain = make_engine(path)
+        baseline = run(plain)
+        plain.dispose()
+
+        instrumented = make_engine(path)
+        instrument_engine(instrumented, "bench")
+        with_metrics = run(instrumented)
+        stats = start_request()
+        with_request = run(instrumented)
+
+        print(f"查询数: {QUERIES} x {ROUNDS} 轮")
+        print(f"未监控:           {baseline:.2f}us/条")
+        print(f"引擎监控:         {with_metrics:.2f}us/条 (+{(with_metrics / baseline - 1) * 100:.1f}%)")
+        print(f"引擎监控+请求统计: {with_request:.2f}us/条 (+{(with_request / baseline - 1) * 100:.1f}%)")
+        print(f"请求统计: {stats.summary()}")
+        print(f"语句数: {len(get_stats(instrumented)['bench']['statements'])}")
+        instrumented.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+限流算法基准：每次判定的 Redis 往返数、服务端命令数和耗时
+
+每种算法对同一批 IP 连续判定 ROUNDS 次，通过 INFO commandstats 前后差值
+统计脚本内部实际执行的命令数（Redis 7 会把脚本内的 redis.call 计入 commandstats）。
+所有脚本算法客户端侧都只有一次 EVALSHA 往返；hybrid_window 按 pipeline 批次计往返。
+
+需要可连接的 Redis（读取 REDIS_* 配置），会写入 ip_limit:<算法>:bench-* 临时 key
+运行：cd backend && python -m benchmarks.bench_rate_limit
+"""
+import asyncio
+import time
+
+from app.core.rate_limit import HYBRID_WINDOW, STRATEGIES, HybridWindowLimiter
+from app.core.redis_pool import RedisPool
+
+ROUNDS = 20000
+IPS = 100
+LIMIT = 50
+PERIOD = 1
+
+# 不计入的命令：基准自身的 INFO 调用
+_IGNORED = {"cmdstat_info"}
+
+
+def _command_calls(r) -> dict:
+    stats = r.info("commandstats")
+    return {name: v["calls"] for name, v in stats.items() if name not in _IGNORED}
+
+
+def _diff(before: dict, after: dict) -> dict:
+    return {
+        name[len("cmdstat_"):]: calls - before.get(name, 0)
+        for name, calls in after.items()
+        if calls - before.get(name, 0) > 0
+    }
+
+
+def main():
+    r = RedisPool.get_redis()
+    print(f"{'算法':<16}{'往返/次':>8}{'命令/次':>9}{'放行率':>8}{'us/次':>9}  命令明细")
+    for name, strategy in STRATEGIES.items():
+        script = r.register_script(strategy.script)
+        args = strategy.args(LIMIT, PERIOD)
+        keys = [[strategy.key(f"bench-{i}")] for i in range(IPS)]
+        script(keys=keys[0], args=args)  # 预先加载脚本，避免 NOSCRIPT 计入统计
+
+        before = _command_calls(r)
+        allowed = 0
+        start = time.perf_counter()
+        for n in range(ROUNDS):
+            raw = script(keys=keys[n % IPS], args=args)
+            allowed += raw[0]
+        elapsed = time.perf_counter() - start
+        calls = _diff(before, _command_calls(r))
+
+        round_trips = calls.pop("evalsha", 0)
+        inner = sum(calls.values())
+        print(
+            f"{name:<16}"
+            f"{round_trips / ROUNDS:>8.2f}"
+            f"{inner / ROUNDS:>9.2f}"
+            f"{allowed / ROUNDS * 100:>7.1f}%"
+            f"{elapsed / ROUNDS * 1e6:>9.1f}  "
+            + ", ".join(f"{k}={v / ROUNDS:.2f}" for k, v in sorted(calls.items()))
+        )
+        r.delete(*[k[0] for k in keys])
+
+    asyncio.run(bench_hybrid(r))
+
+
+async def bench_hybrid(sync_r):
+    """混合模式：本地预扣，批量 INCRBY"""
+    r = await RedisPool.get_async_redis()
+    limiter = HybridWindowLimiter()
+    before = _command_calls(sync_r)
+    allowed = 0
+    start = time.perf_counter()
+    for n in range(ROUNDS):
+        result = await limiter.hit(r, f"bench-{n % IPS}", LIMIT, PERIOD)
+        allowed += result.allowed
+        if n % 200 == 0:
+            await asyncio.sleep(0)  # 让定时同步任务有机会运行
+    elapsed = time.perf_counter() - start
+    await limiter.close()
+    calls = _diff(before, _command_calls(sync_r))
+    stats = limiter.get_stats()
+    round_trips = stats["strict_decisions"] + stats["flushes"]
+    print(
+        f"{HYBRID_WINDOW:<16}"
+        f"{round_trips / ROUNDS:>8.2f}"
+        f"{sum(calls.values()) / ROUNDS:>9.2f}"
+        f"{allowed / ROUNDS * 100:>7.1f}%"
+        f"{elapsed / ROUNDS * 1e6:>9.1f}  "
+        + ", ".join(f"{k}={v / ROUNDS:.2f}" for k, v in sorted(calls.items()))
+    )
+    keys = await r.keys(f"ip_limit:{HYBRID_WINDOW}:bench-*")
+    if keys:
+        await r.delete(*keys)
+
+
+if __name__ == "__main__":
+    main()
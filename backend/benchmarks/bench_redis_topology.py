@@ -0,0 +1,103 @@
+"""
+Redis 连接方式基准：TCP 与 Unix 域套接字的往返耗时，以及 RESP3 客户端缓存的命中收益
+
+优先在本机启动一个临时 redis-server（同时监听 TCP 端口和 Unix 套接字）作为替身；
+找不到 redis-server 时使用 REDIS_HOST/REDIS_PORT 和 REDIS_UNIX_SOCKET 指定的实例
+- 每种方式各执行 ROUNDS 次 GET（同一个热点 key）与 ROUNDS 次 SET，统计 p50/p99 与吞吐
+- client_cache 行：开启 CLIENT TRACKING 后热点 GET 由进程内缓存返回
+
+运行：cd backend && python -m benchmarks.bench_redis_topology
+"""
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+import redis
+
+from app.boot.config import RedisConfig
+from app.core.redis_pool import build_sync_pool
+
+ROUNDS = 20000
+PORT = int(os.getenv("BENCH_REDIS_PORT", "6390"))
+HOT_KEY = "bench_topology:hot"
+
+
+def start_stand_in():
+    """启动临时 redis-server，返回 (进程, Unix 套接字路径)；没有可执行文件时返回 (None, None)"""
+    binary = os.getenv("REDIS_SERVER_BIN") or shutil.which("redis-server")
+    if not binary:
+        return None, None
+    workdir = tempfile.mkdtemp(prefix="bench-redis-")
+    socket_path = os.path.join(workdir, "redis.sock")
+    process = subprocess.Popen(
+        [binary, "--port", str(PORT), "--unixsocket", socket_path, "--unixsocketperm", "700",
+         "--save", "", "--appendonly", "no", "--dir", workdir],
+        stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.05)
+    return process, socket_path
+
+
+def make_config(**overrides) -> RedisConfig:
+    config = RedisConfig()
+    return config.model_copy(update=overrides)
+
+
+def measure(client, command) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        t = time.perf_counter()
+        command(client)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "ops": ROUNDS / elapsed,
+        "p50": statistics.median(latencies) * 1e6,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1e6,
+    }
+
+
+def main():
+    process, socket_path = start_stand_in()
+    try:
+        if process is not None:
+            base = {"host": "127.0.0.1", "port": PORT, "password": "", "db": 0}
+            print(f"使用临时 redis-server: 127.0.0.1:{PORT} / {socket_path}")
+        else:
+            base = {}
+            socket_path = RedisConfig().unix_socket
+            print(f"未找到 redis-server，使用已配置的实例: {RedisConfig().address}")
+
+        variants = [("tcp", make_config(**base, unix_socket=""))]
+        if socket_path:
+            variants.append(("unix", make_config(**base, unix_socket=socket_path)))
+        variants.append(("tcp+client_cache", make_config(**base, unix_socket="", client_cache=True)))
+
+        print(f"{'连接方式':<18}{'命令':<6}{'ops/s':>10}{'p50 us':>9}{'p99 us':>9}")
+        for name, config in variants:
+            client = redis.Redis(connection_pool=build_sync_pool(config))
+            client.set(HOT_KEY, "x" * 64)
+            client.get(HOT_KEY)  # 预热连接（及客户端缓存）
+            for label, command in (("GET", lambda c: c.get(HOT_KEY)), ("SET", lambda c: c.set(HOT_KEY, "x" * 64))):
+                if label == "SET" and config.client_cache:
+                    continue  # 写命令不经过客户端缓存
+                result = measure(client, command)
+                print(f"{name:<18}{label:<6}{result['ops']:>10,.0f}{result['p50']:>9.1f}{result['p99']:>9.1f}")
+            client.delete(HOT_KEY)
+            client.connection_pool.disconnect()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    main()
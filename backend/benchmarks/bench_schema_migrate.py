@@ -0,0 +1,99 @@
+"""
+启动迁移基准：每次启动全量检查表结构 vs 指纹缓存
+
+生成 TABLES 张表、每张 COLUMNS 列的模型（临时 SQLite 库），统计：
+- 首次启动：建表 + 字段检查 + 保存指纹
+- 再次启动（旧实现）：create_all + auto_migrate_columns 逐表逐列检查
+- 再次启动（指纹一致）：migrate_if_changed 只读一次 schema_meta
+- WORKERS 个进程同时冷启动一个新库：总耗时与实际执行迁移的进程数（应为 1）
+
+运行：cd backend && python -m benchmarks.bench_schema_migrate
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import time
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, create_engine
+
+from app.db.schema_version import migrate_if_changed
+from app.db.sqlite import auto_migrate_columns
+
+TABLES = 200
+COLUMNS = 20
+WORKERS = 4
+ROUNDS = 5
+
+
+def make_metadata() -> MetaData:
+    metadata = MetaData()
+    types = (lambda: String(64), lambda: Integer(), lambda: Text(), lambda: DateTime())
+    for t in range(TABLES):
+        columns = [Column("id", Integer, primary_key=True)]
+        columns += [Column(f"c{c}", types[c % len(types)](), nullable=True) for c in range(COLUMNS - 1)]
+        Table(f"bench_table_{t}", metadata, *columns)
+    return metadata
+
+
+def full_migrate(engine, metadata):
+    def run():
+        metadata.create_all(bind=engine)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return auto_migrate_columns(engine, metadata)
+    return run
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def boot_worker(path: str, results):
+    engine = create_engine(f"sqlite:///{path}")
+    metadata = make_metadata()
+    migrated = migrate_if_changed(engine, metadata, full_migrate(engine, metadata))
+    results.put(migrated)
+    engine.dispose()
+
+
+def main():
+    metadata = make_metadata()
+    print(f"表: {TABLES}  每表列数: {COLUMNS}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        first = timed(lambda: migrate_if_changed(engine, metadata, full_migrate(engine, metadata)))
+        engine.dispose()
+
+        legacy, cached = [], []
+        for _ in range(ROUNDS):
+            # 每轮使用新引擎，模拟新进程启动（无连接和反射缓存）
+            engine = create_engine(f"sqlite:///{path}")
+            legacy.append(timed(full_migrate(engine, metadata)))
+            engine.dispose()
+            engine = create_engine(f"sqlite:///{path}")
+            cached.append(timed(lambda: migrate_if_changed(engine, metadata, full_migrate(engine, metadata))))
+            engine.dispose()
+
+        print(f"首次启动（建表+检查+保存指纹）: {first:.1f}ms")
+        print(f"再次启动 全量检查: {min(legacy):.1f}ms")
+        print(f"再次启动 指纹一致: {min(cached):.2f}ms")
+
+        path = os.path.join(tmp, "workers.db")
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=boot_worker, args=(path, results)) for _ in range(WORKERS)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = (time.perf_counter() - start) * 1000
+        migrated = sum(results.get() for _ in processes)
+        print(f"{WORKERS} 个进程同时冷启动: {elapsed:.1f}ms，执行迁移的进程数: {migrated}")
+
+
+if __name__ == "__main__":
+    main()
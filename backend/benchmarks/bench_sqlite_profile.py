@@ -0,0 +1,102 @@
+"""
+SQLite 调优基准：default vs performance 模式的混合读写 QPS
+
+THREADS 个线程持续 DURATION 秒，每次操作按 WRITE_RATIOS 的比例选择：
+- 读：按主键查一个用户 + 统计用户数
+- 写：插入一个用户并提交
+统计总 QPS、写入 QPS、读延迟 p99 以及 "database is locked" 等错误次数。
+default 为单连接池、无 PRAGMA；performance 为 WAL + PRAGMA、只读连接池 + 单连接写池（RoutingSession）。
+
+运行：cd backend && python -m benchmarks.bench_sqlite_profile
+"""
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.boot import logger
+from app.db import User
+from app.db.routing import RoutingSession
+from app.db.sqlite import init_sqlite, init_sqlite_reader
+
+THREADS = 16
+DURATION = 5
+WRITE_RATIOS = (0.05, 0.2, 0.5)
+SEED_USERS = 1000
+
+
+def make_session_factory(path: str, profile: str):
+    engine = init_sqlite(path, profile=profile)
+    read_engine = init_sqlite_reader(path) if profile == "performance" else None
+    Session = sessionmaker(class_=RoutingSession, bind=engine, read_engine=read_engine, autoflush=False)
+    with Session() as db:
+        db.add_all(User(username=f"seed{i}", hashed_password="x") for i in range(SEED_USERS))
+        db.commit()
+    return Session, [e for e in (engine, read_engine) if e is not None]
+
+
+def run(Session, write_ratio: float) -> dict:
+    deadline = time.perf_counter() + DURATION
+    lock = threading.Lock()
+    totals = {"reads": 0, "writes": 0, "errors": 0}
+    read_latencies = []
+
+    def worker(index: int):
+        rng = random.Random(index)
+        reads = writes = errors = 0
+        latencies = []
+        seq = 0
+        while time.perf_counter() < deadline:
+            try:
+                if rng.random() < write_ratio:
+                    seq += 1
+                    with Session() as db:
+                        db.add(User(username=f"t{index}_{seq}_{time.perf_counter_ns()}", hashed_password="x"))
+                        db.commit()
+                    writes += 1
+                else:
+                    start = time.perf_counter()
+                    with Session() as db:
+                        db.get(User, rng.randint(1, SEED_USERS))
+                        db.scalar(select(func.count()).select_from(User))
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    reads += 1
+            except Exception:
+                errors += 1
+        with lock:
+            totals["reads"] += reads
+            totals["writes"] += writes
+            totals["errors"] += errors
+            read_latencies.extend(latencies)
+
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        list(executor.map(worker, range(THREADS)))
+    read_latencies.sort()
+    totals["p99"] = read_latencies[int(len(read_latencies) * 0.99) - 1] if read_latencies else 0
+    return totals
+
+
+def main():
+    logger.setLevel(logging.WARNING)
+    print(f"线程: {THREADS}  每轮: {DURATION}s  种子用户: {SEED_USERS}")
+    print(f"{'写比例':<8}{'模式':<13}{'QPS':>9}{'写QPS':>9}{'读p99(ms)':>11}{'错误':>7}")
+    for write_ratio in WRITE_RATIOS:
+        for profile in ("default", "performance"):
+            with tempfile.TemporaryDirectory() as tmp:
+                Session, engines = make_session_factory(os.path.join(tmp, "bench.db"), profile)
+                result = run(Session, write_ratio)
+                for engine in engines:
+                    engine.dispose()
+            qps = (result["reads"] + result["writes"]) / DURATION
+            print(f"{write_ratio:<8.0%}{profile:<13}{qps:>9.0f}{result['writes'] / DURATION:>9.0f}"
+                  f"{result['p99']:>11.2f}{result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
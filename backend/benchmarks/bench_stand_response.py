@@ -0,0 +1,103 @@
+"""
+标准响应包装基准测试：旧 BaseHTTPMiddleware 二次解析 vs 序列化阶段包装
+
+运行：cd backend && python -m benchmarks.bench_stand_response
+"""
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from app.boot.application import ExtendedFastAPI
+from app.boot.middleware import setup_stand_response
+from app.boot.pipeline import PipelineMiddleware
+from app.boot.response import StandResponse
+from benchmarks import _legacy
+
+REQUESTS = 3000
+
+PAYLOAD = {
+    "items": [
+        {"id": i, "name": f"task-{i}", "status": "success", "progress": i % 100, "tags": ["a", "b"]}
+        for i in range(50)
+    ],
+    "total": 50,
+}
+
+
+def build_legacy_app() -> FastAPI:
+    app = FastAPI()
+    _legacy.setup_stand_response(app)
+
+    @app.get("/payload")
+    async def payload():
+        return PAYLOAD
+
+    @app.get("/raw")
+    async def raw():
+        return JSONResponse(PAYLOAD)
+
+    return app
+
+
+def build_app() -> FastAPI:
+    app = ExtendedFastAPI(default_response_class=StandResponse)
+    app.add_middleware(PipelineMiddleware, pipeline=app.pipeline)
+    app.use(setup_stand_response)
+
+    @app.get("/payload")
+    async def payload():
+        return PAYLOAD
+
+    @app.get("/raw")
+    async def raw():
+        # 直接返回 JSONResponse，走管道兜底包装
+        return JSONResponse(PAYLOAD)
+
+    @app.get("/stand")
+    async def stand():
+        # 直接返回 StandResponse：序列化阶段包装，不经过 jsonable_encoder
+        return StandResponse(PAYLOAD)
+
+    return app
+
+
+async def run(app: FastAPI, path: str) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(200):  # 预热
+            await client.get(path)
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            response = await client.get(path)
+        elapsed = time.perf_counter() - start
+    assert response.json()["code"] == 200
+    return elapsed / REQUESTS * 1e6
+
+
+async def main():
+    legacy_app = build_legacy_app()
+    app = build_app()
+
+    # 同一路由形态下对比：/payload 经过 jsonable_encoder（两边相同的固定开销），
+    # /raw 直接返回 JSONResponse，只剩包装本身的开销
+    # /stand 对比旧版 /raw：同样跳过 jsonable_encoder，差异只在包装方式
+    rows = []
+    for legacy_path, path, desc in (
+        ("/payload", "/payload", "返回 dict"),
+        ("/raw", "/raw", "返回 JSONResponse，兜底包装"),
+        ("/raw", "/stand", "返回 StandResponse，序列化阶段包装"),
+    ):
+        legacy = await run(legacy_app, legacy_path)
+        current = await run(app, path)
+        rows.append((f"{path}（{desc}）", legacy, current))
+
+    print(f"{'路由':<40}{'旧版 us/req':>14}{'新版 us/req':>14}{'提升':>8}")
+    for name, legacy, current in rows:
+        print(f"{name:<40}{legacy:>14.1f}{current:>14.1f}{legacy / current:>7.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+流式 JSON 包装内存基准：buffered vs incremental
+用 tracemalloc 统计不同响应大小下的内存峰值
+
+运行：cd backend && python -m benchmarks.bench_stream_envelope
+"""
+import asyncio
+import logging
+import tracemalloc
+
+from fastapi import Depends
+from fastapi.responses import StreamingResponse
+
+from app.boot import logger
+from app.boot.application import create_app
+from app.boot.response import stream_envelope, STREAM_BUFFERED, STREAM_INCREMENTAL
+
+CHUNK = b"0" * 65536
+SIZES_MB = (1, 8, 32)
+
+
+def build_app():
+    app = create_app()
+
+    for mode in (STREAM_BUFFERED, STREAM_INCREMENTAL):
+        @app.get(f"/{mode}/{{size_mb}}", dependencies=[Depends(stream_envelope(mode))])
+        async def stream(size_mb: int):
+            async def gen():
+                yield b'"'
+                for _ in range(size_mb * 16):
+                    yield CHUNK
+                yield b'"'
+            return StreamingResponse(gen(), media_type="application/json")
+
+    return app
+
+
+async def measure(app, path: str) -> int:
+    done = asyncio.Event()
+
+    async def receive():
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        # 丢弃 body，只统计中间件自身的内存占用
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            done.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [], "server": ("bench", 80), "client": ("127.0.0.1", 1),
+    }
+    tracemalloc.start()
+    try:
+        await app(scope, receive, send)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+async def main():
+    logger.setLevel(logging.WARNING)
+    app = build_app()
+
+    print(f"{'响应大小':<10}{'buffered 峰值(MB)':>20}{'incremental 峰值(MB)':>24}")
+    for size_mb in SIZES_MB:
+        buffered = await measure(app, f"/{STREAM_BUFFERED}/{size_mb}")
+        incremental = await measure(app, f"/{STREAM_INCREMENTAL}/{size_mb}")
+        print(f"{str(size_mb) + 'MB':<10}{buffered / 2**20:>20.2f}{incremental / 2**20:>24.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+任务更新传输基准：Pub/Sub 与 Redis Streams 的吞吐对比
+
+两种传输各发布 MESSAGES 条消息（pipeline 批量 PUBLISH / XADD MAXLEN ~），
+SUBSCRIBERS 个消费者分别通过 RedisPubSubManager / RedisStreamManager 接收，统计：
+- 发布耗时与吞吐
+- 全部消费者收齐的耗时、投递吞吐
+- Streams 的 XREAD 次数（每次最多 STREAM_READ_COUNT 条）
+
+需要可连接的 Redis（读取 REDIS_* 配置），会写入并删除 bench_transport:* stream
+运行：cd backend && python -m benchmarks.bench_transport
+"""
+import asyncio
+import logging
+import time
+
+from app.boot import logger
+from app.core.redis_pool import STREAM_MAXLEN, RedisPool, RedisStreamManager
+
+MESSAGES = 50_000
+SUBSCRIBERS = 20
+BATCH = 500
+CHANNEL = "bench_transport:pubsub"
+STREAM = "bench_transport:stream"
+
+
+async def consume(subscription, counter: list):
+    while True:
+        channel, _ = await subscription.get()
+        if channel is not None:  # 跳过心跳
+            counter[0] += 1
+
+
+async def run(name: str, manager, subscribe, publish) -> dict:
+    counter = [0]
+    consumers = []
+    for _ in range(SUBSCRIBERS):
+        subscription = await subscribe()
+        consumers.append(asyncio.create_task(consume(subscription, counter)))
+    await asyncio.sleep(0.2)
+
+    start = time.perf_counter()
+    for offset in range(0, MESSAGES, BATCH):
+        await publish(offset)
+        await asyncio.sleep(0)
+    published = time.perf_counter() - start
+
+    expected = MESSAGES * SUBSCRIBERS
+    deadline = time.perf_counter() + 60
+    while counter[0] < expected and time.perf_counter() < deadline:
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+
+    for task in consumers:
+        task.cancel()
+    stats = manager.get_stats()
+    await manager.stop()
+    return {
+        "name": name,
+        "publish": MESSAGES / published,
+        "delivered": counter[0],
+        "expected": expected,
+        "elapsed": elapsed,
+        "reads": stats.get("reads"),
+    }
+
+
+async def main():
+    logger.setLevel(logging.WARNING)
+    r = await RedisPool.get_async_redis()
+    payload = '{"task_uuid": "bench", "progress": 50}'
+
+    async def publish_pubsub(offset):
+        pipe = r.pipeline(transaction=False)
+        for _ in range(BATCH):
+            pipe.publish(CHANNEL, payload)
+        await pipe.execute()
+
+    async def publish_stream(offset):
+        pipe = r.pipeline(transaction=False)
+        for _ in range(BATCH):
+            pipe.xadd(STREAM, {"data": payload}, maxlen=STREAM_MAXLEN, approximate=True)
+        await pipe.execute()
+
+    pubsub = await RedisPool.get_pubsub_manager()
+    streams = RedisStreamManager()
+    options = {"maxsize": MESSAGES}
+    results = [
+        await run("pubsub", pubsub, lambda: pubsub.subscribe(CHANNEL, **options), publish_pubsub),
+        await run("streams", streams, lambda: streams.subscribe(STREAM, **options), publish_stream),
+    ]
+    await r.delete(STREAM)
+
+    print(f"消息数: {MESSAGES}  消费者: {SUBSCRIBERS}")
+    print(f"{'传输':<10}{'发布 msg/s':>12}{'投递 次/s':>12}{'收齐':>8}{'耗时s':>8}{'XREAD':>8}")
+    for result in results:
+        print(
+            f"{result['name']:<10}"
+            f"{result['publish']:>12,.0f}"
+            f"{result['delivered'] / result['elapsed']:>12,.0f}"
+            f"{result['delivered'] / result['expected'] * 100:>7.1f}%"
+            f"{result['elapsed']:>8.2f}"
+            f"{result['reads'] if result['reads'] is not None else '-':>8}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
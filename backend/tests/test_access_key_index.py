@@ -0,0 +1,96 @@
+"""
+AccessKey 进程内索引测试（临时 SQLite 库）
+"""
+import asyncio
+import os
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import access_key_index as index_module
+from app.core.access_key_index import AccessKeyEntry, AccessKeyIndex
+from app.db import AccessKey, Base, User
+
+
+def test_index_warm_refresh_and_invalidate(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.db")
+        sync_engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(sync_engine)
+        Session = sessionmaker(bind=sync_engine)
+        base_time = datetime(2025, 1, 1, 12, 0, 0)
+
+        with Session() as db:
+            db.add(User(id=1, username="main", hashed_password="x", fixed=True, created_at=base_time))
+            db.add(AccessKey(id=1, secret_key="sk-a", max_qps=5, created_by=1, created_at=base_time))
+            db.add(AccessKey(id=2, secret_key="sk-b", max_qps=5, rate_strategy="gcra", rate_limit=100,
+                             rate_period=60, created_by=1, created_at=base_time))
+            db.add(AccessKey(id=3, secret_key="sk-gone", max_qps=5, created_at=base_time,
+                             deleted_at=base_time))
+            db.commit()
+
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        monkeypatch.setattr(index_module, "AsyncSessionLocal", async_sessionmaker(bind=async_engine, expire_on_commit=False))
+        index = AccessKeyIndex()
+
+        async def run():
+            await index.refresh()
+            assert index.get("sk-a").rate == ("fixed_window", 5, 1)
+            assert index.get("sk-b").rate == ("gcra", 100, 60)
+            assert index.get("sk-b").user.username == "main"
+            assert index.get("sk-gone") is None
+
+            # 增量刷新：新增、软删除
+            with Session() as db:
+                later = base_time + timedelta(minutes=1)
+                db.add(AccessKey(id=4, secret_key="sk-new", max_qps=9, created_at=later))
+                key_a = db.get(AccessKey, 1)
+                key_a.deleted_at = later
+                key_a.updated_at = later
+                db.commit()
+            await index.refresh()
+            assert index.get("sk-new").max_qps == 9
+            assert index.get("sk-a") is None
+
+            index.invalidate("sk-b")
+            assert index.get("sk-b") is None
+            await async_engine.dispose()
+
+        asyncio.run(run())
+        sync_engine.dispose()
+
+
+def test_index_lookup_does_not_allocate():
+    """命中路径只是字典读取，不创建新对象"""
+    index = AccessKeyIndex()
+    for i in range(1000):
+        index.put(AccessKeyEntry(i, f"sk-{i}", 10, None))
+    keys = [f"sk-{i}" for i in range(1000)]
+    for key in keys:
+        index.get(key)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(20):
+        for key in keys:
+            index.get(key).rate
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "lineno") if stat.size_diff > 0
+                and "access_key_index" in str(stat.traceback))
+    assert grown == 0
+
+
+def test_entry_from_legacy_cache():
+    """旧版 Redis 缓存没有限流字段时回退到 max_qps"""
+    entry = AccessKeyEntry.from_dict({
+        "max_qps": 7,
+        "access_key": {"id": 1, "secret_key": "sk", "max_qps": 7, "created_by": 1},
+        "user": None,
+    })
+    assert entry.rate == (None, 7, 1)
+    assert AccessKeyEntry.from_dict(entry.to_dict()).rate == entry.rate
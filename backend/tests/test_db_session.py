@@ -0,0 +1,51 @@
+"""
+数据库会话依赖测试：请求级异步会话、连接池参数共用
+"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.v1 import deps
+from app.boot.config import DatabaseConfig
+from app.db.async_engine import init_async_mysql, init_async_sqlite
+
+
+def test_async_db_session_is_request_scoped(tmp_path, monkeypatch):
+    engine = init_async_sqlite(str(tmp_path / "db" / "test.db"))
+    monkeypatch.setattr(deps, "AsyncSessionLocal", async_sessionmaker(bind=engine, expire_on_commit=False))
+    sessions = []
+
+    app = FastAPI()
+
+    @app.get("/value")
+    async def value(db: AsyncSession = Depends(deps.get_async_db)):
+        sessions.append(db)
+        return {"value": (await db.execute(text("SELECT 41 + 1"))).scalar()}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(client.get("/value") for _ in range(3)))
+        checked_out = engine.pool.checkedout()
+        await engine.dispose()
+        return responses, checked_out
+
+    responses, checked_out = asyncio.run(run())
+    assert [r.json() for r in responses] == [{"value": 42}] * 3
+    assert len({id(s) for s in sessions}) == 3  # 每个请求一个会话
+    assert checked_out == 0  # 响应完成后连接已归还
+
+
+def test_async_mysql_shares_pool_options():
+    config = DatabaseConfig().model_copy(update={"pool_size": 3, "max_overflow": 4, "pool_timeout": 5})
+    engine = init_async_mysql(pool_options=config.pool_options)
+    assert engine.pool.size() == 3
+    assert engine.pool._max_overflow == 4
+    assert engine.pool._timeout == 5
+    assert engine.url.drivername == "mysql+aiomysql"
+    with pytest.raises(ValueError):
+        init_async_mysql(driver="mysqldb")
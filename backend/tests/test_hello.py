@@ -13,7 +13,7 @@ def test_hello_world():
     response = client.get("/api/v1/hello")
     assert response.status_code == 200
     data = response.json()
-    assert data["code"] == 0
+    assert data["code"] == 200
     assert "data" in data
     assert data["data"]["message"] == "Hello, base scaffold!"
 
@@ -23,7 +23,7 @@ def test_ping():
     response = client.get("/api/v1/ping")
     assert response.status_code == 200
     data = response.json()
-    assert data["code"] == 0
+    assert data["code"] == 200
     assert data["data"]["status"] == "ok"
 
 
@@ -0,0 +1,29 @@
+"""
+JSON 编解码测试
+"""
+from datetime import datetime
+from decimal import Decimal
+from app.library import json as json_codec
+from app.library.json import EAST_8_TIMEZONE
+
+
+def test_roundtrip_non_ascii():
+    """中文不转义，紧凑格式"""
+    data = {"msg": "接口不存在", "items": [1, 2.5, None, True]}
+    encoded = json_codec.dumps(data)
+    assert encoded == '{"msg":"接口不存在","items":[1,2.5,null,true]}'.encode()
+    assert json_codec.loads(encoded) == data
+    assert json_codec.loads(json_codec.dumps_str(data)) == data
+
+
+def test_datetime_east_8():
+    """有时区时间保留时区，无时区时间按东八区输出"""
+    aware = EAST_8_TIMEZONE.localize(datetime(2025, 1, 1, 12, 0, 0))
+    naive = datetime(2025, 1, 1, 12, 0, 0)
+    assert json_codec.loads(json_codec.dumps({"t": aware}))["t"] == "2025-01-01T12:00:00+08:00"
+    assert json_codec.loads(json_codec.dumps({"t": naive}))["t"] == "2025-01-01T12:00:00+08:00"
+
+
+def test_extra_types():
+    """Decimal / set / 非字符串键"""
+    assert json_codec.loads(json_codec.dumps({1: Decimal("1.10"), "s": {3}})) == {"1": "1.10", "s": [3]}
@@ -0,0 +1,211 @@
+"""
+应用生命周期测试：就绪门控、排空、与 on_event 处理器的组合（连接池预热/关闭用替身）
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.boot.application import ExtendedFastAPI
+from app.boot.pipeline import PipelineMiddleware
+from app.boot.response import StandResponse
+from app.core import lifecycle as lifecycle_module
+from app.core.lifecycle import AppLifecycle, setup_lifecycle
+from app.core.redis_pool import RedisPool, Subscription, SubscriptionClosed
+
+
+@pytest.fixture
+def lifecycle(monkeypatch):
+    """每个测试使用新的生命周期状态，预热/关闭连接池只记录调用"""
+    state = AppLifecycle(drain_timeout=2)
+    calls = []
+    warm_gate = {}
+
+    async def warm_pools():
+        calls.append("warm")
+        gate = warm_gate.get("event")
+        if gate is not None:
+            await gate.wait()
+        return {"redis": 4}
+
+    async def close_pools():
+        calls.append("close")
+
+    monkeypatch.setattr(lifecycle_module, "lifecycle", state)
+    monkeypatch.setattr(lifecycle_module, "warm_pools", warm_pools)
+    monkeypatch.setattr(lifecycle_module, "close_pools", close_pools)
+    monkeypatch.setattr(RedisPool, "_pubsub_manager", None)
+    return state, calls, warm_gate
+
+
+def make_app(calls):
+    # 不使用 create_app：其中的静态文件挂载依赖构建后的前端目录
+    app = ExtendedFastAPI(default_response_class=StandResponse)
+    app.add_middleware(PipelineMiddleware, pipeline=app.pipeline)
+    app.use(setup_lifecycle)
+
+    @app.on_event("startup")
+    async def legacy_startup():
+        calls.append("startup")
+
+    @app.on_event("shutdown")
+    async def legacy_shutdown():
+        calls.append("shutdown")
+
+    @app.get("/ok")
+    async def ok():
+        return "ok"
+
+    @app.get("/slow")
+    async def slow():
+        await asyncio.sleep(0.3)
+        calls.append("slow done")
+        return "slow"
+
+    return app
+
+
+def test_unmanaged_app_serves_requests(lifecycle):
+    """没有经过 lifespan 启动时不做门控"""
+    state, calls, _ = lifecycle
+    app = make_app(calls)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/ok")
+
+    assert asyncio.run(run()).status_code == 200
+    assert state.in_flight == 0
+
+
+def test_readiness_gate_until_warm(lifecycle):
+    state, calls, warm_gate = lifecycle
+    app = make_app(calls)
+
+    async def run():
+        warm_gate["event"] = asyncio.Event()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            context = app.router.lifespan_context(app)
+            startup = asyncio.create_task(context.__aenter__())
+            await asyncio.sleep(0.01)
+            warming = await client.get("/ok")
+            warm_gate["event"].set()
+            await startup
+            ready = await client.get("/ok")
+            await context.__aexit__(None, None, None)
+            stopped = await client.get("/ok")
+        return warming, ready, stopped
+
+    warming, ready, stopped = asyncio.run(run())
+    assert warming.status_code == 503
+    assert warming.json() == {"code": 503, "msg": "服务未就绪"}
+    assert ready.status_code == 200
+    assert stopped.status_code == 503
+    # 预热在 on_event 处理器之前，连接池在 shutdown 处理器之后关闭
+    assert calls == ["warm", "startup", "shutdown", "close"]
+    assert state.warmup == {"redis": 4}
+
+
+def test_shutdown_drains_requests_and_streams(lifecycle):
+    state, calls, _ = lifecycle
+    app = make_app(calls)
+
+    class StubManager:
+        def __init__(self):
+            self.subscription = Subscription(["updates"])
+
+        def close_subscriptions(self, reason="服务正在关闭"):
+            self.subscription.close(SubscriptionClosed(reason))
+            return 1
+
+    async def run():
+        manager = StubManager()
+        RedisPool._pubsub_manager = manager
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            context = app.router.lifespan_context(app)
+            await context.__aenter__()
+            stream_end = asyncio.create_task(manager.subscription.get())
+            slow = asyncio.create_task(client.get("/slow"))
+            await asyncio.sleep(0.05)
+            assert state.in_flight == 1
+
+            shutdown = asyncio.create_task(context.__aexit__(None, None, None))
+            await asyncio.sleep(0.05)
+            rejected = await client.get("/ok")
+            slow_response = await slow
+            await shutdown
+        with pytest.raises(SubscriptionClosed):
+            await stream_end
+        return rejected, slow_response
+
+    rejected, slow_response = asyncio.run(run())
+    assert rejected.status_code == 503
+    assert rejected.headers["connection"] == "close"
+    assert slow_response.status_code == 200
+    # 处理中的请求完成后才执行 shutdown 处理器和关闭连接池
+    assert calls == ["warm", "startup", "slow done", "shutdown", "close"]
+    assert state.in_flight == 0 and state.closed_streams == 1
+
+
+def test_exit_signal_starts_drain(lifecycle):
+    """uvicorn 的退出处理（包装后的 handle_exit 或先安装的信号处理器）先开始排空再执行原逻辑"""
+    import signal
+
+    import uvicorn
+
+    state, _, _ = lifecycle
+    previous = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+    original_handle_exit = uvicorn.Server.handle_exit.__wrapped__  # 包装前的实现
+
+    async def run():
+        state._loop = asyncio.get_running_loop()
+        state.state = lifecycle_module.READY
+        server = uvicorn.Server(uvicorn.Config(make_app([])))
+        server.handle_exit(signal.SIGTERM, None)
+        await asyncio.sleep(0)
+        drained_by_server = (state.state, server.should_exit)
+
+        # 新版 uvicorn 在加载应用前用 signal.signal 安装处理器，绑定的是包装前的 handle_exit
+        state.state = lifecycle_module.READY
+        server = uvicorn.Server(uvicorn.Config(make_app([])))
+        signal.signal(signal.SIGTERM, original_handle_exit.__get__(server))
+        hooked = lifecycle_module._chain_exit_signals()
+        signal.getsignal(signal.SIGTERM)(signal.SIGTERM, None)
+        await asyncio.sleep(0)
+        return drained_by_server, hooked, (state.state, server.should_exit)
+
+    try:
+        drained_by_server, hooked, drained_by_signal = asyncio.run(run())
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    assert drained_by_server == (lifecycle_module.DRAINING, True)
+    assert hooked
+    assert drained_by_signal == (lifecycle_module.DRAINING, True)
+
+
+def test_warns_when_exit_signals_not_hooked(lifecycle):
+    """没有服务器信号处理器时记录警告，只在 lifespan shutdown 时排空"""
+    from app.boot import logger
+    from tests.test_pipeline import capture_logs
+
+    _, calls, _ = lifecycle
+    app = make_app(calls)
+
+    async def run():
+        context = app.router.lifespan_context(app)
+        await context.__aenter__()
+        await context.__aexit__(None, None, None)
+
+    # 不用 asyncio.run：它会在主线程安装自己的 SIGINT 处理器
+    loop = asyncio.new_event_loop()
+    handler = capture_logs()
+    try:
+        loop.run_until_complete(run())
+    finally:
+        logger.removeHandler(handler)
+        loop.close()
+    assert any(r.levelname == "WARNING" and "SIGTERM" in r.getMessage() for r in handler.records)
@@ -0,0 +1,196 @@
+"""
+限流器测试（不依赖 Redis 的部分）
+"""
+from fastapi import Request
+from fastapi.testclient import TestClient
+from app.boot.application import create_app
+from app.boot.exceptions import APIException
+from app.core.limiter import RATE_LIMIT_STATE_KEY, rate_limiter, setup_rate_limit
+from app.core.rate_limit import DEFAULT_STRATEGY, RateLimitResult, get_strategy
+
+
+def test_sync_limiter_connects_lazily():
+    """导入模块时不建立 Redis 连接"""
+    assert rate_limiter._redis is None
+
+
+def test_rate_limit_hook_rejects_missing_key():
+    """管道钩子只作用于指定前缀，缺少访问密钥时直接短路"""
+    app = create_app()
+    app.use(setup_rate_limit(("/open",)))
+
+    @app.get("/open/ping")
+    async def open_ping():
+        return "pong"
+
+    @app.get("/ping")
+    async def ping():
+        return "pong"
+
+    client = TestClient(app)
+    response = client.get("/open/ping")
+    assert response.status_code == 401
+    assert response.json() == {"code": 1, "msg": "缺少访问密钥"}
+    assert client.get("/ping").json() == {"code": 200, "data": "pong"}
+
+
+def test_rate_limit_result_headers():
+    """RateLimit-Reset / Retry-After 以秒为单位向上取整"""
+    assert RateLimitResult(True, 10, 9, 1500, 0).headers() == {
+        "RateLimit-Limit": "10", "RateLimit-Remaining": "9", "RateLimit-Reset": "2",
+    }
+    assert RateLimitResult(False, 10, 0, 800, 200).headers()["Retry-After"] == "1"
+
+
+def test_unknown_strategy_falls_back():
+    assert get_strategy(None).name == DEFAULT_STRATEGY
+    assert get_strategy("leaky").name == DEFAULT_STRATEGY
+    assert get_strategy("gcra").name == "gcra"
+
+
+def test_rate_limit_headers_on_success_and_reject():
+    """放行的请求带 RateLimit-* 头，429 透传 Retry-After"""
+    app = create_app()
+    app.use(setup_rate_limit())
+
+    @app.get("/ok")
+    async def ok(request: Request):
+        setattr(request.state, RATE_LIMIT_STATE_KEY, RateLimitResult(True, 5, 4, 1000, 0))
+        return "ok"
+
+    @app.get("/limited")
+    async def limited():
+        result = RateLimitResult(False, 5, 0, 1000, 2500)
+        raise APIException("IP请求超过限制（5次/秒）", status_code=429, code=429, headers=result.headers())
+
+    client = TestClient(app)
+    response = client.get("/ok")
+    assert response.headers["ratelimit-remaining"] == "4"
+    assert "retry-after" not in response.headers
+
+    response = client.get("/limited")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
+    assert response.json()["code"] == 429
+
+
+class _StubPipeline:
+    def __init__(self, store):
+        self.store = store
+        self.ops = []
+
+    def incrby(self, key, n):
+        self.ops.append((key, n))
+
+    def pexpire(self, key, ms):
+        self.ops.append(None)
+
+    async def execute(self):
+        results = []
+        for op in self.ops:
+            if op is None:
+                results.append(True)
+            else:
+                self.store[op[0]] = self.store.get(op[0], 0) + op[1]
+                results.append(self.store[op[0]])
+        return results
+
+
+class _StubRedis:
+    """只实现混合限流用到的 pipeline INCRBY / PEXPIRE"""
+    def __init__(self):
+        self.store = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=False):
+        self.round_trips += 1
+        return _StubPipeline(self.store)
+
+
+def test_hybrid_limiter_batches_and_bounds_overshoot():
+    """本地预扣大幅减少 Redis 往返，多进程共享计数时超发受 budget_ratio 约束"""
+    import asyncio
+    from app.core.rate_limit import HybridWindowLimiter
+
+    async def run():
+        redis = _StubRedis()
+        workers = [HybridWindowLimiter(flush_interval_ms=5, flush_batch=50, max_staleness_ms=1000, budget_ratio=0.1)
+                   for _ in range(4)]
+        allowed = 0
+        for i in range(20000):
+            result = await workers[i % 4].hit(redis, "1.1.1.1", 10000, 3600)
+            allowed += result.allowed
+            if i % 100 == 0:
+                await asyncio.sleep(0)
+        for worker in workers:
+            await worker.close()
+        decisions = sum(w.decisions for w in workers)
+        return allowed, redis.round_trips, decisions, sum(w.redis_commands for w in workers)
+
+    allowed, round_trips, decisions, commands = asyncio.run(run())
+    assert 10000 <= allowed <= 10000 * (1 + 0.1 * 4)
+    assert round_trips * 10 < decisions
+    assert commands / decisions < 0.2
+
+
+class _FailingPipeline(_StubPipeline):
+    async def execute(self):
+        raise ConnectionError("redis down")
+
+
+def test_hybrid_strict_path_restores_pending_on_failure():
+    """严格模式写入失败时，本地已放行的次数还给本地，下次同步不丢失"""
+    import asyncio
+    import pytest
+    from app.core.rate_limit import HybridWindowLimiter
+
+    async def run():
+        redis = _StubRedis()
+        limiter = HybridWindowLimiter(flush_interval_ms=60000, flush_batch=1000, max_staleness_ms=60000,
+                                      budget_ratio=0.5)
+        for _ in range(5):
+            assert (await limiter.hit(redis, "1.1.1.1", 10, 60)).allowed
+        assert limiter._pending_total == 5
+
+        redis.pipeline = lambda transaction=False: _FailingPipeline(redis.store)
+        with pytest.raises(ConnectionError):
+            await limiter.hit(redis, "1.1.1.1", 10, 60)  # 本地额度用完，进入严格模式
+        pending = (limiter._pending_total, sum(e.pending for e in limiter._entries.values()))
+
+        del redis.pipeline  # 恢复正常 pipeline
+        await limiter.flush()
+        await limiter.close()
+        return pending, sum(redis.store.values())
+
+    pending, stored = asyncio.run(run())
+    assert pending == (5, 5)
+    assert stored == 5
+
+
+def test_sync_limiter_falls_back_from_hybrid_once():
+    """同步限流器遇到 hybrid_window 按固定窗口限流，只警告一次"""
+    from app.boot import logger
+    from app.core.limiter import DynamicIPRateLimiter
+    from tests.test_pipeline import capture_logs
+
+    class _Redis:
+        def register_script(self, script):
+            def run(keys, args):
+                run.keys.append(keys[0])
+                return [1, 9, 1000, 0]
+            run.keys = []
+            self.script = run
+            return run
+
+    limiter = DynamicIPRateLimiter()
+    limiter._redis = _Redis()
+    handler = capture_logs()
+    try:
+        results = [limiter._check_ip_limit("1.1.1.1", "hybrid_window", 10, 1) for _ in range(3)]
+    finally:
+        logger.removeHandler(handler)
+
+    assert all(r.allowed for r in results)
+    assert limiter._scripts.keys() == {DEFAULT_STRATEGY}
+    warnings = [r.getMessage() for r in handler.records if r.levelname == "WARNING"]
+    assert len(warnings) == 1 and "hybrid_window" in warnings[0]
@@ -0,0 +1,42 @@
+"""
+进程内 L1 缓存测试
+"""
+import time
+from app.core.local_cache import LocalTTLCache
+
+
+def test_lru_eviction():
+    """超过容量时淘汰最久未使用的条目"""
+    cache = LocalTTLCache(maxsize=2, ttl=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"  # 1 变为最近使用
+    cache.set(3, "c")
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_ttl_expire():
+    """超过 TTL 的条目视为未命中"""
+    cache = LocalTTLCache(maxsize=10, ttl=0.05)
+    cache.set("k", 1)
+    assert cache.get("k") == 1
+    time.sleep(0.06)
+    assert cache.get("k") is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 0)
+
+
+def test_user_cache_invalidation_message():
+    """失效消息按用户ID或全部清除 L1"""
+    from app.api.v1 import deps
+
+    deps.user_l1_cache.set(1, {"id": 1})
+    deps.user_l1_cache.set(2, {"id": 2})
+    deps._evict_local_user_cache("1")
+    assert deps.user_l1_cache.get(1) is None
+    assert deps.user_l1_cache.get(2) == {"id": 2}
+    deps._evict_local_user_cache(deps.USER_CACHE_INVALIDATE_ALL)
+    assert deps.user_l1_cache.get(2) is None
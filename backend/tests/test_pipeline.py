@@ -0,0 +1,93 @@
+"""
+中间件管道测试
+"""
+import logging
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.testclient import TestClient
+from app.boot import logger
+from app.boot.application import ExtendedFastAPI, create_app
+from app.boot.middleware import setup_compression
+from app.boot.pipeline import PipelineMiddleware
+from app.middleware import setup_access_log
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__(level=logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def capture_logs():
+    handler = ListHandler()
+    logger.addHandler(handler)
+    return handler
+
+
+def test_access_log_error_path():
+    """未被处理的异常记录错误日志，而不是成功日志"""
+    app = ExtendedFastAPI()
+    app.add_middleware(PipelineMiddleware, pipeline=app.pipeline)
+    app.use(setup_access_log)
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    handler = capture_logs()
+    try:
+        TestClient(app, raise_server_exceptions=False).get("/boom")
+    finally:
+        logger.removeHandler(handler)
+
+    messages = [r.getMessage() for r in handler.records]
+    assert any(r.levelno == logging.ERROR and "boom" in r.getMessage() for r in handler.records)
+    assert not any(m.startswith("⬅️") for m in messages)
+
+
+def test_on_request_short_circuit():
+    """on_request 返回响应时直接短路，后续钩子仍能拿到状态码"""
+    app = create_app()
+    completed = []
+
+    @app.pipeline.on_request
+    async def block(ctx):
+        if ctx.path == "/blocked":
+            return PlainTextResponse("blocked", status_code=503)
+
+    @app.pipeline.on_complete
+    def record(ctx):
+        completed.append((ctx.path, ctx.status_code, ctx.error))
+
+    response = TestClient(app).get("/blocked")
+    assert response.status_code == 503
+    assert response.text == "blocked"
+    assert response.headers["server"] == "struggler/1.0"
+    assert completed == [("/blocked", 503, None)]
+
+
+def test_on_request_error_reaches_error_hooks():
+    """on_request 抛出的异常同样交给 on_error 处理"""
+    app = create_app()
+
+    @app.pipeline.on_request
+    async def broken(ctx):
+        raise RuntimeError("hook failed")
+
+    assert TestClient(app).get("/anything").json() == {"code": 1, "msg": "hook failed"}
+
+
+def test_pipeline_inside_compression():
+    """GZip 位于管道外层，包装逻辑处理的是未压缩的 body"""
+    app = create_app()
+    app.use(setup_compression)
+
+    @app.get("/big")
+    async def big():
+        return JSONResponse({"v": "x" * 2000})
+
+    response = TestClient(app).get("/big")
+    assert response.headers["content-encoding"] == "gzip"
+    assert list(response.json()) == ["code", "data"]
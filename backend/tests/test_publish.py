@@ -0,0 +1,94 @@
+"""
+RedisPool 批量发布与 BufferedPublisher 测试（用 pipeline 替身统计往返次数）
+"""
+import asyncio
+
+import pytest
+
+from app.core.redis_pool import BufferedPublisher, RedisPool
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.queued = []
+
+    def publish(self, channel, message):
+        self.queued.append((channel, message))
+
+    spublish = publish
+
+    async def execute(self):
+        await asyncio.sleep(0)
+        if self.client.fail:
+            raise ConnectionError("redis down")
+        self.client.round_trips += 1
+        self.client.published.extend(self.queued)
+        return [1] * len(self.queued)
+
+
+class FakeAsyncRedis:
+    def __init__(self):
+        self.round_trips = 0
+        self.published = []
+        self.fail = False
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fake = FakeAsyncRedis()
+
+    async def get_async_redis():
+        return fake
+    monkeypatch.setattr(RedisPool, "get_async_redis", get_async_redis)
+    return fake
+
+
+def test_async_publish_many_uses_one_round_trip(fake_redis):
+    messages = [(f"task:{i}", str(i)) for i in range(300)]
+    results = asyncio.run(RedisPool.async_publish_many(messages))
+    assert results == [1] * 300
+    assert fake_redis.round_trips == 1
+    assert fake_redis.published == messages
+
+
+def test_buffered_publisher_coalesces_by_time_and_size(fake_redis):
+    async def run():
+        publisher = BufferedPublisher(max_items=100, max_delay_ms=5)
+        for i in range(250):
+            publisher.publish("updates", str(i))
+        # 攒满 100 条立即发出，剩余的等待定时器
+        await asyncio.sleep(0.05)
+        trips_after_timer = fake_redis.round_trips
+
+        publisher.publish("updates", "last")
+        await publisher.close()
+        with pytest.raises(RuntimeError):
+            publisher.publish("updates", "late")
+        return trips_after_timer, publisher.get_stats()
+
+    trips_after_timer, stats = asyncio.run(run())
+    assert fake_redis.published == [("updates", str(i)) for i in range(250)] + [("updates", "last")]
+    assert trips_after_timer <= 3
+    assert stats["published"] == 251 and stats["buffered"] == 0 and stats["errors"] == 0
+
+
+def test_buffered_publisher_flush_is_explicit_and_errors_are_counted(fake_redis):
+    async def run():
+        publisher = BufferedPublisher(max_items=1000, max_delay_ms=10_000)
+        publisher.publish("a", "1")
+        publisher.publish("b", "2")
+        await publisher.flush()
+        flushed = list(fake_redis.published)
+
+        fake_redis.fail = True
+        publisher.publish("a", "3")
+        await publisher.flush()
+        return flushed, publisher.get_stats()
+
+    flushed, stats = asyncio.run(run())
+    assert flushed == [("a", "1"), ("b", "2")]
+    assert stats["published"] == 2 and stats["errors"] == 1 and stats["flushes"] == 2
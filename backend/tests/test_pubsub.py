@@ -0,0 +1,379 @@
+"""
+RedisPubSubManager 测试（用进程内的 PubSub 替身代替 Redis 连接）
+"""
+import asyncio
+import fnmatch
+import time
+
+import pytest
+
+from app.core.redis_pool import (
+    BACKPRESSURE_COALESCE, BACKPRESSURE_DISCONNECT, BACKPRESSURE_DROP_NEWEST, BACKPRESSURE_DROP_OLDEST,
+    PrefixIndex, RedisPubSubManager, SlowConsumerError,
+)
+from app.library import json as json_codec
+
+
+class FakePubSub:
+    """只实现分发器用到的 (p/s)subscribe / (p/s)unsubscribe / get_message"""
+
+    def __init__(self):
+        self.channels = set()
+        self.patterns = set()
+        self.shard_channels = set()
+        self.commands = []  # 发给 Redis 的订阅类命令
+        self.inbox = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            self.channels.add(channel)
+            self.inbox.put_nowait({"type": "subscribe", "channel": channel, "data": 1})
+
+    async def unsubscribe(self, *channels):
+        self.channels.difference_update(channels)
+
+    async def psubscribe(self, *patterns):
+        self.commands.append(("PSUBSCRIBE",) + patterns)
+        self.patterns.update(patterns)
+
+    async def punsubscribe(self, *patterns):
+        self.commands.append(("PUNSUBSCRIBE",) + patterns)
+        self.patterns.difference_update(patterns)
+
+    async def execute_command(self, command, *channels):
+        self.commands.append((command,) + channels)
+        if command == "SSUBSCRIBE":
+            self.shard_channels.update(channels)
+        elif command == "SUNSUBSCRIBE":
+            self.shard_channels.difference_update(channels)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            return await asyncio.wait_for(self.inbox.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.pubsub_instance = FakePubSub()
+        self.pings = 0
+
+    def pubsub(self):
+        return self.pubsub_instance
+
+    async def ping(self):
+        self.pings += 1
+        return True
+
+    async def close(self):
+        pass
+
+    def publish(self, channel, data):
+        pubsub = self.pubsub_instance
+        if channel in pubsub.channels:
+            pubsub.inbox.put_nowait({"type": "message", "channel": channel, "data": data})
+        # 与 Redis 一致：每个匹配的模式各推送一条 pmessage
+        for pattern in pubsub.patterns:
+            if fnmatch.fnmatchcase(channel, pattern):
+                pubsub.inbox.put_nowait({"type": "pmessage", "pattern": pattern, "channel": channel, "data": data})
+
+    def spublish(self, channel, data):
+        if channel in self.pubsub_instance.shard_channels:
+            self.pubsub_instance.inbox.put_nowait({"type": "smessage", "channel": channel, "data": data})
+
+
+def make_manager(fake: FakeRedis) -> RedisPubSubManager:
+    RedisPubSubManager._instance = None
+    manager = RedisPubSubManager()
+    manager._create_client = lambda: fake
+    return manager
+
+
+@pytest.fixture(autouse=True)
+def reset_singleton():
+    yield
+    RedisPubSubManager._instance = None
+
+
+def test_distributor_delivers_burst_without_polling():
+    """连续读取，不在每条消息后 sleep，消息突发期间不做连接检查"""
+    async def run():
+        fake = FakeRedis()
+        manager = make_manager(fake)
+        for _ in range(20):
+            await manager.subscribe("updates")
+        await asyncio.sleep(0)
+        pings_before = fake.pings
+
+        start = time.perf_counter()
+        for i in range(5000):
+            fake.publish("updates", str(i))
+        while manager.get_stats()["messages"] < 5000:
+            await asyncio.sleep(0)
+        elapsed = time.perf_counter() - start
+
+        stats = manager.get_stats()
+        await manager.stop()
+        return elapsed, fake.pings - pings_before, stats
+
+    elapsed, pings, stats = asyncio.run(run())
+    # 旧实现每条消息 sleep 10ms，5000 条至少 50 秒
+    assert elapsed < 5
+    assert pings == 0
+    assert stats["messages"] == 5000
+    assert stats["consumers"] == 20
+
+
+def test_idle_listeners_use_no_cpu():
+    """1 万个空闲的多频道监听者不轮询队列，消息到达后立即送达"""
+    async def run():
+        fake = FakeRedis()
+        manager = make_manager(fake)
+        received = []
+
+        async def consumer(i):
+            async for message in manager.listen(f"task:{i % 10}", "broadcast"):
+                if isinstance(message, dict) and message.get("channel") == "broadcast":
+                    received.append(i)
+                    return
+
+        tasks = [asyncio.create_task(consumer(i)) for i in range(10000)]
+        while manager.get_stats()["consumers"] < 10000:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)  # 等初始心跳、init 消息消费完
+
+        cpu_start = time.process_time()
+        await asyncio.sleep(1)
+        idle_cpu = time.process_time() - cpu_start
+
+        start = time.perf_counter()
+        fake.publish("broadcast", "go")
+        await asyncio.wait_for(asyncio.gather(*tasks), 10)
+        delivery = time.perf_counter() - start
+
+        await asyncio.sleep(0)
+        stats = manager.get_stats()
+        await manager.stop()
+        return idle_cpu, delivery, len(received), stats
+
+    idle_cpu, delivery, received, stats = asyncio.run(run())
+    # 旧实现每个监听者每 0.1 秒轮询一次各频道队列，1 万个监听者空闲时会占满 CPU
+    assert idle_cpu < 0.2
+    assert received == 10000
+    assert delivery < 5
+    # 监听者退出后取消全部订阅
+    assert stats["consumers"] == 0 and stats["channels"] == 0
+
+
+def _status(task_uuid, progress):
+    return json_codec.dumps_str({"task_uuid": task_uuid, "progress": progress})
+
+
+def test_backpressure_policies():
+    """慢消费者的队列不超过上限，各策略保留的消息符合预期"""
+    async def drain(subscription):
+        items = []
+        while subscription.qsize():
+            items.append((await subscription.get())[1])
+        return items
+
+    async def run():
+        fake = FakeRedis()
+        manager = make_manager(fake)
+        newest = await manager.subscribe("updates", maxsize=3, policy=BACKPRESSURE_DROP_NEWEST)
+        oldest = await manager.subscribe("updates", maxsize=3, policy=BACKPRESSURE_DROP_OLDEST)
+        coalesce = await manager.subscribe("updates", maxsize=3, policy=BACKPRESSURE_COALESCE)
+        disconnect = await manager.subscribe("updates", maxsize=3, policy=BACKPRESSURE_DISCONNECT)
+
+        messages = [_status("a", 1), _status("b", 1), _status("a", 2), _status("c", 1), _status("a", 3), _status("d", 1)]
+        for message in messages:
+            manager._dispatch("updates", message)
+
+        stats = manager.get_stats()["channel_stats"]["updates"]
+        result = {
+            "newest": await drain(newest),
+            "oldest": await drain(oldest),
+            "coalesce": await drain(coalesce),
+        }
+        with pytest.raises(SlowConsumerError):
+            await disconnect.get()
+        await manager.stop()
+        return result, stats
+
+    result, stats = asyncio.run(run())
+    assert result["newest"] == [_status("a", 1), _status("b", 1), _status("a", 2)]
+    assert result["oldest"] == [_status("c", 1), _status("a", 3), _status("d", 1)]
+    # a 的状态原位更新为最新，满了之后丢弃最旧的 a
+    assert result["coalesce"] == [_status("b", 1), _status("c", 1), _status("d", 1)]
+    assert stats["subscribers"] == 4
+    assert stats["coalesced"] == 2
+    assert stats["disconnected"] == 1
+    assert stats["dropped"] == 3 + 3 + 1 + 2  # drop_newest 3 条，drop_oldest 3 条，coalesce 1 条，断开后 2 条
+
+
+def test_disconnect_policy_ends_listener():
+    async def run():
+        fake = FakeRedis()
+        manager = make_manager(fake)
+        listener = manager.listen("updates", maxsize=2, policy=BACKPRESSURE_DISCONNECT)
+        assert (await listener.__anext__())["event"] == "init"
+        for i in range(5):
+            manager._dispatch("updates", str(i))
+        messages = [message async for message in listener]
+        stats = manager.get_stats()
+        await manager.stop()
+        return messages, stats
+
+    messages, stats = asyncio.run(run())
+    assert messages == []
+    assert stats["consumers"] == 0
+
+
+def test_shared_heartbeat_only_for_idle_listeners():
+    """心跳由共享时间轮驱动，只发给整个周期内没有消息的监听者，且不写队列"""
+    from app.core.redis_pool import HEARTBEAT, HeartbeatWheel
+
+    async def run():
+        fake = FakeRedis()
+        manager = make_manager(fake)
+        manager._heartbeats = HeartbeatWheel(interval=0.3, resolution=0.05)
+        received = {"idle": [], "busy": []}
+
+        async def consumer(name, channel):
+            async for message in manager.listen(channel):
+                received[name].append(message)
+
+        tasks = [asyncio.create_task(consumer("idle", "idle")), asyncio.create_task(consumer("busy", "busy"))]
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            fake.publish("busy", "tick")
+        idle_subscription = next(iter(manager._channel_subscribers["idle"]))
+        queued = idle_subscription.qsize()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await manager.stop()
+        return received, queued
+
+    received, queued = asyncio.run(run())
+    # 初始化事件 + 初始心跳 + 约 1 秒内每 0.3 秒一次心跳
+    idle_heartbeats = [m for m in received["idle"] if m is HEARTBEAT]
+    assert 3 <= len(idle_heartbeats) <= 6
+    busy_heartbeats = [m for m in received["busy"] if m is HEARTBEAT]
+    assert len(busy_heartbeats) == 1  # 只有初始心跳
+    assert queued == 0
+
+
+def test_heartbeat_wheel_checks_each_listener_once_per_interval():
+    from app.core.redis_pool import HeartbeatWheel, Subscription
+
+    async def run():
+        wheel = HeartbeatWheel(interval=10, resolution=1)
+        subscriptions = [Subscription(("c",)) for _ in range(1000)]
+        for subscription in subscriptions:
+            wheel.add(subscription)
+        now = time.monotonic()
+        wheel.tick(now + 5)
+        assert wheel.sent == 0
+        subscriptions[0].last_active = now + 8  # 期间收到过消息
+        wheel.tick(now + 11)
+        assert wheel.sent == 999
+        assert len(wheel) == 1000
+        wheel.remove(subscriptions[1])
+        assert len(wheel) == 999
+
+    asyncio.run(run())
+
+
+def test_prefix_index_longest_match():
+    index = PrefixIndex(["task:", "task:progress:", "user"])
+    assert index.longest("task:abc") == "task:"
+    assert index.longest("task:progress:abc") == "task:progress:"
+    assert index.longest("tas") is None
+    assert index.longest("broadcast") is None
+
+
+def test_prefix_channels_share_one_pattern_subscription():
+    """task:{uuid} 频道共用一个 PSUBSCRIBE，按频道名本地分发"""
+    async def run():
+        fake = FakeRedis()
+        manager = make_manager(fake)
+        manager.pattern_prefixes = PrefixIndex(["task:"])
+        subscriptions = {i: await manager.subscribe(f"task:{i}") for i in range(100)}
+        plain = await manager.subscribe("broadcast")
+        watcher = await manager.subscribe(patterns=["task:*"])
+        commands = list(fake.pubsub_instance.commands)
+
+        fake.publish("task:7", "progress")
+        fake.publish("broadcast", "hello")
+        while manager.get_stats()["messages"] < 2:
+            await asyncio.sleep(0)
+
+        received = {
+            "task": await subscriptions[7].get(),
+            "plain": await plain.get(),
+            "watcher": await watcher.get(),
+            "others": sum(s.qsize() for i, s in subscriptions.items() if i != 7),
+            "duplicates": subscriptions[7].qsize() + watcher.qsize(),
+        }
+        stats = manager.get_stats()
+
+        for subscription in subscriptions.values():
+            await manager.unsubscribe(subscription)
+        still_subscribed = set(fake.pubsub_instance.patterns)
+        await manager.unsubscribe(watcher)
+        remaining = set(fake.pubsub_instance.patterns)
+        await manager.stop()
+        return commands, received, stats, still_subscribed, remaining
+
+    commands, received, stats, still_subscribed, remaining = asyncio.run(run())
+    # 100 个任务频道 + 一个模式消费者只发出一条 PSUBSCRIBE
+    assert commands == [("PSUBSCRIBE", "task:*")]
+    assert received["task"] == ("task:7", "progress")
+    assert received["plain"] == ("broadcast", "hello")
+    assert received["watcher"] == ("task:7", "progress")
+    assert received["others"] == 0 and received["duplicates"] == 0
+    assert stats["patterns"] == 1 and stats["consumers"] == 102
+    # 模式消费者还在时保留 PSUBSCRIBE，全部退出后取消
+    assert still_subscribed == {"task:*"}
+    assert remaining == set()
+
+
+def test_pattern_listener_receives_channel_names():
+    async def run():
+        fake = FakeRedis()
+        manager = make_manager(fake)
+        listener = manager.listen(patterns=["job:*"])
+        assert (await listener.__anext__())["event"] == "init"
+        assert (await listener.__anext__())["event"] == "heartbeat"
+        fake.publish("job:1", "started")
+        message = await listener.__anext__()
+        await listener.aclose()
+        stats = manager.get_stats()
+        await manager.stop()
+        return message, stats
+
+    message, stats = asyncio.run(run())
+    assert message == {"channel": "job:1", "data": "started"}
+    assert stats["patterns"] == 0 and stats["consumers"] == 0
+
+
+def test_sharded_subscriptions_use_ssubscribe():
+    async def run():
+        fake = FakeRedis()
+        manager = make_manager(fake)
+        manager.sharded = True
+        subscription = await manager.subscribe("orders")
+        fake.spublish("orders", "created")
+        message = await subscription.get()
+        await manager.unsubscribe(subscription)
+        await manager.stop()
+        return message, fake.pubsub_instance.commands
+
+    message, commands = asyncio.run(run())
+    assert message == ("orders", "created")
+    assert commands == [("SSUBSCRIBE", "orders"), ("SUNSUBSCRIBE", "orders")]
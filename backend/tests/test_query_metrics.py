@@ -0,0 +1,111 @@
+"""
+SQL 查询监控测试：语句耗时统计、慢查询日志、请求级查询数与 N+1 警告、连接签出耗时
+"""
+import logging
+
+from fastapi.testclient import TestClient
+from sqlalchemy import bindparam, create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.boot import logger
+from app.boot.application import ExtendedFastAPI
+from app.boot.pipeline import PipelineMiddleware
+from app.core.query_metrics import setup_query_metrics
+from app.db import query_metrics
+from app.db.query_metrics import get_stats, instrument_engine, normalize_statement
+from app.middleware import setup_access_log
+from tests.test_pipeline import capture_logs
+
+
+def make_engine(tmp_path, name="test.db"):
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("INSERT INTO item (name) VALUES ('a'), ('b'), ('c')"))
+    return engine
+
+
+def test_normalize_statement():
+    assert normalize_statement("SELECT *\n  FROM item WHERE id IN (?, ?, ?)") == "SELECT * FROM item WHERE id IN (?...)"
+    assert normalize_statement("SELECT 1 WHERE a IN (%s,%s)") == "SELECT 1 WHERE a IN (%s...)"
+    assert len(normalize_statement("SELECT " + "x" * 500)) == query_metrics.STATEMENT_MAX_LENGTH + 1
+
+
+def test_engine_statement_histograms_and_slow_log(tmp_path, monkeypatch):
+    engine = make_engine(tmp_path)
+    metrics = instrument_engine(engine, "primary")
+    in_query = text("SELECT name FROM item WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+    with engine.connect() as conn:
+        for ids in ([1], [1, 2], [1, 2, 3]):
+            conn.execute(in_query, {"ids": ids})
+        monkeypatch.setattr(query_metrics, "DB_SLOW_QUERY_MS", 0.000001)
+        handler = capture_logs()
+        try:
+            conn.execute(text("SELECT count(*) FROM item"))
+        finally:
+            logger.removeHandler(handler)
+
+    stats = get_stats(engine)["primary"]
+    assert stats["slow_queries"] == 1
+    assert stats["checkout"]["count"] == 1
+    # IN 列表长度不同的语句合并为同一条
+    assert stats["statements"]["SELECT name FROM item WHERE id IN (?...)"]["count"] == 2
+    assert stats["statements"]["SELECT name FROM item WHERE id IN (?)"]["count"] == 1
+    assert any(r.levelno == logging.WARNING and "SELECT count(*) FROM item" in r.getMessage()
+               for r in handler.records)
+    metrics.reset()
+    assert metrics.get_stats()["queries"] == 0
+    engine.dispose()
+
+
+def test_request_query_counts_in_access_log(tmp_path, monkeypatch):
+    engine = make_engine(tmp_path)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    instrument_engine(engine, "primary")
+    instrument_engine(async_engine.sync_engine, "primary_async")
+    monkeypatch.setattr(query_metrics, "DB_N_PLUS_ONE_THRESHOLD", 5)
+
+    app = ExtendedFastAPI()
+    app.add_middleware(PipelineMiddleware, pipeline=app.pipeline)
+    app.use(setup_access_log)
+    app.use(setup_query_metrics)
+
+    @app.get("/items")
+    def items():
+        # 同步路由在线程池中执行，逐条查询（N+1）
+        with engine.connect() as conn:
+            ids = conn.execute(text("SELECT id FROM item")).scalars().all()
+            for _ in range(2):
+                for item_id in ids:
+                    conn.execute(text("SELECT name FROM item WHERE id = :id"), {"id": item_id})
+        return {"count": len(ids)}
+
+    @app.get("/async-items")
+    async def async_items():
+        async with async_engine.connect() as conn:
+            return {"count": (await conn.execute(text("SELECT count(*) FROM item"))).scalar()}
+
+    handler = capture_logs()
+    try:
+        client = TestClient(app)
+        assert client.get("/items").json() == {"count": 3}
+        assert client.get("/async-items").json() == {"count": 3}
+    finally:
+        logger.removeHandler(handler)
+        engine.dispose()
+
+    messages = [r.getMessage() for r in handler.records]
+    sync_line = next(m for m in messages if m.startswith("⬅️") and "/items" in m and "/async" not in m)
+    assert "[db=7q/" in sync_line and "n+1=1" in sync_line
+    async_line = next(m for m in messages if m.startswith("⬅️") and "/async-items" in m)
+    assert "[db=1q/" in async_line and "n+1" not in async_line
+    warnings = [m for m in messages if "N+1" in m]
+    assert len(warnings) == 1 and "执行 6 次" in warnings[0] and "WHERE id = ?" in warnings[0]
+
+
+def test_disabled_engine_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(query_metrics, "DB_QUERY_METRICS_ENABLED", False)
+    engine = make_engine(tmp_path)
+    assert instrument_engine(engine, "primary") is None
+    assert get_stats(engine) == {}
+    engine.dispose()
@@ -0,0 +1,81 @@
+"""
+Redis 连接配置测试：按部署形态创建连接池（不建立连接）
+"""
+import redis
+import redis.asyncio as aioredis
+from redis.sentinel import SentinelConnectionPool
+
+from app.boot.config import RedisConfig
+from app.core.redis_pool import build_async_pool, build_sync_pool, redis_connection_kwargs
+
+
+def make_config(**values) -> RedisConfig:
+    return RedisConfig().model_copy(update=values)
+
+
+def test_pool_sizes_and_timeouts_from_config():
+    config = make_config(db=3, max_connections=7, socket_timeout=2.5, socket_connect_timeout=1)
+    pool = build_sync_pool(config)
+    assert pool.max_connections == 7
+    assert pool.connection_kwargs["db"] == 3
+    assert pool.connection_kwargs["socket_timeout"] == 2.5
+    assert pool.connection_kwargs["socket_connect_timeout"] == 1
+    assert build_async_pool(config).max_connections == 7
+    # 0 表示不限制读超时
+    assert redis_connection_kwargs(make_config(socket_timeout=0))["socket_timeout"] is None
+
+
+def test_unix_socket_replaces_host_and_port():
+    config = make_config(unix_socket="/tmp/redis.sock")
+    pool = build_sync_pool(config)
+    assert pool.connection_class is redis.UnixDomainSocketConnection
+    assert pool.connection_kwargs["path"] == "/tmp/redis.sock"
+    assert "socket_keepalive" not in pool.connection_kwargs
+    assert build_async_pool(config).connection_class is aioredis.UnixDomainSocketConnection
+
+
+def test_sentinel_and_cluster_nodes():
+    config = make_config(mode="sentinel", sentinel_hosts="10.0.0.1:26379, 10.0.0.2:26380", sentinel_master="main")
+    assert config.sentinel_nodes == [("10.0.0.1", 26379), ("10.0.0.2", 26380)]
+    pool = build_sync_pool(config)
+    assert isinstance(pool, SentinelConnectionPool)
+    assert pool.service_name == "main"
+    assert make_config(host="h", port=7000).cluster_startup_nodes == [("h", 7000)]
+    assert config.address == "sentinel://10.0.0.1:26379, 10.0.0.2:26380/main"
+
+
+def test_client_cache_only_for_sync_connections():
+    config = make_config(client_cache=True, client_cache_size=123)
+    pool = build_sync_pool(config)
+    assert pool.connection_kwargs["protocol"] == 3
+    assert pool.cache is not None
+    assert "protocol" not in build_async_pool(config).connection_kwargs
+
+
+def test_sharded_pubsub_rejected_in_cluster_mode(monkeypatch):
+    """集群模式下分片订阅需要按槽位连接各节点，配置时直接拒绝"""
+    import pytest
+    from pydantic import ValidationError
+
+    monkeypatch.setenv("PUBSUB_SHARDED", "true")
+    assert RedisConfig().pubsub_sharded is True
+    monkeypatch.setenv("REDIS_MODE", "cluster")
+    with pytest.raises(ValidationError, match="PUBSUB_SHARDED"):
+        RedisConfig()
+    monkeypatch.setenv("PUBSUB_SHARDED", "0")
+    assert RedisConfig().mode == "cluster"
+
+
+def test_cluster_dedicated_clients_rotate_startup_nodes(monkeypatch):
+    """集群模式下订阅连接（普通 SUBSCRIBE）每次创建时轮换启动节点，重连不依赖同一个节点"""
+    from app.boot import settings
+    from app.core.redis_pool import RedisPool
+
+    config = make_config(mode="cluster", cluster_nodes="n1:7000,n2:7001,n3:7002")
+    monkeypatch.setattr(settings, "redis", config)
+    clients = [RedisPool.create_dedicated_client() for _ in range(4)]
+    seen = [(c.connection_pool.connection_kwargs["host"], c.connection_pool.connection_kwargs["port"])
+            for c in clients]
+    assert set(seen[:3]) == {("n1", 7000), ("n2", 7001), ("n3", 7002)}
+    assert seen[3] == seen[0]
+    assert isinstance(RedisPool.create_dedicated_client(cluster_aware=True), aioredis.RedisCluster)
@@ -0,0 +1,94 @@
+"""
+Redis 连接池监控测试：直方图、签出耗时/连接耗尽、命令耗时与错误统计
+"""
+import asyncio
+
+import pytest
+import redis
+import redis.asyncio as aioredis
+
+from app.core.redis_metrics import (
+    InstrumentedAsyncRedis, LatencyHistogram, RedisPoolMetrics, instrument_pool,
+)
+
+
+class FakeConnection(aioredis.Connection):
+    """不建立网络连接，按命令名返回结果"""
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self, nowait: bool = False):
+        pass
+
+    async def can_read_destructive(self):
+        return False
+
+    async def send_command(self, *args, **kwargs):
+        self.last_command = args[0]
+
+    async def send_packed_command(self, command, check_health: bool = True):
+        self.last_command = None
+
+    async def read_response(self, *args, **kwargs):
+        if self.last_command == "BOOM":
+            raise redis.ResponseError("ERR boom")
+        return b"OK"
+
+
+def make_client(max_connections: int = 2):
+    metrics = RedisPoolMetrics("async")
+    pool = instrument_pool(aioredis.ConnectionPool(connection_class=FakeConnection, max_connections=max_connections),
+                           metrics)
+    return InstrumentedAsyncRedis(connection_pool=pool), pool, metrics
+
+
+def test_histogram_quantiles_and_cumulative_buckets():
+    histogram = LatencyHistogram()
+    for ms in (0.1, 0.2, 0.3, 3, 2000):
+        histogram.observe(ms)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    assert snapshot["p50_ms"] == 0.5
+    assert snapshot["p99_ms"] == 2000  # 超出最后一个桶时取最大值
+    assert snapshot["buckets"]["0.25"] == 2
+    assert snapshot["buckets"]["+Inf"] == 5
+
+
+def test_commands_and_errors_are_recorded():
+    async def run():
+        client, pool, metrics = make_client()
+        assert await client.execute_command("GET", "k") == b"OK"
+        with pytest.raises(redis.ResponseError):
+            await client.execute_command("BOOM")
+        pipe = client.pipeline(transaction=False)
+        pipe.execute_command("SET", "k", "v")
+        await pipe.execute()
+        return metrics.get_stats(pool)
+
+    stats = asyncio.run(run())
+    assert stats["commands"]["GET"]["count"] == 1
+    assert stats["commands"]["BOOM"]["count"] == 1
+    assert stats["commands"]["PIPELINE"]["count"] == 1
+    assert "SET" not in stats["commands"]  # pipeline 内的命令只按整体计一次
+    assert stats["errors"] == {"BOOM:ResponseError": 1}
+    assert stats["checkout"]["count"] == 3
+    assert stats["in_use"] == 0 and stats["idle"] == 1
+    assert stats["status"] == "healthy"
+
+
+def test_pool_exhaustion_counted():
+    async def run():
+        _, pool, metrics = make_client(max_connections=1)
+        connection = await pool.get_connection()
+        assert metrics.get_stats(pool)["usage_rate"] == 100
+        assert metrics.get_stats(pool)["status"] == "critical"
+        with pytest.raises(redis.ConnectionError):
+            await pool.get_connection()
+        await pool.release(connection)
+        return metrics.get_stats(pool)
+
+    stats = asyncio.run(run())
+    assert stats["exhausted"] == 1
+    assert stats["errors"] == {"checkout:ConnectionError": 1}
+    assert stats["checkout"]["count"] == 2
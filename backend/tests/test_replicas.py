@@ -0,0 +1,110 @@
+"""
+只读副本路由测试：两个 SQLite 文件分别作为主库和副本（副本中的数据不同，便于区分读到哪个库）
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.boot.config import DatabaseConfig
+from app.db.replicas import ReplicaNode, ReplicaSet
+from app.db.routing import RoutingSession
+
+MARKER_QUERY = text("SELECT origin FROM marker")
+
+
+def make_db(path, origin: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE marker (origin TEXT)"))
+        conn.execute(text("INSERT INTO marker VALUES (:origin)"), {"origin": origin})
+    return engine
+
+
+def origin_query():
+    return select(text("origin")).select_from(text("marker"))
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary = make_db(tmp_path / "primary.db", "primary")
+    replica_a = make_db(tmp_path / "a.db", "a")
+    replica_b = make_db(tmp_path / "b.db", "b")
+    return tmp_path, primary, replica_a, replica_b
+
+
+def test_reads_round_robin_and_writes_stick_to_primary(databases):
+    _, primary, replica_a, replica_b = databases
+    replicas = ReplicaSet([ReplicaNode("a", replica_a), ReplicaNode("b", replica_b)])
+    Session = sessionmaker(class_=RoutingSession, bind=primary, replicas=replicas)
+
+    seen = []
+    for _ in range(4):
+        with Session() as db:
+            seen.append(db.execute(origin_query()).scalar())
+            # 同一会话内保持同一个副本
+            assert db.execute(origin_query()).scalar() == seen[-1]
+    assert seen == ["a", "b", "a", "b"]
+
+    with Session() as db:
+        db.execute(text("UPDATE marker SET origin = 'primary-updated'"))
+        # 写入后读取留在主库，读到自己的写入
+        assert db.execute(origin_query()).scalar() == "primary-updated"
+        db.commit()
+    with replica_a.connect() as conn:
+        assert conn.execute(MARKER_QUERY).scalar() == "a"
+
+
+def test_least_latency_and_health_fallback(databases):
+    tmp_path, primary, replica_a, _ = databases
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'x.db'}")  # 目录不存在，连接失败
+    nodes = [ReplicaNode("broken", broken), ReplicaNode("a", replica_a)]
+    replicas = ReplicaSet(nodes, strategy="least_latency")
+    Session = sessionmaker(class_=RoutingSession, bind=primary, replicas=replicas)
+
+    nodes[0].latency_ms, nodes[1].latency_ms = 1.0, 5.0
+    assert replicas.choose() is nodes[0]
+
+    replicas.check_health()
+    assert nodes[0].healthy is False and nodes[1].healthy is True
+    with Session() as db:
+        assert db.execute(origin_query()).scalar() == "a"
+
+    replicas.mark_down(nodes[1])
+    with Session() as db:
+        assert db.execute(origin_query()).scalar() == "primary"
+    assert replicas.get_stats()["fallbacks"] == 1
+
+    replicas.check_health()  # a 恢复
+    assert nodes[1].healthy is True
+    with pytest.raises(ValueError):
+        ReplicaSet(nodes, strategy="random")
+
+
+def test_async_sessions_use_replica_async_engines(databases):
+    tmp_path, *_ = databases
+
+    async def run():
+        primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+        replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'a.db'}")
+        replicas = ReplicaSet([ReplicaNode("a", create_engine(f"sqlite:///{tmp_path / 'a.db'}"), replica)])
+        Session = async_sessionmaker(bind=primary, sync_session_class=RoutingSession,
+                                     replicas=replicas, asynchronous=True)
+        async with Session() as db:
+            read = (await db.execute(origin_query())).scalar()
+            await db.execute(text("UPDATE marker SET origin = 'written'"))
+            after_write = (await db.execute(origin_query())).scalar()
+            await db.rollback()
+        await primary.dispose()
+        await replica.dispose()
+        return read, after_write
+
+    assert asyncio.run(run()) == ("a", "written")
+
+
+def test_replica_hosts_config():
+    config = DatabaseConfig().model_copy(update={"replica_hosts": "r1, r2:3307", "port": 3306})
+    assert config.replica_nodes == [("r1", 3306), ("r2", 3307)]
+    assert DatabaseConfig().model_copy(update={"replica_hosts": ""}).replica_nodes == []
@@ -0,0 +1,233 @@
+"""
+标准响应包装测试
+"""
+import asyncio
+import gzip
+import json
+import tracemalloc
+from fastapi import Depends
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from app.boot.application import create_app
+from app.boot.middleware import setup_compression
+from app.boot.response import stream_envelope, STREAM_INCREMENTAL, STREAM_OFF
+
+app = create_app()
+
+
+@app.get("/t/dict")
+async def plain_dict():
+    return {"value": 1}
+
+
+@app.get("/t/wrapped")
+async def already_wrapped():
+    return {"code": 0, "data": {"value": 1}}
+
+
+@app.get("/t/raw")
+async def raw_json():
+    return JSONResponse({"value": 1})
+
+
+@app.get("/t/stream")
+async def stream_json():
+    async def gen():
+        yield b'{"value":'
+        yield b"1}"
+    return StreamingResponse(gen(), media_type="application/json")
+
+
+@app.get("/t/text")
+async def text():
+    return PlainTextResponse("hello")
+
+
+@app.get("/t/error")
+async def error():
+    raise RuntimeError("boom")
+
+
+client = TestClient(app)
+
+
+def call_asgi(asgi_app, path: str, on_body=None):
+    """直接以 ASGI 方式调用应用，on_body 逐条接收 body 消息"""
+    messages = []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [], "server": ("test", 80), "client": ("127.0.0.1", 1),
+    }
+
+    async def run():
+        # Event 需在事件循环内创建（兼容 Python 3.9）
+        response_done = asyncio.Event()
+
+        async def receive():
+            await response_done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                if on_body is not None:
+                    on_body(message)
+                else:
+                    messages.append(message)
+                if not message.get("more_body", False):
+                    response_done.set()
+            else:
+                messages.append(message)
+
+        await asgi_app(scope, receive, send)
+
+    asyncio.run(run())
+    return messages
+
+
+def test_dict_wrapped_at_render():
+    """默认响应类在序列化阶段包装"""
+    assert client.get("/t/dict").json() == {"code": 200, "data": {"value": 1}}
+
+
+def test_already_wrapped_not_rewrapped():
+    """已包含 code 的结果不重复包装"""
+    assert client.get("/t/wrapped").json() == {"code": 0, "data": {"value": 1}}
+
+
+def test_raw_json_response_wrapped_by_middleware():
+    """直接返回的 JSONResponse 由中间件兜底包装，Content-Length 正确"""
+    response = client.get("/t/raw")
+    assert response.json() == {"code": 200, "data": {"value": 1}}
+    assert int(response.headers["content-length"]) == len(response.content)
+
+
+def test_streaming_json_wrapped():
+    """流式 JSON 响应被包装"""
+    assert client.get("/t/stream").json() == {"code": 200, "data": {"value": 1}}
+
+
+def test_non_json_untouched():
+    """非 JSON 响应原样返回"""
+    assert client.get("/t/text").text == "hello"
+
+
+def test_unhandled_exception():
+    """未处理异常转换为标准错误格式"""
+    assert client.get("/t/error").json() == {"code": 1, "msg": "boom"}
+
+
+def test_pipeline_headers():
+    """管道钩子：Server 头、CORS Origin 回显、处理耗时"""
+    response = client.get("/t/dict", headers={"Origin": "http://example.com"})
+    assert response.headers["server"] == "struggler/1.0"
+    assert response.headers["access-control-allow-origin"] == "http://example.com"
+    assert float(response.headers["x-process-time"]) >= 0
+
+
+@app.get("/t/stream-incremental", dependencies=[Depends(stream_envelope(STREAM_INCREMENTAL))])
+async def stream_incremental():
+    async def gen():
+        yield b"["
+        for i in range(3):
+            yield (b"," if i else b"") + str(i).encode()
+        yield b"]"
+    return StreamingResponse(gen(), media_type="application/json")
+
+
+@app.get("/t/stream-empty", dependencies=[Depends(stream_envelope(STREAM_INCREMENTAL))])
+async def stream_empty():
+    async def gen():
+        if False:
+            yield b""
+    return StreamingResponse(gen(), media_type="application/json")
+
+
+@app.get("/t/stream-off", dependencies=[Depends(stream_envelope(STREAM_OFF))])
+async def stream_off():
+    async def gen():
+        yield b'{"value":1}'
+    return StreamingResponse(gen(), media_type="application/json")
+
+
+def test_streaming_incremental():
+    """增量模式：先输出外壳前缀，chunk 原样透传，结束时闭合"""
+    messages = call_asgi(app, "/t/stream-incremental")
+
+    bodies = [m["body"] for m in messages if m["type"] == "http.response.body"]
+    assert bodies[0] == b'{"code":200,"data":'
+    assert bodies[1:3] == [b"[", b"0"]
+    assert json.loads(b"".join(bodies)) == {"code": 200, "data": [0, 1, 2]}
+
+
+def test_streaming_incremental_empty():
+    """增量模式下空流输出 data: null"""
+    assert client.get("/t/stream-empty").json() == {"code": 200, "data": None}
+
+
+def test_streaming_off():
+    """接口可关闭流式包装"""
+    assert client.get("/t/stream-off").json() == {"value": 1}
+
+
+def test_streaming_incremental_with_gzip():
+    """开启 GZip 时增量包装仍输出合法的压缩流"""
+    gzip_app = create_app()
+    gzip_app.use(setup_compression)
+
+    @gzip_app.get("/t/stream-gzip", dependencies=[Depends(stream_envelope(STREAM_INCREMENTAL))])
+    async def stream_gzip():
+        async def gen():
+            yield b"["
+            for i in range(400):
+                yield (b"," if i else b"") + b'"0123456789"'
+            yield b"]"
+        return StreamingResponse(gen(), media_type="application/json")
+
+    response = TestClient(gzip_app).get("/t/stream-gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == {"code": 200, "data": ["0123456789"] * 400}
+
+
+@app.get("/t/stream-precompressed", dependencies=[Depends(stream_envelope(STREAM_INCREMENTAL))])
+async def stream_precompressed():
+    async def gen():
+        yield gzip.compress(b'{"value":1}')
+    return StreamingResponse(gen(), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+
+def test_streaming_compressed_passthrough():
+    """已压缩的流式响应原样放行，不在压缩字节外拼接外壳"""
+    response = client.get("/t/stream-precompressed")
+    assert response.json() == {"value": 1}
+
+
+@app.get("/t/stream-large", dependencies=[Depends(stream_envelope(STREAM_INCREMENTAL))])
+async def stream_large():
+    chunk = b"0" * 65536
+
+    async def gen():
+        yield b'"'
+        for _ in range(256):  # 16MB
+            yield chunk
+        yield b'"'
+    return StreamingResponse(gen(), media_type="application/json")
+
+
+def test_streaming_incremental_memory_flat():
+    """增量模式内存峰值与响应大小无关（16MB 响应峰值远小于 1MB）"""
+    received = 0
+
+    def on_body(message):
+        nonlocal received
+        received += len(message["body"])
+
+    tracemalloc.start()
+    try:
+        call_asgi(app, "/t/stream-large", on_body)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert received == 256 * 65536 + len(b'{"code":200,"data":') + 3
+    assert peak < 1024 * 1024
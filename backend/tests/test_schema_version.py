@@ -0,0 +1,83 @@
+"""
+表结构指纹测试：指纹一致时跳过迁移、结构变化时重新迁移、迁移失败不保存指纹、跨进程文件锁
+"""
+import threading
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine
+
+from app.db import Base
+from app.db.schema_version import (
+    file_lock, migrate_if_changed, read_fingerprint, schema_fingerprint,
+)
+from app.db.sqlite import init_sqlite
+
+
+def make_metadata(extra_column: bool = False) -> MetaData:
+    metadata = MetaData()
+    columns = [Column("id", Integer, primary_key=True), Column("name", String(32))]
+    if extra_column:
+        columns.append(Column("email", String(64), nullable=True))
+    Table("items", metadata, *columns)
+    return metadata
+
+
+def test_init_sqlite_stores_fingerprint_and_skips_next_boot(tmp_path):
+    path = str(tmp_path / "data" / "app.db")
+    engine = init_sqlite(path)
+    assert read_fingerprint(engine) == schema_fingerprint(Base.metadata)
+
+    calls = []
+    assert migrate_if_changed(engine, Base.metadata, lambda: calls.append(1)) is False
+    assert calls == []
+
+
+def test_changed_metadata_migrates_again(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'm.db'}")
+    calls = []
+
+    def migrate(metadata):
+        def run():
+            metadata.create_all(bind=engine)
+            calls.append(len(metadata.tables["items"].columns))
+        return run
+
+    before, after = make_metadata(), make_metadata(extra_column=True)
+    assert schema_fingerprint(before) != schema_fingerprint(after)
+    assert schema_fingerprint(before) == schema_fingerprint(make_metadata())
+
+    assert migrate_if_changed(engine, before, migrate(before)) is True
+    assert migrate_if_changed(engine, before, migrate(before)) is False
+    assert migrate_if_changed(engine, after, migrate(after)) is True
+    assert calls == [2, 3]
+
+
+def test_failed_migration_is_retried(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'f.db'}")
+    metadata = make_metadata()
+    assert migrate_if_changed(engine, metadata, lambda: False) is True
+    assert read_fingerprint(engine) is None
+    assert migrate_if_changed(engine, metadata, lambda: True) is True
+    assert read_fingerprint(engine) == schema_fingerprint(metadata)
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / "db.migrate.lock")
+    errors = []
+
+    def contender():
+        try:
+            with file_lock(path, timeout=0.2):
+                pass
+        except TimeoutError as e:
+            errors.append(e)
+
+    with file_lock(path):
+        thread = threading.Thread(target=contender)
+        thread.start()
+        thread.join()
+    assert len(errors) == 1
+
+    # 释放后可以再次获取
+    with file_lock(path, timeout=0.2):
+        pass
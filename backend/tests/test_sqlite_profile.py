@@ -0,0 +1,91 @@
+"""
+SQLite performance 模式测试：PRAGMA、只读连接池、读写分离会话、并发写入
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.db import User
+from app.db.async_engine import init_async_sqlite
+from app.db.routing import RoutingSession
+from app.db.sqlite import SQLITE_BUSY_TIMEOUT_MS, init_sqlite, init_sqlite_reader
+
+
+def make_engines(tmp_path):
+    path = str(tmp_path / "data" / "perf.db")
+    writer = init_sqlite(path, profile="performance")
+    return path, writer, init_sqlite_reader(path)
+
+
+def test_pragmas_and_pool_roles(tmp_path):
+    _, writer, reader = make_engines(tmp_path)
+    with writer.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == SQLITE_BUSY_TIMEOUT_MS
+    with reader.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA query_only").scalar() == 1
+    assert writer.pool.size() == 1 and writer.pool._max_overflow == 0
+
+
+def test_routing_session_reads_own_writes(tmp_path):
+    _, writer, reader = make_engines(tmp_path)
+    Session = sessionmaker(class_=RoutingSession, bind=writer, read_engine=reader, autoflush=False)
+    with Session() as db:
+        before = db.scalar(select(func.count()).select_from(User))
+        assert not db.wrote
+        db.add(User(username="routing", hashed_password="x"))
+        db.flush()
+        assert db.wrote
+        # 未提交的写入只在写连接上可见
+        assert db.scalar(select(func.count()).select_from(User)) == before + 1
+        db.commit()
+    with Session() as db:
+        assert db.scalar(select(func.count()).select_from(User)) == before + 1
+        assert db.get_bind(clause=select(User)) is reader
+        assert db.get_bind(clause=select(User).with_for_update()) is writer
+
+
+def test_concurrent_writers_are_serialized(tmp_path):
+    _, writer, reader = make_engines(tmp_path)
+    Session = sessionmaker(class_=RoutingSession, bind=writer, read_engine=reader)
+
+    def write(i):
+        with Session() as db:
+            db.add(User(username=f"w{i}", hashed_password="x"))
+            db.commit()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(write, range(40)))
+    with reader.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM users WHERE username LIKE 'w%'")).scalar() == 40
+
+
+def test_async_routing_session(tmp_path):
+    path, writer, _ = make_engines(tmp_path)
+
+    async def run():
+        async_writer = init_async_sqlite(path, profile="performance")
+        async_reader = init_async_sqlite(path, profile="performance", read_only=True)
+        Session = async_sessionmaker(bind=async_writer, sync_session_class=RoutingSession,
+                                     read_engine=async_reader.sync_engine, expire_on_commit=False)
+
+        async def write(i):
+            async with Session() as db:
+                db.add(User(username=f"a{i}", hashed_password="x"))
+                await db.commit()
+
+        await asyncio.gather(*(write(i) for i in range(10)))
+        async with Session() as db:
+            count = await db.scalar(select(func.count()).select_from(User).where(User.username.like("a%")))
+            read_only = (await db.execute(text("PRAGMA query_only"))).scalar()
+        await async_writer.dispose()
+        await async_reader.dispose()
+        return count, read_only
+
+    count, read_only = asyncio.run(run())
+    assert count == 10
+    assert read_only == 0  # 文本 SQL 视为写操作，走写连接
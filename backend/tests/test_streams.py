@@ -0,0 +1,236 @@
+"""
+RedisStreamManager 测试（用进程内的 Stream 替身代替 Redis 连接）
+"""
+import asyncio
+
+import pytest
+
+from app.core import redis_pool
+from app.core.redis_pool import RedisStreamManager
+
+
+def _parse(entry_id):
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+class FakeStreamRedis:
+    """只实现 Streams 传输用到的命令，所有连接共享同一份数据"""
+
+    def __init__(self):
+        self.streams = {}
+        self.groups = {}  # (stream, group) -> {"last": ID, "pending": {消费者: [ID]}}
+        self.commands = []
+        self._seq = 0
+        self._waiters = []
+
+    def _notify(self):
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+        self._waiters.clear()
+
+    async def xadd(self, stream, fields, maxlen=None, approximate=True):
+        self.commands.append("XADD")
+        self._seq += 1
+        entry_id = f"{self._seq}-0"
+        entries = self.streams.setdefault(stream, [])
+        entries.append((entry_id, dict(fields)))
+        if maxlen is not None and len(entries) > maxlen:
+            del entries[:len(entries) - maxlen]
+        self._notify()
+        return entry_id
+
+    async def xrevrange(self, stream, count=None):
+        return list(reversed(self.streams.get(stream, [])))[:count]
+
+    async def xrange(self, stream, min="-", max="+", count=None):
+        exclusive = min.startswith("(")
+        low = _parse(min.lstrip("(")) if min != "-" else (-1, -1)
+        high = _parse(max) if max != "+" else None
+        result = [
+            (i, f) for i, f in self.streams.get(stream, [])
+            if (_parse(i) > low if exclusive else _parse(i) >= low) and (high is None or _parse(i) <= high)
+        ]
+        return result[:count]
+
+    async def _block(self, block):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, block / 1000)
+        except asyncio.TimeoutError:
+            pass
+
+    async def xread(self, streams, count=None, block=None):
+        self.commands.append("XREAD")
+        while True:
+            response = []
+            for stream, cursor in streams.items():
+                entries = [(i, f) for i, f in self.streams.get(stream, []) if _parse(i) > _parse(cursor)]
+                if entries:
+                    response.append([stream, entries[:count]])
+            if response or block is None:
+                return response
+            await self._block(block)
+            block = 0.001  # 唤醒或超时后只再检查一次
+
+    async def xgroup_create(self, stream, group, id="0", mkstream=False):
+        if (stream, group) in self.groups:
+            raise redis_pool.redis.ResponseError("BUSYGROUP Consumer Group name already exists")
+        self.streams.setdefault(stream, [])
+        self.groups[(stream, group)] = {"last": id, "pending": {}}
+
+    async def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        self.commands.append("XREADGROUP")
+        while True:
+            response = []
+            for stream, cursor in streams.items():
+                state = self.groups[(stream, group)]
+                pending = state["pending"].setdefault(consumer, [])
+                if cursor == "0":
+                    entries = [(i, f) for i, f in self.streams[stream] if i in pending][:count]
+                    response.append([stream, entries])
+                    continue
+                entries = [(i, f) for i, f in self.streams[stream] if _parse(i) > _parse(state["last"])][:count]
+                if entries:
+                    state["last"] = entries[-1][0]
+                    pending.extend(i for i, _ in entries)
+                    response.append([stream, entries])
+            if "0" in streams.values() or any(entries for _, entries in response) or block is None:
+                return response
+            await self._block(block)
+            block = 0.001
+
+    async def xack(self, stream, group, *ids):
+        self.commands.append("XACK")
+        for pending in self.groups[(stream, group)]["pending"].values():
+            for entry_id in ids:
+                if entry_id in pending:
+                    pending.remove(entry_id)
+        return len(ids)
+
+    async def close(self):
+        pass
+
+
+def make_manager(fake: FakeStreamRedis) -> RedisStreamManager:
+    manager = RedisStreamManager()
+    manager._create_client = lambda: fake
+    return manager
+
+
+async def _next_data(listener):
+    """跳过 init / 心跳事件，返回下一条消息"""
+    while True:
+        message = await asyncio.wait_for(listener.__anext__(), 5)
+        if isinstance(message, dict) and "event" in message:
+            continue
+        return message
+
+
+def test_stream_listeners_receive_batched_reads():
+    """所有消费者共用一个读取任务，批量读取，每个消费者都收到全部消息"""
+    async def run():
+        fake = FakeStreamRedis()
+        manager = make_manager(fake)
+        first = manager.listen("updates", maxsize=1000)
+        second = manager.listen("updates", maxsize=1000)
+        assert (await first.__anext__())["event"] == "init"
+        assert (await second.__anext__())["event"] == "init"
+
+        for i in range(500):
+            await fake.xadd("updates", {"data": str(i)})
+        received = [[await _next_data(first) for _ in range(500)], [await _next_data(second) for _ in range(500)]]
+        stats = manager.get_stats()
+        await first.aclose()
+        await second.aclose()
+        after = manager.get_stats()
+        await manager.stop()
+        return received, stats, after
+
+    received, stats, after = asyncio.run(run())
+    assert received[0] == received[1] == [str(i) for i in range(500)]
+    assert stats["messages"] == 500 and stats["consumers"] == 2
+    # 每次最多读取 STREAM_READ_COUNT 条，不是每条消息一次往返
+    assert stats["reads"] <= 500 // redis_pool.STREAM_READ_COUNT + 3
+    assert after["streams"] == 0 and after["consumers"] == 0
+
+
+def test_last_event_id_replays_missed_messages_in_order():
+    async def run():
+        fake = FakeStreamRedis()
+        manager = make_manager(fake)
+        ids = [await fake.xadd("task:1", {"data": f"step{i}"}) for i in range(4)]
+
+        # 客户端收到 step0 后断开，重连时带上 Last-Event-ID
+        listener = manager.listen("task:1", last_event_id=ids[0], with_ids=True)
+        assert (await listener.__anext__())["event"] == "init"
+        await fake.xadd("task:1", {"data": "step4"})
+        messages = [await _next_data(listener) for _ in range(4)]
+        stats = manager.get_stats()
+        await listener.aclose()
+        await manager.stop()
+        return ids, messages, stats
+
+    ids, messages, stats = asyncio.run(run())
+    assert [m["data"] for m in messages] == ["step1", "step2", "step3", "step4"]
+    assert [m["id"] for m in messages[:3]] == ids[1:]
+    assert messages[0]["channel"] == "task:1"
+    assert stats["replayed"] == 3
+
+
+def test_invalid_last_event_id_only_skips_replay():
+    async def run():
+        fake = FakeStreamRedis()
+        manager = make_manager(fake)
+
+        async def xrange(*args, **kwargs):
+            raise redis_pool.redis.ResponseError("Invalid stream ID")
+        fake.xrange = xrange
+
+        listener = manager.listen("updates", last_event_id="bogus")
+        assert (await listener.__anext__())["event"] == "init"
+        await fake.xadd("updates", {"data": "live"})
+        message = await _next_data(listener)
+        await listener.aclose()
+        await manager.stop()
+        return message
+
+    assert asyncio.run(run()) == "live"
+
+
+def test_consumer_group_splits_work_and_redelivers_unacked():
+    async def run():
+        fake = FakeStreamRedis()
+        manager = make_manager(fake)
+        a = manager.listen("jobs", group="workers", consumer="a")
+        b = manager.listen("jobs", group="workers", consumer="b")
+        assert (await a.__anext__())["event"] == "init"
+        assert (await b.__anext__())["event"] == "init"
+
+        for i in range(3):
+            await fake.xadd("jobs", {"data": f"job{i}"})
+        # a 读到一批消息，处理第一条时断开：这一批都没有 XACK
+        first = await _next_data(a)
+        await a.aclose()
+        await fake.xadd("jobs", {"data": "job3"})
+        got_b = await _next_data(b)
+        await b.aclose()
+
+        # a 重启后先取回未确认的消息
+        restarted = manager.listen("jobs", group="workers", consumer="a")
+        redelivered = [await _next_data(restarted) for _ in range(3)]
+        job4 = await fake.xadd("jobs", {"data": "job4"})
+        redelivered.append(await _next_data(restarted))
+        await restarted.aclose()
+        pending = fake.groups[("jobs", "workers")]["pending"]
+        return first, got_b, redelivered, pending, job4
+
+    first, got_b, redelivered, pending, job4 = asyncio.run(run())
+    assert first == "job0"
+    assert got_b == "job3"  # 同组内每条消息只交给一个消费者
+    assert redelivered == ["job0", "job1", "job2", "job4"]
+    # 一批消息在调用方取下一条时才 XACK：已确认的不再重复，处理中断开的留在 pending
+    assert pending["a"] == [job4]
+    assert pending["b"] == ["4-0"]